@@ -1,12 +1,4 @@
-import matplotlib.pyplot as plt
-import matplotlib
-import streamlit as st
-
-matplotlib.use('Qt5Agg')
 import numpy as np
-import plotly as ply
-import plotly.express as px
-import plotly.graph_objects as go
 
 def Resistance(L,S,res):
     '''
@@ -113,6 +105,14 @@ def Graph(x, y, z, titre=None, F_i=None, B_i=None, colonne = None):
     Sortie : 
         - Graph du câble dans le repère du satellite avec les vecteurs de B et F_EM
     '''
+    # Bibliothèques d'affichage importées seulement au moment de tracer, pour que
+    # les fonctions de calcul de ce module n'en dépendent pas
+    import matplotlib
+    matplotlib.use('Qt5Agg')
+    import matplotlib.pyplot as plt
+    import plotly.graph_objects as go
+    import streamlit as st
+
     x = np.array(x)
     y = np.array(y) 
     z = np.array(z)
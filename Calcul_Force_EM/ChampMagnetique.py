@@ -1,4 +1,6 @@
-import ppigrf
+from Calcul_Force_EM import ppigrf
+import Calcul_Force_EM.Satellite as Satellite
+import Calcul_Force_EM.Instrumentation as instr
 import numpy as np
         
 def ChampMagnetique(r, theta, phi, date):
@@ -19,8 +21,59 @@ def ChampMagnetique(r, theta, phi, date):
         - B_phi (float)     Composante selon φ du champ magnétique terrestre [T]
     '''  
     [B_r, B_theta, B_phi] = ppigrf.igrf_gc(r, theta, phi, date) # [nT]
+    if instr.ACTIF:
+        instr.compter("igrf.appels")
+        instr.compter("igrf.points", np.size(r))
     B_r = np.squeeze(B_r) *10**-9         # [T]
     B_theta = np.squeeze(B_theta) *10**-9 # [T]
     B_phi = np.squeeze(B_phi) *10**-9     # [T]
 
     return B_r,B_theta,B_phi
+
+#______________________________________________________________________________
+
+def ChampMagnetiqueSat(cable, r, theta, phi, date, INC, TA):
+    '''
+    Permet de connaitre le champ magnétique terrestre en un ensemble de points
+    exprimés dans le repère du satellite, avec un seul appel au modèle IGRF.
+
+    - Les points de plusieurs câbles (P,N,3) peuvent être donnés à la fois :
+      ils sont mis bout à bout en un seul tableau (P.N,3) pour l'appel au modèle
+
+    - Équivaut à appliquer Satellite.Sat2Earth(), ChampMagnetique() puis
+      Satellite.Earth2Sat_cm() à chacun des points
+
+    - Le satellite, de coordonnées sphériques (r,θ,φ), ainsi que son anomalie vraie
+      et l'inclinaison de son orbite doivent être exprimées dans le repère
+      terrestre ECEF
+
+    Attributs :
+        - cable (array) (N,3) Coordonnées des points dans le repère du satellite [m]
+                  ou (P,N,3)
+        - r (float)           Coordonnée selon r du satellite                   [km]
+        - theta (float)       Coordonnée selon θ du satellite                   [deg]
+        - phi (float)         Coordonnée selon φ du satellite                   [deg]
+        - date (datetime)     Date de calcul
+        - INC (float)         Inclinaison de l'orbite du satellite              [deg]
+        - TA (float)          Anomalie vraie du satellite                       [deg]
+
+    Sortie :
+        - B (array) (N,3)     Champ magnétique aux points, dans le repère du satellite [T]
+                  ou (P,N,3)
+    '''
+    cable = np.asarray(cable, dtype=float)
+    forme = cable.shape
+
+    # Coordonnées des points dans le repère terrestre fixe
+    P = Satellite.Sat2Earth_lot(cable.reshape((-1, 3)), INC, TA, [r, theta, phi])
+
+    # Champ magnétique aux points, dans le repère Sphérique
+    with instr.chrono("igrf"):
+        [B_r, B_theta, B_phi] = ppigrf.igrf_gc(P[:, 0], P[:, 1], P[:, 2], date) # [nT]
+    if instr.ACTIF:
+        instr.compter("igrf.appels")
+        instr.compter("igrf.points", len(P))
+    B = np.column_stack((B_r[0], B_theta[0], B_phi[0])) *10**-9            # [T]
+
+    # Champ magnétique dans le repère du satellite
+    return Satellite.Earth2Sat_cm_lot(B, INC, TA).reshape(forme)
@@ -0,0 +1,11 @@
+'''
+Constantes physiques utilisées par les calculs et les codes de test.
+
+Valeurs de référence (IAU 2015 et CODATA 2018), les mêmes que celles
+d'astropy.constants (R_earth, M_earth, G), sans avoir à charger astropy.
+'''
+
+R_T = 6378100.0                 # [m] Rayon équatorial nominal de la Terre
+M_T = 5.972167867791379e24      # [kg] Masse de la Terre
+G = 6.6743e-11                  # [m^3/kg/s²] Constante Universelle de Gravitation
+MU = G * M_T                    # [m^3/s²] Paramètre Gravitationnel Standard de la Terre
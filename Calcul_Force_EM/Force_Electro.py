@@ -1,6 +1,6 @@
 import numpy as np
-import Calcul_Force_EM.Satellite as Satellite
 import Calcul_Force_EM.ChampMagnetique as cm
+import Calcul_Force_EM.Instrumentation as instr
 
 '''
 Ce code contient des fonctions qui permettent de calculer la force électrodynamique
@@ -14,6 +14,14 @@ réalise donc les calculs avec le champ magnétique terrestre
 
 La fonction Parametre() fonctionne sur le même principe que la fonction Discret()
 mais cette fois-ci pour des courbes quelconques
+
+La fonction ForceLorentz() contient le calcul vectorisé de la force sur tous les
+segments d'une courbe, à partir du champ magnétique en chacun de ses points.
+Elle est utilisée par Parametre()
+
+Les fonctions ForceLorentzInduitImpose() et ParametreInduitImpose() donnent en
+une seule fois les résultats du cas induit et du cas imposé : le champ magnétique
+et la géométrie des segments ne sont calculés qu'une fois
 '''
 
 #______________________________________________________________________________
@@ -96,17 +104,14 @@ def Discret(r, theta, phi, date, INC, TA, cable, m, I, V, R):
     pz = (cable[1][2] - cable[0][2])/m
         
     Li = [] # Liste des points de discrétisation
-    Bi = [] # Liste des champs magnétique aux différents points de discrétisation
     V = np.array([V,0,0]) # Vecteur vitesse
     F_mag = 0 # Force Electrodynamique      
-    Sat = np.array([[r], [theta], [phi]]) # Vecteur position du satellite dans ECEF
         
     for i in range(m):
         Li.append([cable[0][0] + i*px , cable[0][1] + i*py , cable[0][2] + i*pz])
-        P = Satellite.Sat2Earth(Li[i][0], Li[i][1], Li[i][2], INC, TA, Sat)
-        B0 = cm.ChampMagnetique(P[0], P[1], P[2], date)
-        B0 = Satellite.Earth2Sat_cm(B0[0], B0[1], B0[2], INC, TA)
-        Bi.append(B0)
+
+    # Champ magnétique aux différents points de discrétisation, en un seul appel
+    Bi = cm.ChampMagnetiqueSat(np.array(Li), r, theta, phi, date, INC, TA)
         
     Li.append(cable[1])
         
@@ -144,7 +149,169 @@ def Discret(r, theta, phi, date, INC, TA, cable, m, I, V, R):
 #______________________________________________________________________________
 
 
-def Parametre(r, theta, phi, date, INC, TA, X_cable, Y_cable, Z_cable, I, V, R):
+def ForceLorentz(cable, B, I, V, R):
+    '''
+    Permet de calculer la force de Lorentz générée par un câble conducteur
+    défini par une suite de points, à partir du champ magnétique B en chacun
+    de ces points.
+
+    - Tous les segments sont traités en même temps par des opérations sur
+      des tableaux : différences entre points, normes, un produit vectoriel
+      et une somme
+
+    - Le champ magnétique utilisé sur le segment i est celui au point i
+
+    - Dans le cas induit (I = None), le courant est déduit de la somme des
+      tensions induites sur tous les segments
+
+    Attributs :
+        - cable (array) (N,3)   Coordonnées des points du câble          [m]
+        - B (array) (N,3)       Champ magnétique aux points du câble     [T]
+        - I (float or None)     Intensité du courant                    [A]
+        - V (float)             Vitesse de déplacement du câble         [m/s]
+        - R (float)             Résistance électrique du câble          [Ohm]
+
+    Sorties :
+        - F_mag (array) (3,)          Force de Lorentz résultante               [N]
+        - F_mag_i_vect (array) (N,3)  Force sur chaque segment, précédée
+                                      d'une ligne nulle                         [N]
+    '''
+    cable = np.asarray(cable, dtype=float)
+    B = np.asarray(B, dtype=float)
+    V = np.array([V,0,0]) # Vecteur vitesse
+
+    # Vecteurs longueurs des segments, orientés positivement en direction du satellite, et leurs normes
+    L = -np.diff(cable, axis=-2)
+    l = np.linalg.norm(L, axis=-1)[..., np.newaxis]
+    Bi = B[..., :-1, :] # Champ magnétique utilisé sur chaque segment
+
+    # Cas du courant induit : le courant vient de la somme des tensions induites
+    if I is None :
+        E = np.cross(V, Bi)                  # Champ électrique induit sur chaque segment
+        U = np.sum(np.sum(E*L, axis=-1), axis=-1) # Tension dans le câble
+        I = (U/R)[..., np.newaxis, np.newaxis] if np.ndim(U) > 0 else U/R
+
+    In = I*L/l                              # Vecteur courant sur chaque segment
+    F_mag_i = l*np.cross(In, Bi)            # Force sur chaque segment
+    F_mag = np.sum(F_mag_i, axis=-2)        # Force résultante
+
+    # Ligne nulle en tête, comme la liste des forces de Parametre()
+    F_mag_i_vect = np.concatenate((np.zeros(F_mag_i.shape[:-2] + (1, 3)), F_mag_i), axis=-2)
+
+    return F_mag, F_mag_i_vect
+
+#______________________________________________________________________________
+
+def ForceLorentzInduitImpose(cable, B, I, V, R):
+    '''
+    Permet de calculer en une seule passe la force de Lorentz générée par un
+    câble conducteur dans le cas induit et dans le cas où le courant I est imposé.
+
+    - La force sur chaque segment est proportionnelle au courant : on calcule
+      une fois la force par ampère sur chaque segment, puis on la multiplie
+      par le courant induit et par le courant imposé
+
+    Attributs :
+        - cable (array) (N,3)   Coordonnées des points du câble          [m]
+        - B (array) (N,3)       Champ magnétique aux points du câble     [T]
+        - I (float)             Intensité du courant imposé             [A]
+        - V (float)             Vitesse de déplacement du câble         [m/s]
+        - R (float)             Résistance électrique du câble          [Ohm]
+
+    Sorties :
+        - F_induit (array) (3,)          Force de Lorentz résultante, cas induit   [N]
+        - F_induit_i_vect (array) (N,3)  Force sur chaque segment, cas induit      [N]
+        - F_impose (array) (3,)          Force de Lorentz résultante, cas imposé   [N]
+        - F_impose_i_vect (array) (N,3)  Force sur chaque segment, cas imposé      [N]
+    '''
+    cable = np.asarray(cable, dtype=float)
+    B = np.asarray(B, dtype=float)
+    V = np.array([V,0,0]) # Vecteur vitesse
+
+    # Géométrie des segments et champ magnétique utilisé sur chacun d'eux
+    L = -np.diff(cable, axis=-2)
+    l = np.linalg.norm(L, axis=-1)[..., np.newaxis]
+    Bi = B[..., :-1, :]
+
+    # Force sur chaque segment pour un courant de 1 A
+    F_unitaire_i = l*np.cross(L/l, Bi)
+    # Ligne nulle en tête, comme la liste des forces de Parametre()
+    zeros = np.zeros(F_unitaire_i.shape[:-2] + (1, 3))
+
+    # Cas du courant induit
+    E = np.cross(V, Bi)
+    U = np.sum(np.sum(E*L, axis=-1), axis=-1)
+    I_induit = (U/R)[..., np.newaxis, np.newaxis] if np.ndim(U) > 0 else U/R
+    F_induit_i = I_induit*F_unitaire_i
+
+    # Cas du courant imposé
+    F_impose_i = I*F_unitaire_i
+
+    return (np.sum(F_induit_i, axis=-2), np.concatenate((zeros, F_induit_i), axis=-2),
+            np.sum(F_impose_i, axis=-2), np.concatenate((zeros, F_impose_i), axis=-2))
+
+#______________________________________________________________________________
+
+def ForceLorentzTotale(cable, B, I, V, R):
+    '''
+    Permet de calculer uniquement les forces de Lorentz résultantes du cas
+    induit et du cas où le courant I est imposé, sans garder les forces sur
+    chaque segment. C'est le calcul minimal nécessaire pour évaluer une structure.
+
+    - La force résultante est proportionnelle au courant : on calcule une fois
+      la somme des L_i x B_i, puis on la multiplie par chacun des courants
+
+    Attributs :
+        - cable (array) (N,3)   Coordonnées des points du câble          [m]
+        - B (array) (N,3)       Champ magnétique aux points du câble     [T]
+        - I (float)             Intensité du courant imposé             [A]
+        - V (float)             Vitesse de déplacement du câble         [m/s]
+        - R (float)             Résistance électrique du câble          [Ohm]
+
+    Sorties :
+        - F_induit (array) (3,) Force de Lorentz résultante, cas induit  [N]
+        - F_impose (array) (3,) Force de Lorentz résultante, cas imposé  [N]
+    '''
+    C, u = ContributionsSegments(cable, B, V)
+
+    # Force résultante pour un courant de 1 A
+    F_unitaire = np.sum(C, axis=-2)
+
+    # Tension induite dans le câble : somme des (V x B_i).L_i
+    U = np.sum(u, axis=-1)
+    I_induit = (U/R)[..., np.newaxis] if np.ndim(U) > 0 else U/R
+
+    return I_induit*F_unitaire, I*F_unitaire
+
+#______________________________________________________________________________
+
+def ContributionsSegments(cable, B, V):
+    '''
+    Permet de calculer la contribution de chaque segment du câble à la force
+    résultante pour un courant de 1 A et à la tension induite. Les sommes de
+    ces contributions donnent les résultantes de ForceLorentzTotale() ; les
+    garder permet de mettre à jour ces sommes quand seuls quelques segments
+    changent.
+
+    Attributs :
+        - cable (array) (N,3)   Coordonnées des points du câble          [m]
+        - B (array) (N,3)       Champ magnétique aux points du câble     [T]
+        - V (float)             Vitesse de déplacement du câble         [m/s]
+
+    Sorties :
+        - C (array) (N-1,3)     L_i x B_i, force sur chaque segment pour 1 A [N/A]
+        - u (array) (N-1,)      (V x B_i).L_i, tension induite sur chaque segment [V]
+    '''
+    L = -np.diff(cable, axis=-2) # Vecteurs longueurs des segments
+    Bi = B[..., :-1, :]          # Champ magnétique utilisé sur chaque segment
+
+    E = np.cross(np.array([V,0,0]), Bi)
+
+    return np.cross(L, Bi), np.sum(E*L, axis=-1)
+
+#______________________________________________________________________________
+
+def Parametre(r, theta, phi, date, INC, TA, X_cable, Y_cable, Z_cable, I, V, R, modele_champ=None):
     '''
     Permet de calculer la force de Lorentz générée par un câble conducteur, 
     de résistance électrique R, parcouru par un courant I, baigné dans un 
@@ -176,63 +343,53 @@ def Parametre(r, theta, phi, date, INC, TA, X_cable, Y_cable, Z_cable, I, V, R):
         - I (float or None)     Intensité du courant                    [A]
         - V (float)             Vitesse de déplacement du câble         [m/s]
         - R (float)             Résistance électrique du câble          [Ohm]
+        - modele_champ          Modèle de champ magnétique (voir ModeleChamp.py),
+                                par défaut le modèle IGRF est calculé en chaque point
 
     Sortie :
         - F_mag                 Force de Lorentz résultante            [N]
     '''
-    n = len(X_cable) # Nombre de points de discrétisation
-    Cable = []       # Liste des coordonnées des différents points de discrétisation 
-    Bi = [] # Liste du champ magnétique aux différents points
-    V = np.array([V,0,0]) # Vecteur vitesse
-    F_mag = 0 # Force Electrodynamique 
-    Sat = np.array([[r], [theta], [phi]]) # Vecteur position du satellite dans ECEF
-        
-    for i in range(n):
-        Cable.append(np.array([X_cable[i], Y_cable[i], Z_cable[i]]))
-        P = Satellite.Sat2Earth(Cable[i][0], Cable[i][1], Cable[i][2], INC, TA, Sat)
-        B0 = cm.ChampMagnetique(P[0], P[1], P[2], date)
-        B0 = Satellite.Earth2Sat_cm(B0[0], B0[1], B0[2], INC, TA)
-        Bi.append(B0)
-        
-    L = [] # Liste des vecteurs longueurs du câble sur les segments de discrétisation, orientés positivement en direction du satellite
-    l = [] # Liste des normes des segments de discrétisations
-    F_mag_i_vect = np.zeros(3) # Liste des forces EM (x,y,z) pour chaque segment de discrétisation
-    
-    # Cas du courant induit
-    if I == None :
-        U = 0  # Tension dans le câble
-        '''
-        Cette première boucle a pour but de calculer toutes les tensions induites sur les
-        segments de discrétisation, dans le but d'en déduire le courant induit qui parcourt 
-        tout le câble
-        '''
-        for i in range(n-1):
-            L.append(-np.array([Cable[i+1][0]-Cable[i][0], Cable[i+1][1]-Cable[i][1], Cable[i+1][2]-Cable[i][2]]))
-            l.append(np.linalg.norm(L[i]))
-        
-            E = np.cross(V,Bi[i]) # Calcul du champ électrique induit
-            U2 = np.dot(E,L[i])   # Calcul de la tension induite dans le segment i
-            U2 = np.squeeze(U2)
-            U = U + U2
-            
-        I2 = (U/R) # Calcul du courant induit dans le câble
-            
-        'Calcul de la somme des force Electrodynamique sur chaque segments'
-        for i in range(n-1):   
-            In = I2* L[i]/l[i] # Calcul du vecteur courant sur le segment i
-            F_mag_i = l[i]*np.cross(In,Bi[i])
-            F_mag_i_vect = np.vstack((F_mag_i_vect, F_mag_i))
-            F_mag = F_mag + F_mag_i
-           
-    # Cas du courant imposé        
-    else :
-        for i in range(n-1):
-            L.append(-np.array([Cable[i+1][0]-Cable[i][0], Cable[i+1][1]-Cable[i][1], Cable[i+1][2]-Cable[i][2]]))
-            l.append(np.linalg.norm(L[i]))
-
-            In = I*L[i]/l[i] # Calcul du vecteur courant sur le segment i
-            F_mag_i = l[i]*np.cross(In,Bi[i])
-            F_mag_i_vect = np.vstack((F_mag_i_vect, F_mag_i))
-            F_mag = F_mag + F_mag_i
+    Cable = np.column_stack((X_cable, Y_cable, Z_cable)) # Coordonnées des différents points de discrétisation 
+
+    # Champ magnétique aux différents points, en un seul appel
+    with instr.chrono("Parametre.champ"):
+        if modele_champ is None:
+            Bi = cm.ChampMagnetiqueSat(Cable, r, theta, phi, date, INC, TA)
+        else:
+            Bi = modele_champ.evaluer(Cable)
+
+    # Force EM résultante et forces EM (x,y,z) pour chaque segment de discrétisation
+    with instr.chrono("Parametre.force"):
+        F_mag, F_mag_i_vect = ForceLorentz(Cable, Bi, I, V, R)
             
     return F_mag, Bi, F_mag_i_vect
+
+#______________________________________________________________________________
+
+def ParametreInduitImpose(r, theta, phi, date, INC, TA, X_cable, Y_cable, Z_cable, I, V, R, modele_champ=None):
+    '''
+    Équivalent de Parametre() appelée avec I = None puis avec le courant I,
+    mais en calculant une seule fois le champ magnétique et la géométrie du câble.
+
+    Attributs :
+        - mêmes attributs que Parametre(), I étant le courant du cas imposé [A]
+          et modele_champ le modèle de champ magnétique (voir ModeleChamp.py)
+
+    Sorties :
+        - F_induit (array) (3,)          Force de Lorentz résultante, cas induit   [N]
+        - F_impose (array) (3,)          Force de Lorentz résultante, cas imposé   [N]
+        - Bi (array) (N,3)               Champ magnétique aux points du câble      [T]
+        - F_induit_i_vect (array) (N,3)  Force sur chaque segment, cas induit      [N]
+        - F_impose_i_vect (array) (N,3)  Force sur chaque segment, cas imposé      [N]
+    '''
+    Cable = np.column_stack((X_cable, Y_cable, Z_cable)) # Coordonnées des différents points de discrétisation
+
+    # Champ magnétique aux différents points, en un seul appel
+    if modele_champ is None:
+        Bi = cm.ChampMagnetiqueSat(Cable, r, theta, phi, date, INC, TA)
+    else:
+        Bi = modele_champ.evaluer(Cable)
+
+    F_induit, F_induit_i_vect, F_impose, F_impose_i_vect = ForceLorentzInduitImpose(Cable, Bi, I, V, R)
+
+    return F_induit, F_impose, Bi, F_induit_i_vect, F_impose_i_vect
@@ -1,6 +1,3 @@
-import matplotlib.pyplot as plt
-import matplotlib
-matplotlib.use('Qt5Agg')
 import numpy as np
 
 def GraphForce(x, y, cste):
@@ -17,6 +14,11 @@ def GraphForce(x, y, cste):
         - Graphique de la force électromagnétique en fonction de la variable analysée
 
     '''
+    # Bibliothèques d'affichage importées seulement au moment de tracer
+    import matplotlib
+    matplotlib.use('Qt5Agg')
+    import matplotlib.pyplot as plt
+
     if cste == 'diam':
         label = 'Diamètre [mm]'
     elif cste == 'm':
@@ -0,0 +1,200 @@
+import json
+import time
+import threading
+
+'''
+Ce code contient la mesure du temps passé dans chaque phase des calculs
+(chronomètres) et le décompte des opérations coûteuses (compteurs) :
+appels au modèle IGRF, points évalués, évaluations de l'objectif, succès de
+la mémoire des évaluations, etc.
+
+La mesure est désactivée par défaut. Elle ne coûte alors presque rien :
+chrono() retourne un chronomètre nul partagé et les compteurs sont protégés
+par un test de ACTIF dans le code instrumenté. Quand elle est active, les
+mises à jour sont protégées par un verrou, pour les fils d'exécution du mode
+"threads" :
+
+    import Calcul_Force_EM.Instrumentation as instr
+
+    with instr.chrono("apprentissage.selection"):
+        ...
+    if instr.ACTIF:
+        instr.compter("igrf.points", len(points))
+
+- activer() / desactiver() : active ou désactive la mesure
+- reinitialiser() : remet les chronomètres et les compteurs à zéro
+- chrono(nom) : chronomètre à utiliser avec with (les temps s'additionnent)
+- compter(nom, n) : ajoute n au compteur
+- resume() : résultats sous forme de dictionnaire (JSON)
+- fusionner(resume) : ajoute les résultats d'un autre processus
+- tableau() : résultats sous forme de tableau texte
+- sauvegarder(fichier) : enregistre les résultats en JSON
+'''
+
+# Mesure active ou non. À lire par Instrumentation.ACTIF (et non par
+# 'from ... import ACTIF'), pour voir les changements faits par activer()
+ACTIF = False
+
+# Temps total [s] et nombre d'appels de chaque chronomètre, et compteurs
+TEMPS = {}
+APPELS = {}
+COMPTEURS = {}
+
+# Verrou des mises à jour des temps et des compteurs (seulement quand la mesure
+# est active)
+VERROU = threading.Lock()
+
+#______________________________________________________________________________
+
+class Chrono:
+    def __init__(self, nom):
+        '''
+        Chronomètre : ajoute au temps total du nom le temps passé dans le bloc
+        with.
+
+        Attributs :
+            - nom (str)     Nom de la phase mesurée
+        '''
+        self.nom = nom
+
+    def __enter__(self):
+        self.debut = time.perf_counter()
+        return self
+
+    def __exit__(self, *exception):
+        duree = time.perf_counter() - self.debut
+        with VERROU:
+            TEMPS[self.nom] = TEMPS.get(self.nom, 0.0) + duree
+            APPELS[self.nom] = APPELS.get(self.nom, 0) + 1
+
+class ChronoNul:
+    '''
+    Chronomètre qui ne mesure rien, utilisé quand la mesure est désactivée.
+    '''
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        pass
+
+CHRONO_NUL = ChronoNul()
+
+#______________________________________________________________________________
+
+def activer(actif=True):
+    '''
+    Active ou désactive la mesure.
+
+    Attributs :
+        - actif (bool)      Mesure active ou non
+    '''
+    global ACTIF
+    ACTIF = actif
+
+def desactiver():
+    '''
+    Désactive la mesure.
+    '''
+    activer(False)
+
+def reinitialiser():
+    '''
+    Remet tous les chronomètres et les compteurs à zéro.
+    '''
+    with VERROU:
+        TEMPS.clear()
+        APPELS.clear()
+        COMPTEURS.clear()
+
+#______________________________________________________________________________
+
+def chrono(nom):
+    '''
+    Chronomètre à utiliser avec with.
+
+    Attributs :
+        - nom (str)         Nom de la phase mesurée
+
+    Sortie :
+        - Chrono, ou le chronomètre nul si la mesure est désactivée
+    '''
+    if ACTIF:
+        return Chrono(nom)
+    return CHRONO_NUL
+
+def compter(nom, n=1):
+    '''
+    Ajoute n au compteur nom. Dans le code appelé souvent, l'appel est
+    protégé par 'if Instrumentation.ACTIF:'.
+
+    Attributs :
+        - nom (str)         Nom du compteur
+        - n (int)           Valeur à ajouter
+    '''
+    if ACTIF:
+        with VERROU:
+            COMPTEURS[nom] = COMPTEURS.get(nom, 0) + n
+
+#______________________________________________________________________________
+
+def resume():
+    '''
+    Résultats de la mesure.
+
+    Sortie :
+        - (dict)    "temps" : temps total [s] et nombre d'appels de chaque
+                    chronomètre, "compteurs" : valeur de chaque compteur
+    '''
+    with VERROU:
+        return {"temps": {nom: {"total": TEMPS[nom], "appels": APPELS[nom]} for nom in sorted(TEMPS)},
+                "compteurs": {nom: COMPTEURS[nom] for nom in sorted(COMPTEURS)}}
+
+def fusionner(resultats):
+    '''
+    Ajoute aux chronomètres et aux compteurs les résultats de la mesure faite
+    dans un autre processus (processus de travail, voir executeurs.py). Les
+    temps des processus s'additionnent : en parallèle, ils peuvent dépasser
+    le temps écoulé.
+
+    Attributs :
+        - resultats (dict)  Résultats de l'autre processus (voir resume())
+    '''
+    with VERROU:
+        for nom, temps in resultats["temps"].items():
+            TEMPS[nom] = TEMPS.get(nom, 0.0) + temps["total"]
+            APPELS[nom] = APPELS.get(nom, 0) + temps["appels"]
+        for nom, valeur in resultats["compteurs"].items():
+            COMPTEURS[nom] = COMPTEURS.get(nom, 0) + valeur
+
+def tableau():
+    '''
+    Résultats de la mesure sous forme de tableau texte : temps total, nombre
+    d'appels et temps moyen par appel de chaque chronomètre, puis les
+    compteurs.
+
+    Sortie :
+        - (str)     Le tableau
+    '''
+    resultats = resume()
+
+    lignes = [" {:<40s} {:>12s} {:>10s} {:>14s}".format("Phase", "total [s]", "appels", "moyenne [ms]")]
+    for nom, temps in resultats["temps"].items():
+        lignes.append(" {:<40s} {:>12.4f} {:>10d} {:>14.4f}".format(nom, temps["total"], temps["appels"],
+                                                                   temps["total"] / temps["appels"] * 1e3))
+
+    lignes.append("")
+    lignes.append(" {:<40s} {:>12s}".format("Compteur", "valeur"))
+    for nom, valeur in resultats["compteurs"].items():
+        lignes.append(" {:<40s} {:>12d}".format(nom, valeur))
+
+    return "\n".join(lignes)
+
+def sauvegarder(fichier):
+    '''
+    Enregistre les résultats de la mesure en JSON.
+
+    Attributs :
+        - fichier (str)     Chemin du fichier
+    '''
+    with open(fichier, "w", encoding="utf-8") as f:
+        json.dump(resume(), f, ensure_ascii=False, indent=2)
@@ -0,0 +1,293 @@
+import os
+import hashlib
+import secrets
+import numpy as np
+import Calcul_Force_EM.ChampMagnetique as cm
+from Calcul_Force_EM import ppigrf
+
+'''
+Ce code contient des modèles du champ magnétique terrestre au voisinage du
+satellite, exprimé dans le repère du satellite.
+
+Chaque modèle possède une fonction evaluer(cable) qui donne le champ magnétique
+(N,3) aux points (N,3) du câble, ou (P,N,3) pour les points de P câbles évalués
+en un seul appel, et une borne d'erreur par rapport au calcul
+complet du modèle IGRF en chacun des points. La borne d'erreur relative est,
+pour tous les modèles, la borne d'erreur divisée par la norme du champ au
+satellite.
+
+- ChampIGRF : calcul complet du modèle IGRF en chaque point (référence)
+
+- ChampTaylor : développement au premier ordre autour du satellite. Le champ et
+  son gradient ne sont calculés qu'une fois, puis le champ en chaque point est
+  obtenu par un produit matrice-vecteur
+
+- TuileChamp : le champ est précalculé sur une grille 3D couvrant le cube qui
+  contient le câble, puis interpolé linéairement (interpolation trilinéaire).
+  La grille peut être enregistrée dans un dossier (DOSSIER_TUILES, réglé par
+  l'option --dossier-tuiles ou le paramètre dossier_tuiles d'apprentissage())
+  et relue en mémoire partagée (np.load avec mmap_mode) lors des sessions
+  suivantes
+
+La fonction ModeleChamp() construit le modèle demandé, et garde en mémoire les
+modèles déjà construits pour une même position du satellite.
+'''
+
+#______________________________________________________________________________
+
+class ChampIGRF:
+    def __init__(self, r, theta, phi, date, INC, TA):
+        '''
+        Modèle de référence : le champ magnétique est calculé par le modèle
+        IGRF en chacun des points du câble.
+
+        Attributs :
+            - r (float)         Coordonnée selon r du satellite         [km]
+            - theta (float)     Coordonnée selon θ du satellite         [deg]
+            - phi (float)       Coordonnée selon φ du satellite         [deg]
+            - date (datetime)   Date de calcul
+            - INC (float)       Inclinaison de l'orbite du satellite    [deg]
+            - TA (float)        Anomalie vraie du satellite             [deg]
+        '''
+        self.r = r
+        self.theta = theta
+        self.phi = phi
+        self.date = date
+        self.INC = INC
+        self.TA = TA
+        self.borne_erreur = 0.0          # [T]
+        self.borne_erreur_relative = 0.0
+
+    def evaluer(self, cable):
+        '''
+        Attributs :
+            - cable (array) (N,3)   Coordonnées des points dans le repère du satellite [m]
+
+        Sortie :
+            - B (array) (N,3)       Champ magnétique aux points, dans le repère du satellite [T]
+        '''
+        return cm.ChampMagnetiqueSat(cable, self.r, self.theta, self.phi, self.date, self.INC, self.TA)
+
+#______________________________________________________________________________
+
+class ChampTaylor(ChampIGRF):
+    def __init__(self, r, theta, phi, date, INC, TA, rayon=500, pas=10):
+        '''
+        Développement au premier ordre du champ magnétique autour du satellite :
+
+            B(x) = B0 + J.x
+
+        B0 et la matrice jacobienne J sont calculés par différences finies
+        centrées, avec un seul appel au modèle IGRF (7 points).
+
+        La borne d'erreur est estimée en comparant le développement au calcul
+        IGRF complet sur la sphère de rayon 'rayon' (26 directions), là où
+        l'erreur, qui croît comme le carré de la distance, est la plus grande.
+        La borne relative est rapportée au champ au satellite (B0).
+
+        Attributs :
+            - r, theta, phi, date, INC, TA : voir ChampIGRF
+            - rayon (float)     Distance max des points du câble au satellite [m]
+            - pas (float)       Pas des différences finies                    [m]
+        '''
+        ChampIGRF.__init__(self, r, theta, phi, date, INC, TA)
+        self.rayon = rayon
+
+        # Champ au satellite et de part et d'autre de celui-ci selon x, y et z
+        P = np.vstack((np.zeros(3), np.eye(3)*pas, -np.eye(3)*pas))
+        B = ChampIGRF.evaluer(self, P)
+
+        self.B0 = B[0]                           # [T]
+        self.gradient = (B[1:4] - B[4:7]).T/(2*pas) # [T/m] gradient[i, j] = dB_i/dx_j
+
+        # Directions des sommets, arêtes et faces d'un cube, ramenées sur la sphère
+        directions = np.array([[i, j, k] for i in (-1, 0, 1) for j in (-1, 0, 1) for k in (-1, 0, 1)
+                               if (i, j, k) != (0, 0, 0)], dtype=float)
+        points = rayon*directions/np.linalg.norm(directions, axis=1)[:, np.newaxis]
+        ecart = ChampIGRF.evaluer(self, points) - self.evaluer(points)
+
+        self.borne_erreur = np.max(np.linalg.norm(ecart, axis=1))               # [T]
+        self.borne_erreur_relative = self.borne_erreur/np.linalg.norm(self.B0)
+
+    def evaluer(self, cable):
+        '''
+        Attributs :
+            - cable (array) (N,3)   Coordonnées des points dans le repère du satellite [m]
+
+        Sortie :
+            - B (array) (N,3)       Champ magnétique approché aux points, dans le repère du satellite [T]
+        '''
+        cable = np.asarray(cable, dtype=float)
+        return self.B0 + np.dot(cable, self.gradient.T)
+
+    def erreur(self, cable):
+        '''
+        Permet de connaitre l'erreur réelle du développement aux points donnés,
+        en les évaluant aussi avec le modèle IGRF complet.
+
+        Attributs :
+            - cable (array) (N,3)   Coordonnées des points dans le repère du satellite [m]
+
+        Sortie :
+            - erreur (float)        Écart max entre le champ approché et le champ IGRF [T]
+        '''
+        cable = np.asarray(cable, dtype=float).reshape((-1, 3))
+        ecart = ChampIGRF.evaluer(self, cable) - self.evaluer(cable)
+        return np.max(np.linalg.norm(ecart, axis=1))
+
+#______________________________________________________________________________
+
+class TuileChamp(ChampIGRF):
+    def __init__(self, r, theta, phi, date, INC, TA, rayon=500, nb_noeuds=17, dossier=None):
+        '''
+        Champ magnétique précalculé sur une grille régulière de nb_noeuds^3
+        points couvrant le cube [-rayon, rayon]^3 autour du satellite, puis
+        interpolé de façon trilinéaire. Les points hors du cube sont ramenés
+        sur ses faces.
+
+        Si un dossier est donné, la grille y est enregistrée au format .npy
+        sous un nom qui dépend des paramètres de l'orbite et de la grille. Si
+        le fichier existe déjà, il est relu en mémoire partagée au lieu d'être
+        recalculé.
+
+        La borne d'erreur est estimée en comparant l'interpolation au calcul
+        IGRF complet en 64 points tirés dans la boule de rayon 'rayon'. La
+        borne relative est rapportée au champ au satellite.
+
+        Attributs :
+            - r, theta, phi, date, INC, TA : voir ChampIGRF
+            - rayon (float)     Demi-côté du cube couvert par la grille   [m]
+            - nb_noeuds (int)   Nombre de nœuds de la grille par axe      []
+            - dossier (str)     Dossier où enregistrer les grilles (optionnel)
+        '''
+        ChampIGRF.__init__(self, r, theta, phi, date, INC, TA)
+        self.rayon = rayon
+        self.nb_noeuds = nb_noeuds
+        self.pas = 2*rayon/(nb_noeuds - 1) # [m]
+        self.fichier = None
+
+        if dossier is not None:
+            self.fichier = os.path.join(dossier, "tuile_" + self.cle() + ".npy")
+
+        if self.fichier is not None and os.path.exists(self.fichier):
+            self.grille = np.load(self.fichier, mmap_mode="r")
+        else:
+            # Champ aux nœuds de la grille, en un seul appel au modèle IGRF
+            x = np.linspace(-rayon, rayon, nb_noeuds)
+            noeuds = np.stack(np.meshgrid(x, x, x, indexing="ij"), axis=-1).reshape((-1, 3))
+            self.grille = ChampIGRF.evaluer(self, noeuds).reshape((nb_noeuds, nb_noeuds, nb_noeuds, 3))
+
+            if self.fichier is not None:
+                # Écriture dans un fichier temporaire propre à cet appel (processus et suffixe aléatoire) puis
+                # renommage, pour ne jamais laisser de fichier incomplet, même si plusieurs processus ou fils
+                # calculent la même tuile en même temps
+                os.makedirs(dossier, exist_ok=True)
+                temporaire = self.fichier + "." + str(os.getpid()) + "_" + secrets.token_hex(4) + ".tmp.npy"
+                try:
+                    np.save(temporaire, self.grille)
+                    os.replace(temporaire, self.fichier)
+                except BaseException:
+                    if os.path.exists(temporaire):
+                        os.remove(temporaire)
+                    raise
+
+        # Estimation de l'erreur d'interpolation, et champ au satellite (premier point) comme référence de l'erreur
+        # relative, comme pour ChampTaylor
+        points = np.random.default_rng(0).normal(size=(64, 3))
+        points = rayon*points/np.linalg.norm(points, axis=1)[:, np.newaxis]*np.random.default_rng(1).random((64, 1))**(1/3)
+        B = ChampIGRF.evaluer(self, np.vstack((np.zeros(3), points)))
+        ecart = B[1:] - self.evaluer(points)
+
+        self.borne_erreur = np.max(np.linalg.norm(ecart, axis=1))                        # [T]
+        self.borne_erreur_relative = self.borne_erreur/np.linalg.norm(B[0])
+
+    def cle(self):
+        '''
+        Permet d'obtenir un identifiant des paramètres de l'orbite et de la grille,
+        et des coefficients du modèle IGRF, utilisé pour nommer le fichier de la
+        tuile. Une tuile calculée avec un autre fichier de coefficients (.shc)
+        n'est donc pas relue.
+
+        Sortie :
+            - cle (str)     Empreinte hexadécimale des paramètres
+        '''
+        parametres = repr((float(self.r), float(self.theta), float(self.phi), str(self.date),
+                           float(self.INC), float(self.TA), float(self.rayon), int(self.nb_noeuds)))
+        empreinte = hashlib.sha1(parametres.encode())
+        with open(ppigrf.shc_fn, "rb") as f:
+            empreinte.update(f.read())
+        return empreinte.hexdigest()[:16]
+
+    def evaluer(self, cable):
+        '''
+        Attributs :
+            - cable (array) (N,3)   Coordonnées des points dans le repère du satellite [m]
+
+        Sortie :
+            - B (array) (N,3)       Champ magnétique interpolé aux points, dans le repère du satellite [T]
+        '''
+        cable = np.asarray(cable, dtype=float)
+        forme = cable.shape
+        cable = cable.reshape((-1, 3))
+
+        # Position des points en nombre de pas depuis le coin de la grille
+        u = np.clip((cable + self.rayon)/self.pas, 0, self.nb_noeuds - 1)
+        i0 = np.minimum(u.astype(int), self.nb_noeuds - 2)
+        f = u - i0
+
+        # Somme pondérée des champs aux 8 sommets de la cellule de chaque point
+        B = np.zeros_like(cable)
+        for dx in (0, 1):
+            wx = f[:, 0] if dx else 1 - f[:, 0]
+            for dy in (0, 1):
+                wy = f[:, 1] if dy else 1 - f[:, 1]
+                for dz in (0, 1):
+                    wz = f[:, 2] if dz else 1 - f[:, 2]
+                    B += (wx*wy*wz)[:, np.newaxis]*self.grille[i0[:, 0] + dx, i0[:, 1] + dy, i0[:, 2] + dz]
+
+        return B.reshape(forme)
+
+#______________________________________________________________________________
+
+# Modèles déjà construits, selon leur nom et la position du satellite
+_modeles = {}
+
+MODELES = {"igrf": ChampIGRF,
+           "taylor": ChampTaylor,
+           "tuile": TuileChamp}
+
+# Dossier où enregistrer les tuiles de champ (None : pas d'enregistrement)
+DOSSIER_TUILES = None
+
+def ModeleChamp(nom, r, theta, phi, date, INC, TA, rayon=500, dossier=None):
+    '''
+    Permet d'obtenir un modèle de champ magnétique autour du satellite. Un
+    modèle n'est construit qu'une fois pour une position de satellite donnée.
+
+    Attributs :
+        - nom (str)         Nom du modèle : "igrf", "taylor" ou "tuile"
+        - r, theta, phi, date, INC, TA : voir ChampIGRF
+        - rayon (float)     Distance max des points du câble au satellite [m]
+        - dossier (str)     Dossier où enregistrer les tuiles (par défaut DOSSIER_TUILES)
+
+    Sortie :
+        - modele            Modèle de champ magnétique (ChampIGRF, ChampTaylor ou TuileChamp)
+    '''
+    if nom not in MODELES:
+        raise Exception("Modèle de champ magnétique inconnu : " + str(nom) + ". Modèles disponibles : " + ", ".join(MODELES))
+
+    if nom == "igrf":
+        cle = (nom, r, theta, phi, date, INC, TA)
+    else:
+        cle = (nom, r, theta, phi, date, INC, TA, rayon)
+
+    if cle not in _modeles:
+        if nom == "igrf":
+            _modeles[cle] = ChampIGRF(r, theta, phi, date, INC, TA)
+        elif nom == "tuile":
+            _modeles[cle] = TuileChamp(r, theta, phi, date, INC, TA, rayon,
+                                       dossier=DOSSIER_TUILES if dossier is None else dossier)
+        else:
+            _modeles[cle] = MODELES[nom](r, theta, phi, date, INC, TA, rayon)
+
+    return _modeles[cle]
@@ -1,5 +1,127 @@
 import numpy as np
 from math import cos, sin, pi
+from functools import lru_cache
+
+'''
+Les fonctions *_lot() effectuent les mêmes changements de coordonnées que leurs
+équivalents scalaires, mais pour un tableau (N,3) de points ou de vecteurs.
+Les fonctions scalaires ne sont plus que des appels à ces fonctions pour un point.
+
+La matrice de passage ne dépend que de INC et TA : elle est gardée en mémoire
+pour chaque couple (INC, TA). Elle est orthogonale, son inverse est donc sa
+transposée.
+'''
+
+@lru_cache(maxsize=64)
+def MatricePassage(INC, TA):
+    '''
+    Permet de construire la matrice de passage entre les coordonnées sphériques
+    du repère ECEF et les coordonnées cartésiennes du repère du satellite.
+
+    - C'est la matrice utilisée par Earth2Sat(), Earth2Sat_cm() et, transposée,
+      par Sat2Earth() et Sat2Earth_cm()
+
+    - La matrice retournée est partagée entre les appels : elle est en lecture seule
+
+    Attributs :
+        - INC (float)       Inclinaison de l'orbite du satellite             [deg]
+        - TA (float)        Anomalie vraie du satellite                      [deg]
+
+    Sortie :
+        - R (array) (3,3)   Matrice de passage Sphérique vers Cartésien Sat
+    '''
+    INC = INC*pi/180 # [rad]
+    TA = TA*pi/180   # [rad]
+
+    R = np.array([[0, -sin(-INC*sin(TA)), cos(-INC*sin(TA))],
+                  [0, -cos(-INC*sin(TA)), -sin(-INC*sin(TA))],
+                  [1, 0, 0]])
+    R.flags.writeable = False
+
+    return R
+
+#______________________________________________________________________________
+
+
+def Sat2Earth_lot(cable, INC, TA, Sat):
+    '''
+    Équivalent de Sat2Earth() pour un ensemble de points
+
+    Attributs :
+        - cable (array) (N,3) Coordonnées des points dans le repère du satellite [m]
+        - INC (float)         Inclinaison de l'orbite du satellite              [deg]
+        - TA (float)          Anomalie vraie du satellite                       [deg]
+        - Sat (array) (3,)    Vecteur position du satellite dans ECEF
+                              (coordonnées sphérique) (r,θ,φ)       [km],[deg],[deg]
+
+    Sortie :
+        - P (array) (N,3)     Coordonnées (r,θ,φ) des points dans le repère ECEF [km],[deg],[deg]
+    '''
+    R = MatricePassage(INC, TA)
+    cable = np.asarray(cable, dtype=float).reshape((-1, 3))
+
+    return np.dot(cable*10**-3, R) + np.ravel(Sat) # [km] (P.R2^T = P.R)
+
+#______________________________________________________________________________
+
+def Earth2Sat_lot(P, INC, TA, Sat):
+    '''
+    Équivalent de Earth2Sat() pour un ensemble de points
+
+    Attributs :
+        - P (array) (N,3)     Coordonnées (r,θ,φ) des points dans le repère ECEF [km],[deg],[deg]
+        - INC (float)         Inclinaison de l'orbite du satellite              [deg]
+        - TA (float)          Anomalie vraie du satellite                       [deg]
+        - Sat (array) (3,)    Vecteur position du satellite dans ECEF
+                              (coordonnées sphérique) (r,θ,φ)       [km],[deg],[deg]
+
+    Sortie :
+        - cable (array) (N,3) Coordonnées des points dans le repère du satellite [m]
+    '''
+    R = MatricePassage(INC, TA)
+    P = np.asarray(P, dtype=float).reshape((-1, 3))
+
+    return np.dot(P - np.ravel(Sat), R.T)*10**-3 # [m]
+
+#______________________________________________________________________________
+
+def Earth2Sat_cm_lot(B, INC, TA):
+    '''
+    Équivalent de Earth2Sat_cm() pour un ensemble de vecteurs
+
+    Attributs :
+        - B (array) (N,3)     Composantes (r,θ,φ) des vecteurs dans le repère ECEF
+        - INC (float)         Inclinaison de l'orbite du satellite              [deg]
+        - TA (float)          Anomalie vraie du satellite                       [deg]
+
+    Sortie :
+        - B_sat (array) (N,3) Composantes (X,Y,Z) des vecteurs dans le repère du satellite
+    '''
+    R = MatricePassage(INC, TA)
+    B = np.asarray(B, dtype=float).reshape((-1, 3))
+
+    return np.dot(B, R.T)
+
+#______________________________________________________________________________
+
+def Sat2Earth_cm_lot(cable, INC, TA):
+    '''
+    Équivalent de Sat2Earth_cm() pour un ensemble de points
+
+    Attributs :
+        - cable (array) (N,3) Coordonnées des points dans le repère du satellite [m]
+        - INC (float)         Inclinaison de l'orbite du satellite              [deg]
+        - TA (float)          Anomalie vraie du satellite                       [deg]
+
+    Sortie :
+        - P (array) (N,3)     Coordonnées (r,θ,φ) des points dans le repère ECEF [km],[deg],[deg]
+    '''
+    R = MatricePassage(INC, TA)
+    cable = np.asarray(cable, dtype=float).reshape((-1, 3))
+
+    return np.dot(cable*10**-3, R) # [km]
+
+#______________________________________________________________________________
 
 def Sat2Earth(X, Y, Z, INC, TA, Sat):
     '''
@@ -25,19 +147,7 @@ def Sat2Earth(X, Y, Z, INC, TA, Sat):
         - theta (float)     Coordonnée selon θ du point dans le repère ECEF  [deg]
         - phi (float)       Coordonnée selon φ du point dans le repère ECEF  [deg]
     '''
-    INC = INC*pi/180 # [rad]
-    TA = TA*pi/180   # [rad]
-        
-    P = np.array([[X*10**-3],[Y*10**-3],[Z*10**-3]]) # [km] Vecteur position du point dans le repère du satellite
-        
-    # Matrice de passage Sphérique vers Cartésien Sat
-    R = np.array([[0, -sin(-INC*sin(TA)), cos(-INC*sin(TA))],
-                  [0, -cos(-INC*sin(TA)), -sin(-INC*sin(TA))],
-                  [1, 0, 0]])
-    R2 = np.linalg.inv(R) # Matrice de passage Cartésien Sat vers Sphérique
-        
-    # Coordonnées du point P dans le repère Sphérique 
-    [[r],[theta],[phi]] = np.dot(R2,P) + Sat # [km] Vecteur position du point dans le repère terrestre fixe
+    [r, theta, phi] = Sat2Earth_lot([X, Y, Z], INC, TA, Sat)[0] # [km] Vecteur position du point dans le repère terrestre fixe
         
     return r, theta, phi
 
@@ -66,20 +176,9 @@ def Earth2Sat(r, theta, phi, INC, TA, Sat):
         - Y (float)         Ordonnée du point dans le repère du satellite    [m]
         - Z (float)         Côte du point dans le repère du satellite        [m]
     '''
-    INC = INC*pi/180 # [rad]
-    TA = TA*pi/180   # [rad]
-
-    P = np.array([[r],[theta],[phi]]) # Vecteur position du point dans le repère terrestre fixe
-        
-    # Matrice de passage Sphérique vers Cartésien Sat
-    R = np.array([[0, -sin(-INC*sin(TA)), cos(-INC*sin(TA))],
-                  [0, -cos(-INC*sin(TA)), -sin(-INC*sin(TA))],
-                  [1, 0, 0]])
-        
-    # Coordonnées du point P dans le repère du satellite
-    [[X],[Y],[Z]] = np.dot(R,P-Sat)
+    [X, Y, Z] = Earth2Sat_lot([r, theta, phi], INC, TA, Sat)[0] # Coordonnées du point P dans le repère du satellite
 
-    return X*10**-3, Y*10**-3, Z*10**-3 # [m]
+    return X, Y, Z # [m]
 
 #______________________________________________________________________________
 
@@ -104,18 +203,7 @@ def Earth2Sat_cm(r, theta, phi, INC, TA):
         - Y (float)         Ordonnée du point dans le repère du satellite    [m]
         - Z (float)         Côte du point dans le repère du satellite        [m]
     '''
-    INC = INC*pi/180 # [rad]
-    TA = TA*pi/180   # [rad]
-
-    P = np.array([[r],[theta],[phi]]) # Vecteur position du point dans le repère terrestre fixe
-        
-    # Matrice de passage Sphérique vers Cartésien Sat
-    R = np.array([[0, -sin(-INC*sin(TA)), cos(-INC*sin(TA))],
-                  [0, -cos(-INC*sin(TA)), -sin(-INC*sin(TA))],
-                  [1, 0, 0]])
-
-    # Coordonnées du point P dans le repère du satellite
-    [[X],[Y],[Z]] = np.dot(R,P)
+    [X, Y, Z] = Earth2Sat_cm_lot([r, theta, phi], INC, TA)[0] # Coordonnées du point P dans le repère du satellite
 
     return X, Y, Z # [m]
 
@@ -142,20 +230,7 @@ def Sat2Earth_cm(X, Y, Z, INC, TA):
         - r (float)         Coordonnée selon r du point dans le repère ECEF  [km]
         - theta (float)     Coordonnée selon θ du point dans le repère ECEF  [deg]
         - phi (float)       Coordonnée selon φ du point dans le repère ECEF  [deg]
-    '''  
-    INC = INC*pi/180 # [rad]
-    TA = TA*pi/180   # [rad]
-        
-    P = np.array([[X*10**-3],[Y*10**-3],[Z*10**-3]]) # [km] Vecteur position du point dans le repère du satellite
-        
-    # Matrice de passage Sphérique vers Cartésien Sat
-    R = np.array([[0, -sin(-INC*sin(TA)), cos(-INC*sin(TA))],
-                  [0, -cos(-INC*sin(TA)), -sin(-INC*sin(TA))],
-                  [1, 0, 0]])
-    R2 = np.linalg.inv(R) # Matrice de passage Cartésien Sat vers Sphérique
-        
-    # Coordonnées du point P dans le repère Sphérique 
-    [[r],[theta],[phi]] = np.dot(R2,P) # [km] Vecteur position du point dans le repère terrestre fixe
+    '''
+    [r, theta, phi] = Sat2Earth_cm_lot([X, Y, Z], INC, TA)[0] # [km] Vecteur position du point dans le repère terrestre fixe
         
     return r, theta, phi
-
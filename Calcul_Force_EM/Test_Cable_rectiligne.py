@@ -1,6 +1,5 @@
 import numpy as np
 from datetime import datetime
-from astropy import constants
 from math import pi
 
 import Force_Electro as fe
@@ -8,6 +7,7 @@ import ChampMagnetique as cm
 import Satellite
 import Cable as ca
 from Materiaux import Al_2024
+from Constantes import R_T, M_T, G
 
 #%% Caractéristiques du matériau
 Al = Al_2024()
@@ -15,9 +15,6 @@ rho = Al.MasseVolumique() # [kg/m^3] Masse volumique
 res = Al.Resistivite()    # [Ohm.m] Résistivité électrique du matériaux
 
 # Constantes
-R_T = constants.R_earth.value # [m] Rayon de la Terre
-M_T = constants.M_earth.value # [kg] Masse de la Terre
-G = constants.G.value # [m^3/kg/s²] Constante Universelle de Gravitation
 mu = G * M_T # [m^3/s²] Paramètre Gravitationnel Standard de la Terre
 
 # Caractéristiques du câble
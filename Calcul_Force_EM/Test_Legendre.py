@@ -0,0 +1,38 @@
+"""
+Code qui permet de vérifier que la fonction get_legendre() de 'ppigrf.py'
+donne les mêmes résultats que l'implémentation d'origine get_legendre_dict(),
+puis de comparer le temps de calcul des deux implémentations
+"""
+
+import numpy as np
+from timeit import timeit
+import ppigrf
+
+# Degrés et ordres des coefficients du modèle IGRF
+keys = ppigrf.load_shc().keys
+
+#%% Équivalence numérique ______________________________________________________
+
+theta = np.linspace(0, 180, 1001) # [deg] Colatitudes de test, pôles inclus
+
+P, dP = ppigrf.get_legendre(theta, keys)
+P_ref, dP_ref = ppigrf.get_legendre_dict(theta, keys)
+
+np.testing.assert_allclose(P, P_ref, rtol=1e-12, atol=1e-14)
+np.testing.assert_allclose(dP, dP_ref, rtol=1e-12, atol=1e-14)
+
+print(' ________________________________________')
+print(' Écart max sur P  : ', np.max(np.abs(P - P_ref)))
+print(' Écart max sur dP : ', np.max(np.abs(dP - dP_ref)))
+
+#%% Temps de calcul ____________________________________________________________
+
+print(' ________________________________________')
+print(' Nombre de points    get_legendre    get_legendre_dict')
+for n_points in [1, 31, 1000, 10000]:
+    theta = np.random.rand(n_points) * 180
+    nb = max(1, 2000 // n_points)
+    t = timeit(lambda: ppigrf.get_legendre(theta, keys), number=nb) / nb
+    t_ref = timeit(lambda: ppigrf.get_legendre_dict(theta, keys), number=nb) / nb
+    print(' {:>16d}    {:>9.3f} ms    {:>14.3f} ms'.format(n_points, t * 1e3, t_ref * 1e3))
+print(' ________________________________________')
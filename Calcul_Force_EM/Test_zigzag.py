@@ -1,22 +1,20 @@
 import numpy as np
+import matplotlib.pyplot as plt
 from matplotlib.ticker import MaxNLocator
 from datetime import datetime
 from math import pi
-from astropy import constants
 
 import Force_Electro as fe
 import ChampMagnetique as cm
 import Cable as ca
 import Satellite
 from Materiaux import Al_2024
+from Constantes import R_T, M_T, G
 from Cable import *
 from Geometrie_fct import *
 #%% Données____________________________________________________________________
 
 # Constantes
-R_T = constants.R_earth.value # [m] Rayon de la Terre
-M_T = constants.M_earth.value # [kg] Masse de la Terre
-G = constants.G.value # [m^3/kg/s²] Constante Universelle de Gravitation
 mu = G * M_T # [m^3/s²] Paramètre Gravitationnel Standard de la Terre
 
 # Caractéristiques du matériau
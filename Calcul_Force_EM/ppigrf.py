@@ -61,7 +61,12 @@ Helper functions
 is_leapyear          - Check if year is leapyear
 yearfrac_to_datetime - Convert fraction of year to datetime
 get_legendre         - Calculate Legendre functions
+get_legendre_dict    - Calculate Legendre functions (original dict-based version)
 read_shc             - Read spherical harmonic coefficient file
+load_shc             - Read .shc file through the process-wide coefficient cache
+preload              - Load a .shc file into the coefficient cache ahead of time
+invalidate           - Drop one or all files from the coefficient cache
+get_coefficients     - Gauss coefficients interpolated at given date(s), memoized per epoch
 geod2geoc            - Convert from geodetic to geocentric coordinates
 geoc2geod            - Convert from geocentric to geodetic coordinates
 
@@ -73,8 +78,9 @@ igrf                 - Calculate IGRF model values (geodetic input/output)
 """
 
 import numpy as np
-import pandas as pd
 import os
+from collections import namedtuple, OrderedDict
+from functools import lru_cache
 
 basepath = os.path.dirname(__file__)
 shc_fn = basepath + '/IGRF14.shc' # Default shc file
@@ -88,6 +94,16 @@ RE = 6371.2 # km
 WGS84_e2 = 0.00669437999014
 WGS84_a  = 6378.137 # km
 
+# Parsed coefficient files, keyed by absolute path. Each entry holds the file
+# modification time it was read at, so that an edited file is read again.
+SHCCoefficients = namedtuple('SHCCoefficients', ['times', 'keys', 'n', 'm', 'g', 'h'])
+_shc_cache = {}
+
+# Coefficients interpolated at a given epoch, keyed by (path, mtime, epoch in
+# ns). Least recently used entries are evicted above EPOCH_CACHE_SIZE.
+EPOCH_CACHE_SIZE = 256
+_epoch_cache = OrderedDict()
+
 
 
 def is_leapyear(year):
@@ -135,6 +151,8 @@ def yearfrac_to_datetime(fracyear):
         Array of datetimes
     """
 
+    import pandas as pd # imported here, since it is only needed to read the coefficient file
+
     year = np.uint16(fracyear) # truncate fracyear to get year
     # use pandas to_timedelta to represent time since beginning of year: 
     delta_year = pd.to_timedelta((fracyear - year)*(365 + is_leapyear(year)), unit = 'D')
@@ -145,10 +163,13 @@ def yearfrac_to_datetime(fracyear):
     return (start_year + delta_year).to_pydatetime()
 
 
-def get_legendre(theta, keys):
+def get_legendre_dict(theta, keys):
     """ 
     Calculate Schmidt semi-normalized associated Legendre functions
 
+    Original implementation, with one array per (n, m) stored in dicts. It is
+    kept as a reference for get_legendre (tests and benchmarks).
+
     Calculations based on recursive algorithm found in "Spacecraft Attitude Determination and Control" by James Richard Wertz
     
     Parameters
@@ -226,6 +247,108 @@ def get_legendre(theta, keys):
     return Pmat, dPmat    
 
 
+@lru_cache(maxsize = 16)
+def _legendre_layout(keys):
+    """
+    Precompute what get_legendre needs for a given list of keys
+
+    Parameters
+    ----------
+    keys : tuple
+        tuple of (n, m) int tuples
+
+    Returns
+    -------
+    nmax : int
+        maximum degree
+    mmax : int
+        maximum order
+    K : array
+        recursion coefficients Knm, shape (nmax + 1, nmax + 1)
+    S : array
+        Schmidt normalization factors of each key, shape (len(keys), 1)
+    index : array
+        flat index of each key in a (nmax + 1)*(nmax + 1) table
+    """
+    n, m = np.array(keys).T
+    nmax, mmax = int(np.max(n)), int(np.max(m))
+
+    K = np.zeros((nmax + 1, nmax + 1))
+    S = np.zeros((nmax + 1, nmax + 1))
+    S[0, 0] = 1.
+    for n in range(1, nmax + 1):
+        for m in range(0, min([n + 1, mmax + 1])):
+            if n > 1:
+                K[n, m] = ((n - 1)**2 - m**2) / ((2*n - 1)*(2*n - 3))
+
+            if m == 0:
+                S[n, 0] = S[n - 1, 0] * (2.*n - 1)/n
+            else:
+                S[n, m] = S[n, m - 1] * np.sqrt((n - m + 1)*(int(m == 1) + 1.)/(n + m))
+
+    index = np.array([key[0] * (nmax + 1) + key[1] for key in keys])
+
+    return nmax, mmax, K, S.flatten()[index, np.newaxis], index
+
+
+def get_legendre(theta, keys):
+    """ 
+    Calculate Schmidt semi-normalized associated Legendre functions
+
+    Calculations based on recursive algorithm found in "Spacecraft Attitude Determination and Control" by James Richard Wertz
+
+    The recursion runs over degree n only: all orders m of a given degree
+    are updated at once in a single (nmax + 1, nmax + 1, n_points) buffer.
+    Normalization factors and recursion coefficients are computed once per
+    set of keys. Results are the same as get_legendre_dict.
+    
+    Parameters
+    ----------
+    theta : array
+        Array of colatitudes in degrees
+    keys: iterable
+        list of spherical harmnoic degree and order, tuple (n, m) for each 
+        term in the expansion
+
+    Returns
+    -------
+    P : array 
+        Array of Legendre functions, with shape (theta.size, len(keys)). 
+    dP : array
+        Array of dP/dtheta, with shape (theta.size, len(keys))
+    """
+    keys = tuple((int(key[0]), int(key[1])) for key in keys)
+    nmax, mmax, K, S, index = _legendre_layout(keys)
+
+    theta_rad = np.radians(np.asarray(theta, dtype = np.float64).flatten())
+    sinth = np.sin(theta_rad)
+    costh = np.cos(theta_rad)
+
+    P  = np.zeros((nmax + 1, nmax + 1, theta_rad.size))
+    dP = np.zeros((nmax + 1, nmax + 1, theta_rad.size))
+    P[0, 0] = 1.
+
+    for n in range(1, nmax + 1):
+        # orders m < n (Knm is zero for n = 1 and for m = n - 1)
+        k = min(n, mmax + 1)
+        Knm = K[n, :k, np.newaxis]
+        np.multiply(costh, P[n - 1, :k], out = P[n, :k])
+        P[n, :k] -= Knm * P[n - 2, :k]
+        np.multiply(costh, dP[n - 1, :k], out = dP[n, :k])
+        dP[n, :k] -= sinth * P[n - 1, :k]
+        dP[n, :k] -= Knm * dP[n - 2, :k]
+
+        # order m = n
+        if n <= mmax:
+            P[n, n]  = sinth * P[n - 1, n - 1]
+            dP[n, n] = sinth * dP[n - 1, n - 1] + costh * P[n - 1, n - 1]
+
+    # collect the requested terms and apply Schmidt normalization
+    Pmat  = P.reshape((-1, theta_rad.size))[index] * S
+    dPmat = dP.reshape((-1, theta_rad.size))[index] * S
+    return Pmat.T, dPmat.T
+
+
 def read_shc(filename = shc_fn):
     """ 
     Read .shc (spherical harmonic coefficient) file
@@ -253,6 +376,7 @@ def read_shc(filename = shc_fn):
     coefficients. This must be done prior to this code (when making the 
     .shc file).
     """
+    import pandas as pd # imported here, since it is only needed to read the coefficient file
 
     header = 2
     coeffdict = {}
@@ -293,6 +417,201 @@ def read_shc(filename = shc_fn):
 
 
 
+def load_shc(filename = shc_fn):
+    """
+    Read .shc file through the process-wide coefficient cache
+
+    The file is parsed with read_shc the first time it is requested, and
+    the coefficients are kept as plain NumPy arrays. Later calls return the
+    cached arrays as long as the file modification time is unchanged.
+
+    Parameters
+    ----------
+    filename : string
+        filename of .shc file
+
+    Returns
+    -------
+    coeffs : SHCCoefficients
+        namedtuple with fields
+        times : array of datetime64[ns], model epochs (sorted)
+        keys  : list of (n, m) tuples, column order of g and h
+        n, m  : integer arrays of degree and order, same order as keys
+        g, h  : arrays of shape (len(times), len(keys)) with the gauss
+                coefficients for cos and sin terms
+    """
+    path = os.path.abspath(filename)
+    mtime = os.path.getmtime(path)
+
+    cached = _shc_cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    gdf, hdf = read_shc(path)
+    keys = list(gdf.columns)
+    n, m = np.array(keys).T
+    coeffs = SHCCoefficients(times = gdf.index.values.astype('datetime64[ns]'),
+                             keys  = keys,
+                             n     = n,
+                             m     = m,
+                             g     = np.ascontiguousarray(gdf.values, dtype = np.float64),
+                             h     = np.ascontiguousarray(hdf.values, dtype = np.float64))
+
+    _shc_cache[path] = (mtime, coeffs)
+    return coeffs
+
+
+def preload(filename = shc_fn):
+    """
+    Load a .shc file into the coefficient cache ahead of time
+
+    Useful before a long computation (or in a worker process initializer)
+    so that the first field evaluation does not pay for parsing the file.
+
+    Parameters
+    ----------
+    filename : string
+        filename of .shc file
+
+    Returns
+    -------
+    coeffs : SHCCoefficients
+        the cached coefficients, see load_shc
+    """
+    return load_shc(filename)
+
+
+def install(coeffs, filename = shc_fn):
+    """
+    Put already parsed coefficients into the coefficient cache
+
+    Meant for worker process initializers: the parent process parses the
+    file once and ships the coefficients to each worker at start-up, so
+    that workers neither parse the file nor receive the coefficients with
+    every task.
+
+    Parameters
+    ----------
+    coeffs : SHCCoefficients
+        coefficients returned by load_shc in another process
+    filename : string
+        filename of the .shc file the coefficients were read from
+    """
+    path = os.path.abspath(filename)
+    _shc_cache[path] = (os.path.getmtime(path), coeffs)
+
+
+def invalidate(filename = None):
+    """
+    Drop cached coefficients
+
+    Parameters
+    ----------
+    filename : string, optional
+        filename of .shc file to forget. If None (default), the whole
+        cache is cleared.
+    """
+    if filename is None:
+        _shc_cache.clear()
+        _epoch_cache.clear()
+    else:
+        path = os.path.abspath(filename)
+        _shc_cache.pop(path, None)
+        for key in [k for k in _epoch_cache.keys() if k[0] == path]:
+            del _epoch_cache[key]
+
+
+def _interpolate_coefficients(coeffs, date):
+    """
+    Linear interpolation in time of the gauss coefficients
+
+    Equivalent to reindexing the read_shc data frames on the requested
+    dates and calling interpolate(method = 'time'): dates after the last
+    epoch get the last coefficients, dates before the first epoch get NaN.
+
+    Parameters
+    ----------
+    coeffs : SHCCoefficients
+        coefficients returned by load_shc
+    date : array
+        array of dates (datetime or datetime64)
+
+    Returns
+    -------
+    g : array
+        gauss coefficients for cos terms, shape (len(date), len(keys))
+    h : array
+        gauss coefficients for sin terms, shape (len(date), len(keys))
+    """
+    t = np.asarray(date, dtype = 'datetime64[ns]').astype(np.int64)
+    times = coeffs.times.astype(np.int64)
+
+    # index of the epoch just after each date, and weight of that epoch
+    i1 = np.clip(np.searchsorted(times, t, side = 'right'), 1, len(times) - 1)
+    i0 = i1 - 1
+    w = (t - times[i0]) / (times[i1] - times[i0])
+    w = np.clip(w, 0, 1)[:, np.newaxis]
+
+    g = (1 - w) * coeffs.g[i0] + w * coeffs.g[i1]
+    h = (1 - w) * coeffs.h[i0] + w * coeffs.h[i1]
+
+    # no extrapolation backward in time
+    g[t < times[0]] = np.nan
+    h[t < times[0]] = np.nan
+
+    return g, h
+
+
+def get_coefficients(date, coeff_fn = shc_fn):
+    """
+    Gauss coefficients interpolated at one or more dates
+
+    Results are memoized per epoch in a bounded LRU cache shared by
+    igrf_gc, igrf_V and igrf, so the time interpolation runs at most once
+    per distinct date as long as it stays in the cache.
+
+    Parameters
+    ----------
+    date : date(s)
+        one or more dates (datetime or datetime64)
+    coeff_fn : string, optional
+        filename of .shc file. Default is latest IGRF
+
+    Returns
+    -------
+    g : array
+        gauss coefficients for cos terms, shape (n_dates, n_keys)
+    h : array
+        gauss coefficients for sin terms, shape (n_dates, n_keys)
+    """
+    coeffs = load_shc(coeff_fn)
+    path = os.path.abspath(coeff_fn)
+    mtime = _shc_cache[path][0]
+
+    epochs = np.atleast_1d(np.asarray(date, dtype = 'datetime64[ns]')).astype(np.int64)
+
+    # interpolate all the missing epochs in one go
+    missing = [t for t in np.unique(epochs) if (path, mtime, t) not in _epoch_cache]
+    if len(missing) > 0:
+        g_new, h_new = _interpolate_coefficients(coeffs, np.array(missing, dtype = 'datetime64[ns]'))
+        for t, g_row, h_row in zip(missing, g_new, h_new):
+            g_row.flags.writeable = False
+            h_row.flags.writeable = False
+            _epoch_cache[path, mtime, t] = (g_row, h_row)
+
+    rows = []
+    for t in epochs:
+        _epoch_cache.move_to_end((path, mtime, t))
+        rows.append(_epoch_cache[path, mtime, t])
+
+    while len(_epoch_cache) > EPOCH_CACHE_SIZE:
+        _epoch_cache.popitem(last = False)
+
+    g = np.array([row[0] for row in rows])
+    h = np.array([row[1] for row in rows])
+    return g, h
+
+
 def geod2geoc(gdlat, height, Bn, Bu):
     """
     Convert from geocentric to geodetic coordinates
@@ -479,17 +798,18 @@ def igrf_gc(r, theta, phi, date, coeff_fn = shc_fn):
         Magnetic field [nT] in eastward direction
     """
 
-    # read coefficient file:
-    g, h = read_shc(coeff_fn)
+    # read coefficient file (cached after the first call):
+    coeffs = load_shc(coeff_fn)
 
     if not hasattr(date, '__iter__'):
         date = np.array([date])
     else:
         date = np.array(date)
 
-    if np.any(date > g.index[-1]) or np.any(date < g.index[0]):
+    dates64 = date.astype('datetime64[ns]')
+    if np.any(dates64 > coeffs.times[-1]) or np.any(dates64 < coeffs.times[0]):
         print('Warning: You provided date(s) not covered by coefficient file \n({} to {})'.format(
-              g.index[0].date(), g.index[-1].date()))
+              coeffs.times[0].astype('datetime64[D]'), coeffs.times[-1].astype('datetime64[D]')))
 
     # get coordinate arrays to same size and shape
     r, theta, phi = np.broadcast_arrays(r, theta, phi)
@@ -497,24 +817,16 @@ def igrf_gc(r, theta, phi, date, coeff_fn = shc_fn):
     r, theta, phi = map(lambda x: x.flatten().reshape((-1 ,1)), [r, theta, phi]) # column vectors
 
     # make row vectors of wave numbers n and m:
-    n, m = np.array([k for k in g.columns]).T
-    n, m = n.reshape((1, -1)), m.reshape((1, -1))
+    n, m = coeffs.n.reshape((1, -1)), coeffs.m.reshape((1, -1))
 
     # get maximum N and maximum M:
     N, M = np.max(n), np.max(m)
 
     # get the legendre functions
-    P, dP = get_legendre(theta, g.keys())
+    P, dP = get_legendre(theta, coeffs.keys)
 
-    # Append coefficients at desired times (skip if index is already in coefficient data frame):
-    index = g.index.union(date)
-
-    g = g.reindex(index).groupby(index).first() # reindex and skip duplicates
-    h = h.reindex(index).groupby(index).first() # reindex and skip duplicates
-
-    # interpolate and collect the coefficients at desired times:
-    g = g.interpolate(method = 'time').loc[date, :]
-    h = h.interpolate(method = 'time').loc[date, :]
+    # interpolated coefficients at desired times (memoized per epoch):
+    g, h = get_coefficients(dates64, coeff_fn)
 
     # compute cosmlon and sinmlon:
     phi_rad = np.radians(phi)
@@ -526,17 +838,17 @@ def igrf_gc(r, theta, phi, date, coeff_fn = shc_fn):
 
     # calculate Br:
     G  = (RE / r) ** (nn + 2) * (nn + 1) * np.hstack((P * cosmphi, P * sinmphi))
-    Br = G.dot(np.hstack((g.values, h.values)).T).T # shape (n_times, n_coords)
+    Br = G.dot(np.hstack((g, h)).T).T # shape (n_times, n_coords)
 
     # calculate Btheta:
     G  = -(RE / r) ** (nn + 1) * np.hstack((dP * cosmphi, dP * sinmphi)) \
          * RE / r
-    Btheta = G.dot(np.hstack((g.values, h.values)).T).T # shape (n_times, n_coords)
+    Btheta = G.dot(np.hstack((g, h)).T).T # shape (n_times, n_coords)
 
     # calculate Bphi:
     G  = -(RE / r) ** (nn + 1) * mm * np.hstack((-P * sinmphi, P * cosmphi)) \
          * RE / r / np.sin(np.radians(theta))
-    Bphi = G.dot(np.hstack((g.values, h.values)).T).T # shape (n_times, n_coords)
+    Bphi = G.dot(np.hstack((g, h)).T).T # shape (n_times, n_coords)
 
     # reshape and return
     outshape = tuple([Bphi.shape[0]] + list(shape))
@@ -634,17 +946,18 @@ def igrf_V(r, theta, phi, date, coeff_fn = shc_fn):
         Magnetic potential (unit nT * km)
     """
 
-    # read coefficient file:
-    g, h = read_shc(coeff_fn)
+    # read coefficient file (cached after the first call):
+    coeffs = load_shc(coeff_fn)
 
     if not hasattr(date, '__iter__'):
         date = np.array([date])
     else:
         date = np.array(date)
 
-    if np.any(date > g.index[-1]) or np.any(date < g.index[0]):
+    dates64 = date.astype('datetime64[ns]')
+    if np.any(dates64 > coeffs.times[-1]) or np.any(dates64 < coeffs.times[0]):
         print('Warning: You provided date(s) not covered by coefficient file \n({} to {})'.format(
-              g.index[0].date(), g.index[-1].date()))
+              coeffs.times[0].astype('datetime64[D]'), coeffs.times[-1].astype('datetime64[D]')))
 
     # convert input to arrays in case they aren't
     r, theta, phi = np.broadcast_arrays(r, theta, phi)
@@ -652,24 +965,16 @@ def igrf_V(r, theta, phi, date, coeff_fn = shc_fn):
     r, theta, phi = map(lambda x: x.flatten().reshape((-1 ,1)), [r, theta, phi]) # column vectors
 
     # make row vectors of wave numbers n and m:
-    n, m = np.array([k for k in g.columns]).T
-    n, m = n.reshape((1, -1)), m.reshape((1, -1))
+    n, m = coeffs.n.reshape((1, -1)), coeffs.m.reshape((1, -1))
 
     # get maximum N and maximum M:
     N, M = np.max(n), np.max(m)
 
     # get the legendre functions
-    P, dP = get_legendre(theta, g.keys())
-
-    # Append coefficients at desired times (skip if index is already in coefficient data frame):
-    index = g.index.union(date)
-
-    g = g.reindex(index).groupby(index).first() # reindex and skip duplicates
-    h = h.reindex(index).groupby(index).first() # reindex and skip duplicates
+    P, dP = get_legendre(theta, coeffs.keys)
 
-    # interpolate and collect the coefficients at desired times:
-    g = g.interpolate(method = 'time').loc[date, :]
-    h = h.interpolate(method = 'time').loc[date, :]
+    # interpolated coefficients at desired times (memoized per epoch):
+    g, h = get_coefficients(dates64, coeff_fn)
 
     # compute cosmlon and sinmlon:
     cosmphi = np.cos(np.deg2rad(phi * m)) # shape (n_coords x n_model_params/2)
@@ -680,7 +985,7 @@ def igrf_V(r, theta, phi, date, coeff_fn = shc_fn):
 
     # calculate Br:
     G  = RE * (RE / r) ** (nn + 1) * np.hstack((P * cosmphi, P * sinmphi))
-    V = G.dot(np.hstack((g.values, h.values)).T).T # shape (n_times, n_coords)
+    V = G.dot(np.hstack((g, h)).T).T # shape (n_times, n_coords)
 
     # reshape and return
     outshape = tuple([V.shape[0]] + list(shape))
@@ -0,0 +1,125 @@
+"""
+Code qui permet de vérifier l'archive de structures (voir 'archive.py') :
+- ajout et relecture des structures et de leurs métadonnées
+- lecture sans copie (vues sur les fichiers projetés en mémoire)
+- reprise après une écriture interrompue (entrée d'index incomplète, données sans entrée)
+- conversion des anciennes sauvegardes CSV
+- sauvegarde et rechargement exacts d'une structure (Structure.sauvegarde_archive, Structure.charger_archive)
+
+À lancer depuis la racine du projet : python Test_Archive.py
+"""
+
+import os
+import tempfile
+import numpy as np
+from archive import Archive, INDEX, convertir_csv
+from structure import Structure
+
+rng = np.random.default_rng(0)
+
+def structure_aleatoire(nombre_points):
+    return rng.random(3 * (nombre_points - 1)), rng.random((nombre_points, 3))
+
+#%% Ajout et relecture _________________________________________________________
+
+archive = Archive(tempfile.mkdtemp())
+assert len(archive) == 0
+
+parametres, points = structure_aleatoire(5)
+i = archive.ajouter(parametres, points, score=2.0, encombrement=500.0, poids=300.0, force=0.5,
+                    metadonnees={"nom": "unique"})
+
+lot_parametres = rng.random((3, 3 * 6))
+lot_points = rng.random((3, 7, 3))
+indices = archive.ajouter_lot(lot_parametres, lot_points, scores=[1.0, 3.0, np.nan], metadonnees={"source": "lot"})
+
+assert i == 0 and list(indices) == [1, 2, 3] and len(archive) == 4
+np.testing.assert_array_equal(archive.parametres(0), parametres)
+np.testing.assert_array_equal(archive.points(0), points)
+for k, j in enumerate(indices):
+    np.testing.assert_array_equal(archive.parametres(j), lot_parametres[k])
+    np.testing.assert_array_equal(archive.points(j), lot_points[k])
+assert archive.index()[0]["poids"] == 300.0
+assert archive.metadonnees(0)["nom"] == "unique" and archive.metadonnees(3)["source"] == "lot"
+assert list(archive.meilleures(2)) == [2, 0]
+
+# Une autre instance relit la même archive
+np.testing.assert_array_equal(Archive(archive.dossier).points(2), lot_points[1])
+
+print(' ________________________________________')
+print(' Ajout et relecture : OK')
+
+#%% Lecture sans copie _________________________________________________________
+
+carte = archive.carte("points.bin", "<f8")
+for j in range(len(archive)):
+    assert np.shares_memory(archive.points(j), carte)
+    assert np.shares_memory(archive.parametres(j), archive.carte("parametres.bin", "<f8"))
+assert isinstance(archive.index(), np.memmap)
+assert not archive.points(0).flags.writeable
+
+print(' Lecture sans copie : OK')
+
+#%% Écriture interrompue _______________________________________________________
+
+# Données écrites sans leur entrée d'index, puis entrée d'index incomplète
+with open(archive.chemin("points.bin"), "ab") as f:
+    f.write(b"\x01\x02\x03")
+with open(archive.chemin("parametres.bin"), "ab") as f:
+    f.write(bytes(40))
+with open(archive.chemin("index.bin"), "ab") as f:
+    f.write(bytes(INDEX.itemsize // 2))
+
+# La structure interrompue n'existe pas, les précédentes sont intactes
+assert len(archive) == 4
+np.testing.assert_array_equal(archive.points(3), lot_points[2])
+
+# L'ajout suivant retire l'entrée incomplète et écrit les données à une position alignée
+parametres, points = structure_aleatoire(4)
+assert archive.ajouter(parametres, points, score=5.0) == 4
+assert os.path.getsize(archive.chemin("index.bin")) == 5 * INDEX.itemsize
+np.testing.assert_array_equal(archive.parametres(4), parametres)
+np.testing.assert_array_equal(archive.points(4), points)
+np.testing.assert_array_equal(archive.points(3), lot_points[2])
+assert archive.meilleures(1)[0] == 4
+
+print(' Écriture interrompue : OK')
+
+#%% Conversion des sauvegardes CSV _____________________________________________
+
+dossier_csv = tempfile.mkdtemp()
+sauvegardes = {}
+for nom in ["structure_a", "structure_b"]:
+    parametres, points = structure_aleatoire(6)
+    np.savetxt(os.path.join(dossier_csv, nom + "_parametres.csv"), parametres, delimiter=",")
+    np.savetxt(os.path.join(dossier_csv, nom + "_points.csv"), points, delimiter=",")
+    sauvegardes[nom] = (parametres, points)
+# Paramètres sans fichier de points : ignorés
+np.savetxt(os.path.join(dossier_csv, "incomplete_parametres.csv"), np.zeros(3), delimiter=",")
+
+archive_csv = Archive(os.path.join(tempfile.mkdtemp(), "archive"))
+indices = convertir_csv(dossier_csv, archive_csv)
+assert len(indices) == 2 and len(archive_csv) == 2
+for j in indices:
+    nom = archive_csv.metadonnees(j)["nom"]
+    np.testing.assert_allclose(archive_csv.parametres(j), sauvegardes[nom][0], rtol=1e-15)
+    np.testing.assert_allclose(archive_csv.points(j), sauvegardes[nom][1], rtol=1e-15)
+    assert np.isnan(archive_csv.index()[j]["score"])
+
+print(' Conversion des sauvegardes CSV : OK')
+
+#%% Sauvegarde et rechargement d'une structure _________________________________
+
+np.random.seed(3)
+structure = Structure(31, 100, 50, 500, True, "archivee")
+j = structure.sauvegarde_archive(archive, metadonnees={"essai": 1})
+
+rechargee = Structure(31, 100, 50, 500)
+rechargee.charger_archive(archive.dossier, j)
+
+for attribut in ["points", "longueur_segments", "angles", "encombrement_max", "poids", "Fx_induit", "Fx_impose", "nom"]:
+    np.testing.assert_array_equal(getattr(rechargee, attribut), getattr(structure, attribut))
+assert archive.metadonnees(j)["essai"] == 1
+
+print(' Sauvegarde et rechargement d\'une structure : OK')
+print(' ________________________________________')
@@ -0,0 +1,112 @@
+"""
+Code qui permet de vérifier les points de contrôle de l'apprentissage (voir 'point_de_controle.py') :
+- un enregistrement interrompu laisse intact le point de contrôle précédent
+- les fréquences d'enregistrement (itérations, secondes)
+- un apprentissage interrompu puis repris donne exactement le même résultat qu'un apprentissage sans interruption
+
+À lancer depuis la racine du projet : python Test_PointDeControle.py
+"""
+
+import os
+import io
+import tempfile
+import contextlib
+import numpy as np
+import point_de_controle
+from point_de_controle import PointDeControle
+from apprentissage import apprentissage
+from optimisation import parametres_en_ligne
+from evenements import AbonneFonction
+
+dossier = tempfile.mkdtemp()
+
+#%% Remplacement atomique ______________________________________________________
+
+controle = PointDeControle(os.path.join(dossier, "atomique"))
+controle.enregistrer({"population": np.arange(5.0)}, {"iteration": 1})
+
+# Arrêt pendant l'écriture du point de contrôle suivant
+savez_compressed = np.savez_compressed
+def ecriture_interrompue(f, **tableaux):
+    f.write(b"PK\x03\x04 incomplet")
+    raise KeyboardInterrupt
+point_de_controle.np.savez_compressed = ecriture_interrompue
+try:
+    controle.enregistrer({"population": np.zeros(5)}, {"iteration": 2})
+except KeyboardInterrupt:
+    pass
+point_de_controle.np.savez_compressed = savez_compressed
+
+tableaux, informations = controle.charger()
+np.testing.assert_array_equal(tableaux["population"], np.arange(5.0))
+assert informations["iteration"] == 1
+
+# L'enregistrement suivant remplace le fichier temporaire abandonné
+controle.enregistrer({"population": np.ones(5)}, {"iteration": 3})
+tableaux, informations = controle.charger()
+np.testing.assert_array_equal(tableaux["population"], np.ones(5))
+assert informations["iteration"] == 3
+
+print(' ________________________________________')
+print(' Remplacement atomique : OK')
+
+#%% Fréquences d'enregistrement ________________________________________________
+
+def iterations_enregistrees(**frequences):
+    controle = PointDeControle(os.path.join(dossier, "frequences"), **frequences)
+    return [i for i in range(10) if controle.a_enregistrer(i, i == 9)]
+
+assert iterations_enregistrees() == list(range(10))
+assert iterations_enregistrees(frequence_iterations=3) == [2, 5, 8, 9]
+assert iterations_enregistrees(frequence_secondes=600) == [9]
+assert iterations_enregistrees(frequence_iterations=3, frequence_secondes=600) == [2, 5, 8, 9]
+
+print(' Fréquences d\'enregistrement : OK')
+
+#%% Reprise exacte _____________________________________________________________
+
+configuration = dict(nb_points=10, nb_structures=12, nb_iterations=6, graine=3)
+
+def executer(interrompre = None, **options):
+    historique = []
+    def recevoir(nom, donnees):
+        if nom == "iteration":
+            historique.append((donnees["iteration"], donnees["score_max"], donnees["score_min"]))
+            if donnees["iteration"] == interrompre:
+                raise KeyboardInterrupt
+    with contextlib.redirect_stdout(io.StringIO()):
+        score, structure = apprentissage(abonne=AbonneFonction(recevoir), **configuration, **options)
+    return score, structure, historique
+
+for execution, frequence in [("serial", 1), ("serial", 3), ("threads", 2)]:
+    score, structure, historique = executer(execution=execution, nb_workers=2)
+
+    fichier = os.path.join(dossier, "reprise_" + execution + str(frequence))
+    try:
+        executer(execution=execution, nb_workers=2, point_de_controle=fichier, frequence_iterations=frequence,
+                 interrompre=4)
+    except KeyboardInterrupt:
+        pass
+    score_repris, structure_reprise, historique_repris = executer(execution=execution, nb_workers=2,
+                                                                  point_de_controle=fichier,
+                                                                  frequence_iterations=frequence, reprendre=True)
+
+    # La reprise commence après le dernier point de contrôle enregistré, pas au début
+    assert 0 < len(historique_repris) < len(historique)
+    assert score_repris == score
+    np.testing.assert_array_equal(parametres_en_ligne(structure_reprise), parametres_en_ligne(structure))
+    np.testing.assert_array_equal(structure_reprise.points, structure.points)
+    assert historique_repris == historique[len(historique) - len(historique_repris):]
+
+    print(' Reprise exacte ({:s}, toutes les {:d} itérations) : OK'.format(execution, frequence))
+
+# Un point de contrôle enregistré avec d'autres paramètres est refusé
+refuse = False
+try:
+    executer(point_de_controle=fichier, reprendre=True, b=0.6)
+except Exception as erreur:
+    refuse = "autres paramètres" in str(erreur)
+assert refuse
+
+print(' Paramètres différents refusés : OK')
+print(' ________________________________________')
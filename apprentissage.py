@@ -1,16 +1,21 @@
 import numpy as np
 import math
+from population import Population
 from structure import Structure as St
-import streamlit as st
-from extra_fonctions import *
+from point_de_controle import PointDeControle
+from executeurs import Executeur
+from evenements import ABONNE_NUL
+from optimisation import parametres_en_ligne
+import Calcul_Force_EM.Instrumentation as instr
+import Calcul_Force_EM.ModeleChamp as mc
 from copy import deepcopy
-from tqdm import tqdm
-import plotly.graph_objects as go
 
 def apprentissage(nb_points = 31, longueur_max = 100, longueur_min = 100, nb_structures = 10,
                   nb_structures_a_garder = 4, nb_iterations = 10, temperature_debut = 0.5,
                   temperature_fin = 0.2, encombrement_cible = 500, tridimensionnel = True, induit = False, b = 0.5, biais = 4,
-                  plyfig = None, barre_de_progression = None, espace_graph = None, figure = None, espace_structure = None):
+                  modele_champ = "igrf", execution = "serial", nb_workers = None, graine = None, abonne = None,
+                  point_de_controle = None, frequence_iterations = None, frequence_secondes = None, reprendre = False,
+                  dossier_tuiles = None):
     """
     Fonction d'apprentissage pour optimiser des structures.
 
@@ -38,16 +43,26 @@ def apprentissage(nb_points = 31, longueur_max = 100, longueur_min = 100, nb_str
     :type b: float
     :param biais: Facteur de biais pour le choix des structures.
     :type biais: float
-    :param plyfig: Figure permettant de montrer la performance à l'utilisateur
-    :type plyfig: figure plotly
-    :param barre_de_progression: barre de progression montrant la progression de l'apprentissage à l'utilisateur
-    :type barre_de_progression: barre de progression streamlit
-    :param espace_graph: espace réservé pour le graphique de la performance
-    :type espace_graph: espace streamlit
-    :param figure: figure montrant la structure actuelle
-    :type figure: figure plotly
-    :param espace_structure: espace réservé pour le graphique de la structure
-    :type espace_structure: espace streamlit
+    :param modele_champ: Modèle du champ magnétique utilisé pendant l'apprentissage ("igrf", "taylor" ou "tuile"). La meilleure structure est toujours vérifiée avec le modèle IGRF complet à la fin.
+    :type modele_champ: str
+    :param execution: Mode d'exécution de la génération et de la modification des structures : "serial", "threads" ou "processes".
+    :type execution: str
+    :param nb_workers: Nombre de fils ou de processus (par défaut, le nombre de cœurs).
+    :type nb_workers: int
+    :param graine: Graine du générateur de nombres aléatoires. Pour une même graine, le résultat est le même quels que soient le mode d'exécution et le nombre de fils ou de processus.
+    :type graine: int
+    :param abonne: Abonné aux événements de l'apprentissage (progression, scores de chaque itération, meilleure structure), par exemple pour l'affichage (voir evenements.py).
+    :type abonne: Abonne
+    :param point_de_controle: Fichier (.npz) où enregistrer régulièrement l'état complet de l'apprentissage (voir point_de_controle.py). Si aucun n'est donné, rien n'est enregistré.
+    :type point_de_controle: str
+    :param frequence_iterations: Nombre d'itérations entre deux enregistrements du point de contrôle (None pour ne pas en tenir compte). Si aucune des deux fréquences n'est donnée, le point de contrôle est enregistré à chaque itération.
+    :type frequence_iterations: int
+    :param frequence_secondes: Temps minimal entre deux enregistrements du point de contrôle [s] (None pour ne pas en tenir compte).
+    :type frequence_secondes: float
+    :param reprendre: Si le point de contrôle existe, reprendre l'apprentissage là où il s'est arrêté. Le résultat est alors exactement celui de l'apprentissage sans interruption.
+    :type reprendre: bool
+    :param dossier_tuiles: Dossier où enregistrer les tuiles de champ du modèle "tuile", pour les relire lors des apprentissages suivants (voir Calcul_Force_EM/ModeleChamp.py). Si aucun n'est donné, le réglage actuel (ModeleChamp.DOSSIER_TUILES) est gardé.
+    :type dossier_tuiles: str
 
     :return: Le meilleur score et la structure ayant obtenu ce score.
     :rtype: tuple
@@ -56,107 +71,159 @@ def apprentissage(nb_points = 31, longueur_max = 100, longueur_min = 100, nb_str
     score_max_cumule = []
     score_min_cumule = []
 
-    # Affiche le graphique initial dans l'interface utilisateur si demandé
-    if espace_graph != None:
-        with espace_graph:
-            st.plotly_chart(plyfig, key="perf")
-
-    # Calcul de la proportion des structures à conserver
-    proportion_structure_a_garder = nb_structures_a_garder/nb_structures
-    structures = np.ndarray((nb_structures, 2), dtype=object)
+    # Abonné aux événements de l'apprentissage
+    if abonne is None:
+        abonne = ABONNE_NUL
 
     # Calcul de l'exposant pour la décroissance de la température
     exposant_temperature = math.log(temperature_fin, nb_iterations)
 
-    print("Génération des structures...")
-
-    # Génération des structures initiales
-    for i in tqdm(range(nb_structures)):
-        barre_de_progression.progress(i/(nb_structures-1), text="Itération no. : 0, Progrès : "+str(i+1)+"/"+str(nb_structures))
-        structure = St(nb_points, longueur_max, longueur_min, encombrement_cible, tridimensionnel, "Structure no. " + str(i))
-        structures[i, 1] = structure
-
-    # Initialisation de la meilleure structure (score et objet structure)
-    meilleure_structure = [0, structures[0, 1]]
-
-    # Boucle principale pour les itérations d'apprentissage
-    for i in range(nb_iterations+1):
-        # Calcul de la température pour cette itération
-        temperature = temperature_debut * (i+1) ** exposant_temperature
-
-        print("Calcul des performances...")
-
-        # Calcul des scores pour chaque structure
-        for j in range(nb_structures):
-            scores = structures[j, 1].montrer_performance(induit)
-            score = scores[2] / (scores[1] ** b)
-            structures[j, 0] = score
-
-        # Enregistrement des scores maximum et minimum
-        score_max = max(structures[:, 0])
-        score_min = min(structures[:, 0])
-        score_max_cumule.append(score_max)
-        score_min_cumule.append(score_min)
-
-        print("Itération : ", str(i), ", score max : ", str(score_max), ", score_min : ", str(score_min))
-
-        # Tri des structures en fonction des scores
-        structures_triees = trier(structures, nb_structures)
-
-        # Mise à jour de la meilleure structure si une meilleure est trouvée
-        if meilleure_structure[0] <= structures_triees[nb_structures-1, 0]:
-            meilleure_structure = structures_triees[nb_structures-1, :]
-
-        # Mise à jour du titre pour la visualisation
-        enc, poi, force = meilleure_structure[1].montrer_performance()
-        titre = ("Score : " + str(meilleure_structure[0]) + ", Encombrement = " + str(enc) + ", poids = " + str(poi) +
-                 ", force = " + str(force) + ".")
-
-        # Ajout de la structure dans la figure
-        meilleure_structure[1].visualiser_structure(figure, titre)
-        with espace_structure:
-            st.plotly_chart(figure, key = "appr"+str(i), use_container_width=False)
-
-        # Affichage des performances cumulées si demandé
-        if espace_graph != None and plyfig != None:
-            # Réinitialisation de la figure
-            plyfig.data = []
-            # Ajout du score maximum dans la figure
-            plyfig.add_trace(go.Scatter(
-                x=list(range(nb_iterations + 1)), y=score_max_cumule,
-                marker=dict(size=4, color="red"),
-                line=dict(color="red", width=2),
-                name="Score maximum par itération"))
-            # Ajout du score minimum dans la figure
-            plyfig.add_trace(go.Scatter(
-                x=list(range(nb_iterations + 1)), y=score_min_cumule,
-                marker=dict(size=4, color="blue"),
-                line=dict(color="blue", width=2),
-                name="Score minimum par itération"))
-
-            # Affichage de la figure
-            with espace_graph:
-                st.plotly_chart(plyfig)
-
-        # Si l'apprentissage n'est pas terminé, on prépare la prochaine itération
-        if i < nb_iterations:
-            # Sélection des meilleures structures avec biais
-            structures_a_garder = choix_biaises(structures_triees, nb_structures_a_garder, biais)
-
-            # Remplissage des structures pour la nouvelle itération
-            for j in range(nb_structures):
-                structures[j, 1] = structures_a_garder[int(j*proportion_structure_a_garder)].copy()[1]
-
-            # Modification des paramètres des structures pour la nouvelle itération
-            for j in tqdm(range(nb_structures)):
-                barre_de_progression.progress((j) / (nb_structures-1), text="Itération no. : "+str(i+1)+", Progrès : "+str(j+1)+"/"+str(nb_structures))
-                structure = deepcopy(structures[j, 1])
-                structure.modifier_parametres(temperature, True, True, str(j))
-                structures[j, 1] = structure
-
-            # Mélange des structures pour diversifier les configurations
-            structures = melanger_structures(structures, nb_structures)
-
+    # Paramètres qui déterminent le résultat de l'apprentissage, vérifiés lors d'une reprise
+    parametres = dict(nb_points=nb_points, longueur_max=longueur_max, longueur_min=longueur_min,
+                      nb_structures=nb_structures, nb_structures_a_garder=nb_structures_a_garder,
+                      nb_iterations=nb_iterations, temperature_debut=temperature_debut, temperature_fin=temperature_fin,
+                      encombrement_cible=encombrement_cible, tridimensionnel=tridimensionnel, induit=induit, b=b,
+                      biais=biais, modele_champ=modele_champ)
+
+    # Point de contrôle de l'apprentissage, si demandé
+    controle = None
+    if point_de_controle is not None:
+        controle = PointDeControle(point_de_controle, frequence_iterations, frequence_secondes)
+
+    # Dossier des tuiles de champ, à régler avant de démarrer les processus de travail qui le reçoivent
+    if dossier_tuiles is not None:
+        mc.DOSSIER_TUILES = dossier_tuiles
+
+    # Générateur de nombres aléatoires et exécuteur des tâches par lots
+    rng = np.random.default_rng(graine)
+    executeur = Executeur(execution, nb_workers)
+
+    try:
+        if reprendre and controle is not None and controle.existe():
+
+            print("Reprise de l'apprentissage...")
+
+            # Population, meilleure structure, historique des scores et état du générateur tels qu'enregistrés
+            tableaux, informations = controle.charger()
+            if informations["parametres"] != parametres:
+                raise Exception("Le point de contrôle " + controle.fichier + " a été enregistré avec d'autres paramètres d'apprentissage.")
+
+            rng.bit_generator.state = informations["rng"]
+            population = Population(nb_structures, nb_points, longueur_max, longueur_min, encombrement_cible, tridimensionnel, modele_champ, rng, executeur, etat=tableaux)
+
+            # La meilleure structure est recréée à partir des mêmes paramètres que lors de l'apprentissage
+            meilleurs_parametres = (tableaux["meilleure_longueurs"], tableaux["meilleure_angles"], informations["meilleur_nom"])
+            meilleure_structure = [np.float64(informations["meilleur_score"]),
+                                   St(nb_points, longueur_max, longueur_min, encombrement_cible, tridimensionnel,
+                                      meilleurs_parametres[2], modele_champ, parametres=meilleurs_parametres[:2])]
+            score_max_cumule = list(tableaux["scores_max"])
+            score_min_cumule = list(tableaux["scores_min"])
+            debut = informations["iteration"] + 1
+
+        else:
+
+            print("Génération des structures...")
+
+            # Génération des structures initiales, toutes à la fois
+            if abonne.actif:
+                abonne.recevoir("progression", {"valeur": 0, "texte": "Itération no. : 0, Progrès : 0/"+str(nb_structures)})
+            with instr.chrono("apprentissage.generation"):
+                population = Population(nb_structures, nb_points, longueur_max, longueur_min, encombrement_cible, tridimensionnel, modele_champ, rng, executeur)
+            if abonne.actif:
+                abonne.recevoir("progression", {"valeur": 1.0, "texte": "Itération no. : 0, Progrès : "+str(nb_structures)+"/"+str(nb_structures)})
+
+            # Initialisation de la meilleure structure (score et objet structure) et des paramètres qui ont servi à la créer
+            meilleurs_parametres = (population.longueur_segments[0].copy(), population.angles[0].copy(), population.noms[0])
+            meilleure_structure = [0, population.structure(0)]
+            debut = 0
+
+        # Erreur du modèle de champ magnétique par rapport au calcul IGRF complet
+        if modele_champ != "igrf":
+            print("Modèle de champ : ", modele_champ, ", erreur relative max estimée : ", str(population.borne_erreur_champ))
+
+        # Boucle principale pour les itérations d'apprentissage
+        for i in range(debut, nb_iterations+1):
+            # Calcul de la température pour cette itération
+            temperature = temperature_debut * (i+1) ** exposant_temperature
+
+            print("Calcul des performances...")
+
+            # Calcul des scores de toutes les structures
+            with instr.chrono("apprentissage.scores"):
+                scores = population.scores(induit, b)
+
+            # Enregistrement des scores maximum et minimum
+            meilleur = np.argmax(scores)
+            score_max = scores[meilleur]
+            score_min = scores.min()
+            score_max_cumule.append(score_max)
+            score_min_cumule.append(score_min)
+
+            print("Itération : ", str(i), ", score max : ", str(score_max), ", score_min : ", str(score_min))
+
+            # Mise à jour de la meilleure structure si une meilleure est trouvée (seule celle-ci est créée en objet Structure)
+            if meilleure_structure[0] <= score_max:
+                with instr.chrono("apprentissage.copie_meilleure"):
+                    meilleure_structure = [score_max, population.structure(meilleur)]
+                    meilleurs_parametres = (population.longueur_segments[meilleur].copy(), population.angles[meilleur].copy(),
+                                            population.noms[meilleur])
+
+            # Événement de fin d'itération : scores, paramètres, points du câble et performances de la meilleure structure
+            if abonne.actif:
+                with instr.chrono("apprentissage.affichage"):
+                    encombrement, poids, force = meilleure_structure[1].montrer_performance(induit)
+                    abonne.recevoir("iteration", {"iteration": i, "nb_iterations": nb_iterations, "score_max": score_max,
+                                                  "score_min": score_min, "meilleur_score": meilleure_structure[0],
+                                                  "parametres": parametres_en_ligne(meilleure_structure[1]),
+                                                  "points": meilleure_structure[1].montrer_cable(),
+                                                  "encombrement": encombrement, "poids": poids, "force": force,
+                                                  "scores_max": score_max_cumule, "scores_min": score_min_cumule})
+
+            # Si l'apprentissage n'est pas terminé, on prépare la prochaine itération
+            if i < nb_iterations:
+                # Sélection des meilleures structures avec biais, puis remplissage de la population avec celles-ci
+                with instr.chrono("apprentissage.selection"):
+                    population.selection_biaisee(scores, nb_structures_a_garder, biais)
+
+                # Modification des paramètres de toutes les structures pour la nouvelle itération
+                if abonne.actif:
+                    abonne.recevoir("progression", {"valeur": 0, "texte": "Itération no. : "+str(i+1)+", Progrès : 0/"+str(nb_structures)})
+                with instr.chrono("apprentissage.modification"):
+                    population.modifier_parametres(temperature, True, True)
+                if abonne.actif:
+                    abonne.recevoir("progression", {"valeur": 1.0, "texte": "Itération no. : "+str(i+1)+", Progrès : "+str(nb_structures)+"/"+str(nb_structures)})
+
+                # Mélange des structures pour diversifier les configurations
+                with instr.chrono("apprentissage.melange"):
+                    population.melanger()
+
+            # Enregistrement de l'état complet de l'apprentissage (la température ne dépend que du numéro d'itération)
+            if controle is not None and controle.a_enregistrer(i, i == nb_iterations):
+                with instr.chrono("apprentissage.point_de_controle"):
+                    tableaux = population.etat()
+                    tableaux.update(scores_max=np.array(score_max_cumule), scores_min=np.array(score_min_cumule),
+                                    meilleure_longueurs=meilleurs_parametres[0], meilleure_angles=meilleurs_parametres[1])
+                    controle.enregistrer(tableaux, {"iteration": i, "meilleur_score": float(meilleure_structure[0]),
+                                                    "meilleur_nom": str(meilleurs_parametres[2]),
+                                                    "rng": rng.bit_generator.state, "parametres": parametres})
+
+    finally:
+        # Arrêt des fils ou des processus de travail, même si l'apprentissage est interrompu
+        executeur.fermer()
+
+    # Vérification de la meilleure structure avec le modèle IGRF complet
+    if modele_champ != "igrf":
+        meilleure_structure = [meilleure_structure[0], deepcopy(meilleure_structure[1])]
+        meilleure_structure[1].modele_champ = "igrf"
+        meilleure_structure[1].evaluer_force()
+        scores = meilleure_structure[1].montrer_performance(induit)
+        meilleure_structure[0] = scores[2] / (scores[1] ** b)
+        print("Score vérifié avec le modèle IGRF complet : ", str(meilleure_structure[0]))
+
+    # Fin de l'apprentissage
+    if abonne.actif:
+        abonne.recevoir("fin", {"algorithme": "apprentissage", "score": meilleure_structure[0]})
+        abonne.terminer()
 
     # Retourne le meilleur score et la structure associée
     return meilleure_structure[0], meilleure_structure[1]
@@ -0,0 +1,287 @@
+"""
+Archive de structures : un seul dossier, auquel on ajoute des milliers de structures, au lieu de deux fichiers CSV par
+structure.
+
+Fichiers du dossier :
+    - parametres.bin     paramètres des structures (longueurs, angles theta, angles phi), en float64, mis bout à bout
+    - points.bin         points des structures, en float64, mis bout à bout
+    - metadonnees.jsonl  une ligne JSON par structure : nom, date et métadonnées de l'exécution
+    - index.bin          une entrée par structure (voir INDEX) : position des données dans les autres fichiers, nombre
+                         de points, score, encombrement, poids et force
+
+On ne fait qu'ajouter à la fin des fichiers, et l'entrée de l'index est écrite en dernier : une structure dont l'écriture
+a été interrompue n'est simplement pas dans l'index. Les fichiers binaires sont lus avec np.memmap : les paramètres et
+les points d'une structure sont des vues sur le fichier, sans copie.
+
+Conversion des anciennes sauvegardes CSV (Structure.sauvegarde), depuis la racine du projet :
+
+    python -m archive Structures archive_structures
+"""
+
+import os
+import sys
+import json
+import glob
+import numpy as np
+from datetime import datetime
+
+# Entrée de l'index pour chaque structure
+INDEX = np.dtype([("parametres", "<i8"),      # Position du premier paramètre dans parametres.bin
+                  ("points", "<i8"),          # Position de la première coordonnée dans points.bin
+                  ("metadonnees", "<i8"),     # Position de la ligne dans metadonnees.jsonl [octets]
+                  ("nombre_points", "<i8"),
+                  ("score", "<f8"),
+                  ("encombrement", "<f8"),
+                  ("poids", "<f8"),
+                  ("force", "<f8")])
+
+class Archive:
+    """
+    Archive de structures, à laquelle on ne fait qu'ajouter.
+    """
+    def __init__(self, dossier):
+        """
+        :param dossier: Dossier de l'archive. Il est créé s'il n'existe pas.
+        :type dossier: str
+        """
+        self.dossier = dossier
+        os.makedirs(dossier, exist_ok=True)
+
+        # Projections en mémoire des fichiers binaires, refaites quand les fichiers ont grandi
+        self.cartes = {}
+
+    def chemin(self, nom):
+        """
+        :param nom: Nom du fichier dans l'archive.
+        :type nom: str
+
+        :return: Le chemin du fichier.
+        :rtype: str
+        """
+        return os.path.join(self.dossier, nom)
+
+    def __len__(self):
+        """
+        Permet d'obtenir le nombre de structures de l'archive.
+        """
+        chemin = self.chemin("index.bin")
+        if not os.path.exists(chemin):
+            return 0
+        return os.path.getsize(chemin) // INDEX.itemsize
+
+    def ajouter_lot(self, parametres, points, scores = None, encombrements = None, poids = None, forces = None,
+                    metadonnees = None):
+        """
+        Ajoute P structures ayant le même nombre de points N.
+
+        :param parametres: Paramètres des structures, de forme (P, 3(N-1)).
+        :type parametres: ndarray
+        :param points: Points des structures, de forme (P, N, 3).
+        :type points: ndarray
+        :param scores: Scores des structures, de forme (P,) (NaN si aucun n'est donné).
+        :type scores: ndarray
+        :param encombrements: Encombrements des structures, de forme (P,).
+        :type encombrements: ndarray
+        :param poids: Poids des structures, de forme (P,).
+        :type poids: ndarray
+        :param forces: Forces des structures, de forme (P,).
+        :type forces: ndarray
+        :param metadonnees: Métadonnées de chaque structure (liste de P dictionnaires), ou communes à toutes (dictionnaire).
+        :type metadonnees: list
+
+        :return: Les indices des structures dans l'archive.
+        :rtype: ndarray
+        """
+        parametres = np.ascontiguousarray(parametres, dtype="<f8")
+        points = np.ascontiguousarray(points, dtype="<f8")
+        nb_structures, nombre_points = points.shape[:2]
+
+        if parametres.shape != (nb_structures, 3 * (nombre_points - 1)):
+            raise Exception("Les paramètres doivent être de forme (P, 3(N-1)) pour des points de forme (P, N, 3).")
+
+        if metadonnees is None or isinstance(metadonnees, dict):
+            metadonnees = [metadonnees or {}] * nb_structures
+
+        # Données, écrites avant l'index
+        entrees = np.zeros(nb_structures, dtype=INDEX)
+        entrees["parametres"] = self.ecrire("parametres.bin", parametres) // 8 + np.arange(nb_structures) * parametres.shape[1]
+        entrees["points"] = self.ecrire("points.bin", points) // 8 + np.arange(nb_structures) * nombre_points * 3
+        entrees["nombre_points"] = nombre_points
+        for champ, valeurs in [("score", scores), ("encombrement", encombrements), ("poids", poids), ("force", forces)]:
+            entrees[champ] = np.nan if valeurs is None else valeurs
+
+        date = datetime.now().isoformat(timespec="seconds")
+        lignes = [(json.dumps(dict({"date": date}, **donnees), ensure_ascii=False, default=str) + "\n").encode("utf-8")
+                  for donnees in metadonnees]
+        debut = self.ecrire("metadonnees.jsonl", b"".join(lignes))
+        entrees["metadonnees"] = debut + np.concatenate(([0], np.cumsum([len(ligne) for ligne in lignes])[:-1]))
+
+        # Index : les structures n'existent dans l'archive qu'une fois leur entrée écrite. Une entrée incomplète (écriture
+        # interrompue) est d'abord retirée. Le fichier ne doit alors plus être projeté en mémoire : sous Windows, un
+        # fichier projeté ne peut pas être raccourci.
+        chemin = self.chemin("index.bin")
+        if os.path.exists(chemin) and os.path.getsize(chemin) % INDEX.itemsize:
+            self.cartes.pop("index.bin", None)
+            os.truncate(chemin, len(self) * INDEX.itemsize)
+        debut = self.ecrire("index.bin", entrees)
+        return debut // INDEX.itemsize + np.arange(nb_structures)
+
+    def ajouter(self, parametres, points, score = None, encombrement = None, poids = None, force = None,
+                metadonnees = None):
+        """
+        Ajoute une structure (voir ajouter_lot()).
+
+        :return: L'indice de la structure dans l'archive.
+        :rtype: int
+        """
+        valeurs = [None if valeur is None else [valeur] for valeur in (score, encombrement, poids, force)]
+        return int(self.ajouter_lot(np.asarray(parametres)[None], np.asarray(points)[None], *valeurs,
+                                    metadonnees=[metadonnees or {}])[0])
+
+    def ecrire(self, nom, donnees):
+        """
+        Ajoute des données à la fin d'un fichier de l'archive. Les tableaux sont écrits à une position multiple de la
+        taille de leurs éléments (au cas où une écriture précédente aurait été interrompue), pour pouvoir être lus avec
+        np.memmap.
+
+        :param nom: Nom du fichier.
+        :type nom: str
+        :param donnees: Données à ajouter.
+        :type donnees: ndarray or bytes
+
+        :return: La position [octets] où les données ont été écrites.
+        :rtype: int
+        """
+        with open(self.chemin(nom), "ab") as f:
+            debut = f.tell()
+            if not isinstance(donnees, bytes) and debut % donnees.itemsize:
+                f.write(bytes(donnees.itemsize - debut % donnees.itemsize))
+                debut = f.tell()
+            f.write(donnees if isinstance(donnees, bytes) else donnees.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        return debut
+
+    def carte(self, nom, dtype):
+        """
+        Projection en mémoire (lecture seule) d'un fichier binaire de l'archive.
+
+        :param nom: Nom du fichier.
+        :type nom: str
+        :param dtype: Type des données du fichier.
+        :type dtype: dtype
+
+        :return: Le contenu du fichier, sans copie.
+        :rtype: memmap
+        """
+        taille = os.path.getsize(self.chemin(nom)) if os.path.exists(self.chemin(nom)) else 0
+        if nom not in self.cartes or self.cartes[nom][0] != taille:
+            nombre = taille // np.dtype(dtype).itemsize
+            carte = np.memmap(self.chemin(nom), dtype=dtype, mode="r", shape=(nombre,)) if nombre else np.zeros(0, dtype=dtype)
+            self.cartes[nom] = (taille, carte)
+        return self.cartes[nom][1]
+
+    def index(self):
+        """
+        Permet d'obtenir l'index de l'archive (scores, encombrements, poids, forces de toutes les structures...).
+
+        :return: L'index, une entrée par structure.
+        :rtype: memmap
+        """
+        return self.carte("index.bin", INDEX)[:len(self)]
+
+    def parametres(self, i):
+        """
+        Paramètres d'une structure (longueurs, angles theta, angles phi), sans copie.
+
+        :param i: Indice de la structure.
+        :type i: int
+
+        :return: Les paramètres, de forme (3(N-1),).
+        :rtype: memmap
+        """
+        entree = self.index()[i]
+        debut = int(entree["parametres"])
+        return self.carte("parametres.bin", "<f8")[debut:debut + 3 * (int(entree["nombre_points"]) - 1)]
+
+    def points(self, i):
+        """
+        Points d'une structure, sans copie.
+
+        :param i: Indice de la structure.
+        :type i: int
+
+        :return: Les points, de forme (N, 3).
+        :rtype: memmap
+        """
+        entree = self.index()[i]
+        debut = int(entree["points"])
+        nombre_points = int(entree["nombre_points"])
+        return self.carte("points.bin", "<f8")[debut:debut + 3 * nombre_points].reshape((nombre_points, 3))
+
+    def metadonnees(self, i):
+        """
+        Métadonnées d'une structure.
+
+        :param i: Indice de la structure.
+        :type i: int
+
+        :return: Les métadonnées (nom, date, paramètres de l'exécution...).
+        :rtype: dict
+        """
+        with open(self.chemin("metadonnees.jsonl"), "rb") as f:
+            f.seek(int(self.index()[i]["metadonnees"]))
+            return json.loads(f.readline().decode("utf-8"))
+
+    def meilleures(self, nombre):
+        """
+        Indices des structures de meilleur score.
+
+        :param nombre: Nombre de structures.
+        :type nombre: int
+
+        :return: Les indices, du meilleur score au moins bon.
+        :rtype: ndarray
+        """
+        scores = np.nan_to_num(np.asarray(self.index()["score"]), nan=-np.inf)
+        return np.argsort(scores)[::-1][:nombre]
+
+def convertir_csv(dossier, archive, delimiteur = ","):
+    """
+    Ajoute à une archive les structures enregistrées en CSV par Structure.sauvegarde() (fichiers *_parametres.csv et
+    *_points.csv). Le score n'étant pas enregistré dans les CSV, il est laissé vide (NaN).
+
+    :param dossier: Dossier des fichiers CSV.
+    :type dossier: str
+    :param archive: Archive, ou dossier de l'archive.
+    :type archive: Archive or str
+    :param delimiteur: Séparateur des fichiers CSV.
+    :type delimiteur: str
+
+    :return: Les indices des structures ajoutées.
+    :rtype: list
+    """
+    if not isinstance(archive, Archive):
+        archive = Archive(archive)
+
+    indices = []
+    for fichier_parametres in sorted(glob.glob(os.path.join(dossier, "*_parametres.csv"))):
+        nom = fichier_parametres[:-len("_parametres.csv")]
+        if not os.path.exists(nom + "_points.csv"):
+            continue
+
+        parametres = np.loadtxt(fichier_parametres, delimiter=delimiteur, ndmin=1)
+        points = np.loadtxt(nom + "_points.csv", delimiter=delimiteur, ndmin=2)
+        indices.append(archive.ajouter(parametres, points, metadonnees={"nom": os.path.basename(nom),
+                                                                        "source": fichier_parametres}))
+
+    return indices
+
+if __name__ == "__main__":
+
+    if len(sys.argv) != 3:
+        print("Utilisation : python -m archive <dossier des CSV> <dossier de l'archive>")
+        sys.exit(1)
+
+    indices = convertir_csv(sys.argv[1], sys.argv[2])
+    print(str(len(indices)) + " structure(s) ajoutée(s) à l'archive " + sys.argv[2] + ".")
@@ -0,0 +1,280 @@
+"""
+Suite de mesures des temps de calcul : champ magnétique, force, géométrie et recherche de structures.
+
+- Micro-mesures : ppigrf.igrf_gc (1, 31 et 10 000 points), ppigrf.get_legendre, fe.Parametre, fe.Discret,
+  Structure.generation_structure et Structure.evaluer_force.
+- Macro-mesures : une génération de l'apprentissage (sélection, modification et évaluation d'une population) et une
+  optimisation de Nelder-Mead, pour plusieurs nombres de points et de structures.
+
+Les résultats sont écrits en JSON avec la description de la machine, puis comparés à une référence enregistrée :
+
+    python -m benchmarks run --sortie reference.json
+    python -m benchmarks run --sortie nouveau.json
+    python -m benchmarks compare reference.json nouveau.json --seuil 0.2
+
+La comparaison se termine avec une erreur si une mesure est plus lente que la référence de plus du seuil (relatif).
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import platform
+import contextlib
+import subprocess
+import numpy as np
+from copy import deepcopy
+from datetime import datetime
+
+from Calcul_Force_EM import ppigrf
+import Calcul_Force_EM.Force_Electro as fe
+import structure as st
+from structure import Structure
+from population import Population
+from optimisation import optimisation
+
+# Position du satellite utilisée par toutes les mesures (la même que dans structure.py)
+POSITION = st.POSITION
+
+def mesurer(fonction, repetitions = 5, duree_min = 0.2):
+    """
+    Mesure le temps d'un appel de la fonction. Le nombre d'appels par répétition est choisi pour que chaque répétition
+    dure au moins duree_min secondes.
+
+    :param fonction: Fonction à mesurer, sans argument.
+    :type fonction: function
+    :param repetitions: Nombre de répétitions.
+    :type repetitions: int
+    :param duree_min: Durée minimale d'une répétition [s].
+    :type duree_min: float
+
+    :return: Temps minimal, médian et maximal d'un appel [s] et nombre d'appels par répétition.
+    :rtype: dict
+    """
+    # Premier appel : réchauffement des caches (coefficients IGRF, tables de Legendre...)
+    debut = time.perf_counter()
+    fonction()
+    duree = time.perf_counter() - debut
+    nombre = max(1, int(duree_min / max(duree, 1e-9)))
+
+    temps = []
+    for i in range(repetitions):
+        debut = time.perf_counter()
+        for j in range(nombre):
+            fonction()
+        temps.append((time.perf_counter() - debut) / nombre)
+
+    return {"min": min(temps), "mediane": float(np.median(temps)), "max": max(temps), "nombre": nombre,
+            "repetitions": repetitions}
+
+def points_cable(nombre_points, graine = 0):
+    """
+    Points d'une structure aléatoire, mise à l'échelle, dans le repère du satellite.
+
+    :param nombre_points: Nombre de points.
+    :type nombre_points: int
+    :param graine: Graine du générateur de nombres aléatoires.
+    :type graine: int
+
+    :return: Les points, de forme (nombre_points, 3) [m].
+    :rtype: ndarray
+    """
+    rng = np.random.default_rng(graine)
+    angles = np.column_stack((rng.random(nombre_points - 1) * 2 * np.pi, (rng.random(nombre_points - 1) - 0.5) * np.pi))
+    longueurs = np.full(nombre_points - 1, 100.0)
+    return st.mettre_a_echelle(st.generer_points(longueurs, angles), longueurs, 500)[0]
+
+def micro_igrf_gc(nombre_points):
+    rng = np.random.default_rng(0)
+    r = st.RAYON + rng.random(nombre_points)
+    theta = st.THETA + rng.random(nombre_points)
+    phi = st.PHI + rng.random(nombre_points)
+    return lambda: ppigrf.igrf_gc(r, theta, phi, st.DATE)
+
+def micro_get_legendre(nombre_points):
+    theta = np.linspace(1, 179, nombre_points)
+    keys = ppigrf.load_shc().keys
+    return lambda: ppigrf.get_legendre(theta, keys)
+
+def micro_parametre(nombre_points):
+    cable = points_cable(nombre_points)
+    return lambda: fe.Parametre(*POSITION, cable[:, 0], cable[:, 1], cable[:, 2], st.COURANT, st.VITESSE, 1.0)
+
+def micro_discret(nombre_points):
+    cable = np.array([[0.0, 0.0, 0.0], [100.0, 50.0, -20.0]])
+    return lambda: fe.Discret(*POSITION, cable, nombre_points, st.COURANT, st.VITESSE, 1.0)
+
+def micro_generation_structure(nombre_points):
+    np.random.seed(0)
+    structure = Structure(nombre_points, 100, 50)
+    return structure.generation_structure
+
+def micro_evaluer_force(nombre_points):
+    np.random.seed(0)
+    structure = Structure(nombre_points, 100, 50)
+    return structure.evaluer_force
+
+def macro_generation(nombre_points, nb_structures):
+    population = Population(nb_structures, nombre_points, 100, 100, 500, True, "igrf", np.random.default_rng(0))
+
+    def generation():
+        scores = population.scores(False, 0.5)
+        population.selection_biaisee(scores, max(1, nb_structures // 3), 4)
+        population.modifier_parametres(0.3, True, True)
+        population.melanger()
+
+    return generation
+
+def macro_optimisation(nombre_points, nb_iterations):
+    np.random.seed(0)
+    structure = Structure(nombre_points, 100, 100)
+
+    def optimiser():
+        # Chaque répétition part de la même structure, sans les évaluations gardées en mémoire par la précédente
+        st.memo_evaluations.vider()
+        optimisation(deepcopy(structure), nb_iterations=nb_iterations)
+
+    return optimiser
+
+# Mesures : nom, préparation (retourne la fonction à mesurer) et ses arguments
+MESURES = [
+    ("igrf_gc[1]", micro_igrf_gc, (1,)),
+    ("igrf_gc[31]", micro_igrf_gc, (31,)),
+    ("igrf_gc[10000]", micro_igrf_gc, (10000,)),
+    ("get_legendre[31]", micro_get_legendre, (31,)),
+    ("get_legendre[10000]", micro_get_legendre, (10000,)),
+    ("Parametre[31]", micro_parametre, (31,)),
+    ("Parametre[1000]", micro_parametre, (1000,)),
+    ("Discret[10]", micro_discret, (10,)),
+    ("Discret[100]", micro_discret, (100,)),
+    ("generation_structure[31]", micro_generation_structure, (31,)),
+    ("generation_structure[1000]", micro_generation_structure, (1000,)),
+    ("evaluer_force[31]", micro_evaluer_force, (31,)),
+    ("evaluer_force[1000]", micro_evaluer_force, (1000,)),
+    ("apprentissage.generation[points=31,structures=10]", macro_generation, (31, 10)),
+    ("apprentissage.generation[points=31,structures=100]", macro_generation, (31, 100)),
+    ("apprentissage.generation[points=101,structures=100]", macro_generation, (101, 100)),
+    ("optimisation[points=11,iterations=20]", macro_optimisation, (11, 20)),
+    ("optimisation[points=31,iterations=20]", macro_optimisation, (31, 20)),
+]
+
+def machine():
+    """
+    Description de la machine et de l'environnement, pour savoir si deux résultats sont comparables.
+
+    :return: Les informations de la machine.
+    :rtype: dict
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {"date": datetime.now().isoformat(timespec="seconds"), "plateforme": platform.platform(),
+            "processeur": platform.processor() or platform.machine(), "nb_coeurs": os.cpu_count(),
+            "python": platform.python_version(), "numpy": np.__version__, "commit": commit}
+
+def executer(filtre = None, repetitions = 5, duree_min = 0.2):
+    """
+    Exécute les mesures.
+
+    :param filtre: Expression régulière : seules les mesures dont le nom correspond sont exécutées.
+    :type filtre: str
+    :param repetitions: Nombre de répétitions de chaque mesure.
+    :type repetitions: int
+    :param duree_min: Durée minimale d'une répétition [s].
+    :type duree_min: float
+
+    :return: La description de la machine et les résultats des mesures.
+    :rtype: dict
+    """
+    resultats = {}
+    for nom, preparation, arguments in MESURES:
+        if filtre is not None and not re.search(filtre, nom):
+            continue
+
+        # Les algorithmes écrivent leur avancement : on ne garde que le tableau des résultats
+        with open(os.devnull, "w") as vide, contextlib.redirect_stdout(vide):
+            resultats[nom] = mesurer(preparation(*arguments), repetitions, duree_min)
+
+        print(" {:<55s} {:>12.4f} ms".format(nom, resultats[nom]["mediane"] * 1e3), flush=True)
+
+    return {"machine": machine(), "resultats": resultats}
+
+def comparer(reference, nouveau, seuil = 0.2):
+    """
+    Compare des résultats à une référence, mesure par mesure (temps médians).
+
+    :param reference: Résultats de référence (voir executer()).
+    :type reference: dict
+    :param nouveau: Nouveaux résultats.
+    :type nouveau: dict
+    :param seuil: Ralentissement relatif à partir duquel une mesure est signalée.
+    :type seuil: float
+
+    :return: Les noms des mesures plus lentes que la référence.
+    :rtype: list
+    """
+    if reference["machine"].get("processeur") != nouveau["machine"].get("processeur"):
+        print("Attention : les résultats ne viennent pas du même processeur.")
+
+    regressions = []
+    print(" {:<55s} {:>12s} {:>12s} {:>8s}".format("Mesure", "référence", "nouveau", "rapport"))
+    for nom, resultat in nouveau["resultats"].items():
+        if nom not in reference["resultats"]:
+            continue
+
+        rapport = resultat["mediane"] / reference["resultats"][nom]["mediane"]
+        regression = rapport > 1 + seuil
+        if regression:
+            regressions.append(nom)
+
+        print(" {:<55s} {:>9.4f} ms {:>9.4f} ms {:>7.2f}x{}".format(nom, reference["resultats"][nom]["mediane"] * 1e3,
+                                                                    resultat["mediane"] * 1e3, rapport,
+                                                                    "  RÉGRESSION" if regression else ""))
+
+    return regressions
+
+def principal(argv = None):
+    """
+    Point d'entrée de la suite de mesures.
+
+    :param argv: Arguments (par défaut, ceux de la ligne de commande).
+    :type argv: list
+    """
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Mesures des temps de calcul.")
+    commandes = parser.add_subparsers(dest="commande", required=True)
+
+    run = commandes.add_parser("run", help="Exécuter les mesures")
+    run.add_argument("--sortie", default=None, help="Fichier JSON des résultats")
+    run.add_argument("--filtre", default=None, help="Expression régulière sur le nom des mesures à exécuter")
+    run.add_argument("--repetitions", type=int, default=5, help="Nombre de répétitions de chaque mesure")
+    run.add_argument("--duree-min", type=float, default=0.2, help="Durée minimale d'une répétition [s]")
+
+    compare = commandes.add_parser("compare", help="Comparer des résultats à une référence")
+    compare.add_argument("reference", help="Fichier JSON des résultats de référence")
+    compare.add_argument("nouveau", help="Fichier JSON des nouveaux résultats")
+    compare.add_argument("--seuil", type=float, default=0.2, help="Ralentissement relatif signalé comme une régression")
+
+    arguments = parser.parse_args(argv)
+
+    if arguments.commande == "run":
+        resultats = executer(arguments.filtre, arguments.repetitions, arguments.duree_min)
+        if arguments.sortie:
+            with open(arguments.sortie, "w", encoding="utf-8") as fichier:
+                json.dump(resultats, fichier, ensure_ascii=False, indent=2)
+
+    else:
+        with open(arguments.reference, encoding="utf-8") as fichier:
+            reference = json.load(fichier)
+        with open(arguments.nouveau, encoding="utf-8") as fichier:
+            nouveau = json.load(fichier)
+
+        regressions = comparer(reference, nouveau, arguments.seuil)
+        if regressions:
+            print("\n" + str(len(regressions)) + " régression(s) au-delà de " + str(round(arguments.seuil * 100)) + " %.")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    principal()
@@ -0,0 +1,73 @@
+"""
+Mesure du temps de calcul de la génération des points d'une structure.
+
+On compare le calcul vectorisé generer_points() (somme cumulée des incréments) à l'ancienne boucle point par point,
+puis on mesure Structure.generation_structure() au complet (points, mise à l'échelle et évaluation de la force).
+
+Utilisation, depuis la racine du projet :
+
+    python -m benchmarks.generation_structure
+"""
+import numpy as np
+from timeit import timeit
+from structure import Structure, generer_points
+
+def generer_points_boucle(longueur_segments, angles):
+    """
+    Ancienne génération des points, un point à la fois, gardée comme référence.
+
+    :param longueur_segments: Longueurs des segments, de forme (N-1,).
+    :type longueur_segments: ndarray
+    :param angles: Angles theta et phi des segments, de forme (N-1, 2).
+    :type angles: ndarray
+
+    :return: Les points de la structure, de forme (N, 3).
+    :rtype: ndarray
+    """
+    points = np.zeros((len(longueur_segments) + 1, 3))
+    encombrements = np.zeros_like(longueur_segments)
+
+    for i in range(len(longueur_segments)):
+
+        points[i+1, :] = [points[i, 0] + longueur_segments[i] * np.sin(angles[i, 0]) * np.cos(angles[i, 1]),
+                          points[i, 1] + longueur_segments[i] * np.sin(angles[i, 0]) * np.sin(angles[i, 1]),
+                          points[i, 2] + longueur_segments[i] * np.cos(angles[i, 0])]
+
+        encombrements[i] = (points[i+1, 0]**2 + points[i+1, 1]**2 + points[i+1, 2]**2)**0.5
+
+    return points
+
+def mesurer(nombre_points, repetitions=None):
+    """
+    Mesure les temps de calcul pour une structure de nombre_points points.
+
+    :param nombre_points: Nombre de points de la structure.
+    :type nombre_points: int
+    :param repetitions: Nombre de répétitions de chaque mesure (par défaut, selon la taille).
+    :type repetitions: int
+
+    :return: Les temps moyens [s] de la boucle, de generer_points() et de generation_structure().
+    :rtype: tuple
+    """
+    if repetitions is None:
+        repetitions = max(1, 20000 // nombre_points)
+
+    structure = Structure(nombre_points, 100, 50)
+    longueurs, angles = structure.montrer_parametres()
+
+    # On vérifie que les deux calculs donnent les mêmes points
+    np.testing.assert_allclose(generer_points(longueurs, angles), generer_points_boucle(longueurs, angles), rtol=1e-10, atol=1e-9)
+
+    t_boucle = timeit(lambda: generer_points_boucle(longueurs, angles), number=repetitions) / repetitions
+    t_vectorise = timeit(lambda: generer_points(longueurs, angles), number=repetitions) / repetitions
+    t_complet = timeit(structure.generation_structure, number=max(1, repetitions // 10)) / max(1, repetitions // 10)
+
+    return t_boucle, t_vectorise, t_complet
+
+if __name__ == "__main__":
+
+    print(" Nombre de points       boucle    generer_points    accélération    generation_structure")
+    for nombre_points in [31, 100, 1000, 10000]:
+        t_boucle, t_vectorise, t_complet = mesurer(nombre_points)
+        print(" {:>16d} {:>9.3f} ms {:>14.3f} ms {:>14.0f}x {:>20.3f} ms".format(
+            nombre_points, t_boucle * 1e3, t_vectorise * 1e3, t_boucle / t_vectorise, t_complet * 1e3))
@@ -0,0 +1,76 @@
+"""
+Mesure du temps d'importation des modules de calcul.
+
+Chaque module est importé dans un nouvel interpréteur Python, pour mesurer un démarrage à froid comme celui d'un
+processus de travail ou d'un lancement en ligne de commande. On vérifie aussi qu'aucune bibliothèque d'affichage ou
+lourde (streamlit, plotly, matplotlib, pandas, scipy, astropy) n'est chargée : elles ne doivent l'être qu'au moment de
+s'en servir.
+
+Utilisation, depuis la racine du projet :
+
+    python -m benchmarks.temps_import
+    python -m benchmarks.temps_import --verifier
+
+Avec --verifier, le programme se termine avec une erreur si un module charge une bibliothèque interdite.
+"""
+import sys
+import json
+import subprocess
+
+# Modules mesurés
+MODULES = ["Calcul_Force_EM.Cable", "Calcul_Force_EM.Force_Electro", "Calcul_Force_EM.ModeleChamp", "structure",
+           "population", "apprentissage", "optimisation", "ligne_commande"]
+
+# Bibliothèques qui ne doivent pas être chargées par l'importation des modules de calcul
+INTERDITES = ["streamlit", "plotly", "matplotlib", "pandas", "scipy", "astropy"]
+
+# Programme exécuté dans le nouvel interpréteur
+PROGRAMME = """
+import sys, time, json
+debut = time.perf_counter()
+import numpy
+numpy_fin = time.perf_counter()
+import {module}
+fin = time.perf_counter()
+racines = {{nom.split(".")[0] for nom in sys.modules}}
+print(json.dumps({{"numpy": numpy_fin - debut, "module": fin - numpy_fin,
+                  "chargees": sorted(racines & set({interdites}))}}))
+"""
+
+def mesurer(module, repetitions = 5):
+    """
+    Mesure le temps d'importation d'un module dans un nouvel interpréteur.
+
+    :param module: Nom du module à importer.
+    :type module: str
+    :param repetitions: Nombre de mesures. On garde la plus rapide.
+    :type repetitions: int
+
+    :return: Temps d'importation de numpy et du module (sans numpy) [s], et bibliothèques interdites chargées.
+    :rtype: tuple
+    """
+    programme = PROGRAMME.format(module=module, interdites=INTERDITES)
+    mesures = []
+    for i in range(repetitions):
+        sortie = subprocess.run([sys.executable, "-c", programme], capture_output=True, text=True, check=True)
+        mesures.append(json.loads(sortie.stdout.strip().splitlines()[-1]))
+
+    meilleure = min(mesures, key=lambda mesure: mesure["module"])
+    return meilleure["numpy"], meilleure["module"], meilleure["chargees"]
+
+if __name__ == "__main__":
+
+    verifier = "--verifier" in sys.argv
+    erreurs = []
+
+    print(" Module                              numpy      module    bibliothèques interdites chargées")
+    for module in MODULES:
+        t_numpy, t_module, chargees = mesurer(module)
+        print(" {:<30s} {:>9.1f} ms {:>8.1f} ms    {}".format(module, t_numpy * 1e3, t_module * 1e3,
+                                                            ", ".join(chargees) or "-"))
+        if chargees:
+            erreurs.append(module + " : " + ", ".join(chargees))
+
+    if verifier and erreurs:
+        print("\nImportations trop lourdes :\n  " + "\n  ".join(erreurs))
+        sys.exit(1)
@@ -0,0 +1,140 @@
+"""
+Abonnés aux événements émis par les algorithmes (apprentissage, optimisation).
+
+Les algorithmes ne dessinent rien eux-mêmes : à chaque étape, ils envoient un événement léger (nom et dictionnaire de
+données) à un abonné, qui en fait ce qu'il veut (affichage Streamlit, journal, etc.). Les données ne sont préparées que
+si l'abonné est actif :
+
+    if abonne.actif:
+        abonne.recevoir("iteration", {"iteration": i, "score_max": score_max})
+
+Événements émis :
+    - "progression"    valeur (entre 0 et 1), texte
+    - "iteration"      apprentissage : iteration, nb_iterations, score_max, score_min, meilleur_score, scores_max,
+                       scores_min, et pour la meilleure structure : parametres, points (câble, voir
+                       Structure.montrer_cable()), encombrement, poids, force
+    - "optimisation"   optimisation : iteration, nb_iterations, score, parametres, points, encombrement, poids, force
+    - "fin"            fin d'un algorithme : algorithme, score
+"""
+
+import time
+
+class Abonne:
+    """
+    Interface des abonnés aux événements. Un abonné doit redéfinir recevoir(), et peut redéfinir terminer() s'il garde
+    des événements en attente.
+    """
+    # Si faux, les algorithmes ne préparent ni n'envoient aucun événement
+    actif = True
+
+    def recevoir(self, nom, donnees):
+        """
+        Reçoit un événement.
+
+        :param nom: Nom de l'événement.
+        :type nom: str
+        :param donnees: Données de l'événement.
+        :type donnees: dict
+        """
+        raise NotImplementedError
+
+    def terminer(self):
+        """
+        Appelée à la fin d'un algorithme, pour traiter les événements en attente.
+        """
+        pass
+
+class AbonneNul(Abonne):
+    """
+    Abonné qui ne fait rien. Comme il est inactif, les algorithmes ne préparent même pas les données des événements.
+    """
+    actif = False
+
+    def recevoir(self, nom, donnees):
+        pass
+
+# Abonné par défaut des algorithmes
+ABONNE_NUL = AbonneNul()
+
+class AbonneLimite(Abonne):
+    """
+    Limite la fréquence des événements transmis à un abonné, par exemple pour ne redessiner une figure qu'au plus toutes
+    les 'intervalle' secondes. Un événement arrivé trop tôt n'est pas transmis mais gardé : seul le dernier de chaque nom
+    est transmis, juste avant le prochain événement toujours transmis ou lors de terminer().
+    """
+    def __init__(self, abonne, intervalle = 1.0, toujours = ("fin",)):
+        """
+        :param abonne: Abonné à qui transmettre les événements.
+        :type abonne: Abonne
+        :param intervalle: Temps minimal entre deux événements de même nom [s].
+        :type intervalle: float
+        :param toujours: Noms des événements toujours transmis.
+        :type toujours: tuple
+        """
+        self.abonne = abonne
+        self.actif = abonne.actif
+        self.intervalle = intervalle
+        self.toujours = toujours
+        self.derniers = {}
+        self.en_attente = {}
+
+    def recevoir(self, nom, donnees):
+        if nom in self.toujours:
+            self.vider()
+            self.abonne.recevoir(nom, donnees)
+            return
+
+        maintenant = time.monotonic()
+        if maintenant - self.derniers.get(nom, -float("inf")) >= self.intervalle:
+            self.derniers[nom] = maintenant
+            self.en_attente.pop(nom, None)
+            self.abonne.recevoir(nom, donnees)
+        else:
+            self.en_attente[nom] = donnees
+
+    def vider(self):
+        """
+        Transmet les événements en attente.
+        """
+        for nom, donnees in self.en_attente.items():
+            self.abonne.recevoir(nom, donnees)
+        self.en_attente.clear()
+
+    def terminer(self):
+        self.vider()
+        self.abonne.terminer()
+
+class Diffuseur(Abonne):
+    """
+    Transmet chaque événement à plusieurs abonnés. Les abonnés inactifs sont ignorés ; s'il n'en reste aucun, le
+    diffuseur est inactif.
+    """
+    def __init__(self, *abonnes):
+        """
+        :param abonnes: Abonnés à qui transmettre les événements.
+        :type abonnes: Abonne
+        """
+        self.abonnes = [abonne for abonne in abonnes if abonne.actif]
+        self.actif = len(self.abonnes) > 0
+
+    def recevoir(self, nom, donnees):
+        for abonne in self.abonnes:
+            abonne.recevoir(nom, donnees)
+
+    def terminer(self):
+        for abonne in self.abonnes:
+            abonne.terminer()
+
+class AbonneFonction(Abonne):
+    """
+    Transmet chaque événement à une fonction fonction(nom, donnees).
+    """
+    def __init__(self, fonction):
+        """
+        :param fonction: Fonction à appeler.
+        :type fonction: function
+        """
+        self.fonction = fonction
+
+    def recevoir(self, nom, donnees):
+        self.fonction(nom, donnees)
@@ -0,0 +1,124 @@
+import os
+from itertools import repeat
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from Calcul_Force_EM import ppigrf
+import Calcul_Force_EM.ModeleChamp as mc
+import Calcul_Force_EM.Instrumentation as instr
+
+# Modes d'exécution disponibles
+MODES = ["serial", "threads", "processes"]
+
+def initialiser_processus(coefficients, fichier, dossier_tuiles = None):
+    """
+    Initialisation d'un processus de travail : on installe les coefficients du modèle IGRF, lus une seule fois par le
+    processus principal, dans le cache du processus. Ils ne sont ainsi ni relus depuis le fichier ni envoyés avec
+    chaque tâche. Le processus enregistre et relit aussi les tuiles de champ dans le même dossier que le processus
+    principal.
+
+    :param coefficients: Coefficients du modèle IGRF (voir ppigrf.load_shc).
+    :type coefficients: SHCCoefficients
+    :param fichier: Fichier .shc dont les coefficients ont été lus.
+    :type fichier: str
+    :param dossier_tuiles: Dossier des tuiles de champ (voir Calcul_Force_EM/ModeleChamp.py).
+    :type dossier_tuiles: str
+    """
+    ppigrf.install(coefficients, fichier)
+    mc.DOSSIER_TUILES = dossier_tuiles
+
+def executer_mesure(fonction, *arguments):
+    """
+    Exécute une tâche dans un processus de travail avec la mesure des temps et des compteurs active (voir
+    Calcul_Force_EM/Instrumentation.py), et retourne aussi la mesure de cette tâche, que le processus principal ajoute à
+    la sienne.
+
+    :param fonction: Fonction à appliquer.
+    :type fonction: function
+    :param arguments: Arguments de la fonction.
+    :type arguments: tuple
+
+    :return: Le résultat de la fonction et la mesure (voir Instrumentation.resume()).
+    :rtype: tuple
+    """
+    instr.reinitialiser()
+    instr.activer()
+    resultat = fonction(*arguments)
+    return resultat, instr.resume()
+
+class Executeur:
+    """
+    Exécute une même fonction sur une liste de tâches, soit à la suite ("serial"), soit dans un groupe de fils
+    d'exécution ("threads"), soit dans un groupe de processus ("processes"). Le groupe n'est créé qu'une fois et sert
+    pour toutes les tâches jusqu'à fermer(). Si la mesure des temps et des compteurs est active, celle des processus de
+    travail est ajoutée à celle du processus principal (voir executer_mesure()).
+
+    S'utilise aussi avec with :
+
+        with Executeur("processes", 8) as executeur:
+            resultats = executeur.map(fonction, taches)
+    """
+    def __init__(self, mode = "serial", nb_workers = None):
+        """
+        :param mode: Mode d'exécution : "serial", "threads" ou "processes".
+        :type mode: str
+        :param nb_workers: Nombre de fils ou de processus. Si aucun n'est donné, on utilise le nombre de cœurs.
+        :type nb_workers: int
+        """
+        if mode not in MODES:
+            raise Exception("Mode d'exécution inconnu : " + str(mode) + ". Modes disponibles : " + ", ".join(MODES))
+
+        self.mode = mode
+        self.nb_workers = 1 if mode == "serial" else (nb_workers or os.cpu_count() or 1)
+        self.groupe = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.fermer()
+
+    def demarrer(self):
+        """
+        Crée le groupe de fils ou de processus s'il n'existe pas encore. Les processus reçoivent les coefficients du
+        modèle IGRF et le dossier des tuiles de champ à leur démarrage.
+        """
+        if self.groupe is None:
+            if self.mode == "threads":
+                self.groupe = ThreadPoolExecutor(max_workers=self.nb_workers)
+            elif self.mode == "processes":
+                self.groupe = ProcessPoolExecutor(max_workers=self.nb_workers, initializer=initialiser_processus,
+                                                  initargs=(ppigrf.load_shc(), ppigrf.shc_fn, mc.DOSSIER_TUILES))
+
+    def map(self, fonction, *taches):
+        """
+        Applique la fonction à chacune des tâches et retourne les résultats dans l'ordre des tâches.
+
+        :param fonction: Fonction à appliquer. En mode "processes", elle doit être définie au niveau d'un module.
+        :type fonction: function
+        :param taches: Listes des arguments de la fonction, comme pour map().
+        :type taches: list
+
+        :return: Les résultats de la fonction.
+        :rtype: list
+        """
+        if self.mode == "serial":
+            return list(map(fonction, *taches))
+
+        self.demarrer()
+        if self.mode == "processes" and instr.ACTIF:
+            # La mesure est faite dans chaque processus de travail, puis ajoutée à celle du processus principal
+            resultats = []
+            for resultat, mesure in self.groupe.map(executer_mesure, repeat(fonction), *taches):
+                instr.fusionner(mesure)
+                resultats.append(resultat)
+            return resultats
+
+        return list(self.groupe.map(fonction, *taches))
+
+    def fermer(self):
+        """
+        Arrête le groupe de fils ou de processus.
+        """
+        if self.groupe is not None:
+            self.groupe.shutdown()
+            self.groupe = None
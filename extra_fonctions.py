@@ -1,7 +1,7 @@
 from random import random as rd
 import numpy as np
 
-def choix_biaises(liste_de_choix, nb_de_choix, biais):
+def choix_biaises(liste_de_choix, nb_de_choix, biais, rng = None):
     """
     Sélectionne un certain nombre d'éléments d'une liste avec un biais donné.
 
@@ -11,6 +11,8 @@ def choix_biaises(liste_de_choix, nb_de_choix, biais):
     :type nb_de_choix: int
     :param biais: Facteur de biais pour influencer les choix (plus bas, plus les premiers éléments sont favorisés).
     :type biais: float
+    :param rng: Générateur de nombres aléatoires (np.random.Generator). Si aucun n'est donné, on utilise random.random.
+    :type rng: Generator
     
     :return: Liste des éléments sélectionnés avec biais.
     :rtype: list
@@ -25,7 +27,8 @@ def choix_biaises(liste_de_choix, nb_de_choix, biais):
     # Sélection des éléments avec biais
     for i in range(nb_de_choix):
         # Calcul de la position dans la liste en fonction du biais
-        position = int((rd()**(1/biais))*len(liste_de_choix_modifiee))
+        tirage = rd() if rng is None else rng.random()
+        position = int((tirage**(1/biais))*len(liste_de_choix_modifiee))
 
         # Ajout de l'élément sélectionné à la liste des choix
         choix.append(liste_de_choix_modifiee[position])
@@ -0,0 +1,253 @@
+"""
+Lancement de l'apprentissage et de l'optimisation sans interface graphique, par exemple sur un nœud de calcul :
+
+    python -m ligne_commande --nb-structures 200 --nb-iterations 50 --graine 1 --execution processes --sortie resultats
+
+Tous les paramètres de l'interface (main.py) sont disponibles, ainsi que la graine, le nombre de fils ou de processus et
+le dossier de sortie. La progression est écrite sur la sortie standard ou dans un journal au format JSON lines (une
+ligne JSON par étape).
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import contextlib
+import numpy as np
+
+from apprentissage import apprentissage
+from optimisation import optimisation, optimisation_multi_depart
+from evenements import Abonne
+import Calcul_Force_EM.Instrumentation as instr
+
+def en_json(valeur):
+    """
+    Conversion des valeurs que json ne connaît pas (tableaux et nombres numpy).
+
+    :param valeur: Valeur à convertir.
+    :type valeur: object
+
+    :return: La valeur convertie.
+    :rtype: list or float
+    """
+    if isinstance(valeur, np.ndarray):
+        return valeur.tolist()
+    return float(valeur)
+
+class JournalProgression(Abonne):
+    """
+    Abonné aux événements des algorithmes qui remplace l'affichage de l'interface : chaque événement est écrit sous
+    forme d'une ligne JSON, dans un fichier ou sur la sortie standard.
+    """
+    def __init__(self, fichier = None):
+        """
+        :param fichier: Chemin du journal. Si aucun n'est donné, on écrit sur la sortie standard.
+        :type fichier: str
+        """
+        self.flux = open(fichier, "a", encoding="utf-8") if fichier else sys.stdout
+        self.debut = time.perf_counter()
+
+    def ecrire(self, evenement, **donnees):
+        """
+        Écrit une ligne du journal.
+
+        :param evenement: Nom de l'étape.
+        :type evenement: str
+        :param donnees: Données de l'étape.
+        :type donnees: dict
+        """
+        ligne = {"evenement": evenement, "temps": round(time.perf_counter() - self.debut, 3)}
+        ligne.update(donnees)
+        self.flux.write(json.dumps(ligne, ensure_ascii=False, default=en_json) + "\n")
+        self.flux.flush()
+
+    def recevoir(self, nom, donnees):
+        """
+        Écrit un événement des algorithmes (voir evenements.py). La fin d'un algorithme est écrite par lancer() et
+        executer().
+
+        :param nom: Nom de l'événement.
+        :type nom: str
+        :param donnees: Données de l'événement.
+        :type donnees: dict
+        """
+        if nom != "fin":
+            self.ecrire(nom, **donnees)
+
+    def fermer(self):
+        """
+        Ferme le fichier du journal.
+        """
+        if self.flux is not sys.stdout:
+            self.flux.close()
+
+def booleen(texte):
+    """
+    Convertit un argument de la ligne de commande en booléen.
+
+    :param texte: Argument ("oui", "non", "true", "false", "1", "0"...).
+    :type texte: str
+
+    :return: La valeur de l'argument.
+    :rtype: bool
+    """
+    if texte.lower() in ("1", "true", "vrai", "oui", "o", "yes", "y"):
+        return True
+    if texte.lower() in ("0", "false", "faux", "non", "n", "no"):
+        return False
+    raise argparse.ArgumentTypeError("Valeur booléenne attendue : " + texte)
+
+def analyseur():
+    """
+    Crée l'analyseur des arguments de la ligne de commande, avec les mêmes valeurs par défaut que l'interface.
+
+    :return: L'analyseur.
+    :rtype: ArgumentParser
+    """
+    parser = argparse.ArgumentParser(prog="python -m ligne_commande",
+                                     description="Apprentissage et optimisation d'une structure sans interface graphique.")
+
+    # Apprentissage
+    parser.add_argument("--nb-points", type=int, default=31, help="Nombre de points dans la structure")
+    parser.add_argument("--longueur-min", type=float, default=100.0, help="Longueur minimale des segments")
+    parser.add_argument("--longueur-max", type=float, default=100.0, help="Longueur maximale des segments")
+    parser.add_argument("--encombrement-cible", type=float, default=500.0, help="Valeur cible de l'encombrement")
+    parser.add_argument("--nb-structures", type=int, default=10, help="Nombre de structures à générer par itération")
+    parser.add_argument("--nb-structures-a-garder", type=int, default=4, help="Nombre de structures à garder par itération")
+    parser.add_argument("--nb-iterations", type=int, default=10, help="Nombre d'itérations")
+    parser.add_argument("--temperature-debut", type=float, default=0.5, help="Température initiale")
+    parser.add_argument("--temperature-fin", type=float, default=0.2, help="Température finale")
+    parser.add_argument("--tridimensionnel", type=booleen, default=True, help="Structure tridimensionnelle (oui/non)")
+    parser.add_argument("--induit", type=booleen, default=False, help="Champs induit (oui/non)")
+    parser.add_argument("--b", type=float, default=0.5, help="Importance du poids dans le calcul du score")
+    parser.add_argument("--biais", type=float, default=4, help="Biais de sélection des structures")
+    parser.add_argument("--modele-champ", choices=["igrf", "taylor", "tuile"], default="igrf",
+                        help="Modèle du champ magnétique pendant l'apprentissage")
+    parser.add_argument("--dossier-tuiles", default=None,
+                        help="Dossier où enregistrer et relire les tuiles du modèle de champ \"tuile\"")
+
+    # Optimisation
+    parser.add_argument("--optimiser", type=booleen, default=True, help="Optimiser la structure après l'apprentissage (oui/non)")
+    parser.add_argument("--nb-iterations-optimisation", type=int, default=20, help="Nombre d'itérations d'optimisation")
+    parser.add_argument("--tolerance", type=float, default=0.01, help="Tolérance de convergence de l'optimisation (voir optimisation.affiner)")
+    parser.add_argument("--methode", choices=["Nelder-Mead", "L-BFGS-B"], default="Nelder-Mead", help="Méthode d'optimisation")
+    parser.add_argument("--nb-departs", type=int, default=1, help="Nombre de points de départ de l'optimisation")
+
+    # Exécution et sorties
+    parser.add_argument("--graine", type=int, default=None, help="Graine du générateur de nombres aléatoires")
+    parser.add_argument("--execution", choices=["serial", "threads", "processes"], default="serial",
+                        help="Exécution de la génération des structures et de l'optimisation multi-départ")
+    parser.add_argument("--nb-workers", type=int, default=None, help="Nombre de fils ou de processus (par défaut, le nombre de cœurs)")
+    parser.add_argument("--sortie", default="Structures", help="Dossier où enregistrer la structure et les résultats")
+    parser.add_argument("--archive", default=None, help="Dossier d'une archive de structures (voir archive.py) où ajouter la structure obtenue")
+    parser.add_argument("--journal", default=None, help="Fichier du journal de progression (JSON lines). Par défaut, la sortie standard.")
+    parser.add_argument("--point-de-controle", default=None, help="Fichier (.npz) où enregistrer régulièrement l'état de l'apprentissage")
+    parser.add_argument("--frequence-iterations", type=int, default=None, help="Nombre d'itérations entre deux points de contrôle (par défaut, à chaque itération si --frequence-secondes n'est pas donné)")
+    parser.add_argument("--frequence-secondes", type=float, default=None, help="Temps minimal entre deux points de contrôle [s]")
+    parser.add_argument("--reprendre", action="store_true", help="Reprendre l'apprentissage à partir du point de contrôle s'il existe")
+    parser.add_argument("--instrumentation", default=None,
+                        help="Fichier JSON des temps par phase et des compteurs. Le tableau est aussi écrit sur la sortie d'erreur.")
+
+    return parser
+
+def lancer(arguments):
+    """
+    Lance l'apprentissage, puis l'optimisation si demandée, et enregistre la structure obtenue et un résumé des
+    résultats dans le dossier de sortie.
+
+    :param arguments: Arguments de la ligne de commande (voir analyseur()).
+    :type arguments: Namespace
+
+    :return: Le score final et la structure obtenue.
+    :rtype: tuple
+    """
+    journal = JournalProgression(arguments.journal)
+    journal.ecrire("debut", parametres=vars(arguments))
+
+    # Mesure des temps par phase et des compteurs si demandée
+    if arguments.instrumentation:
+        instr.reinitialiser()
+        instr.activer()
+
+    # Les messages des algorithmes vont sur la sortie d'erreur, pour que la sortie standard ne contienne que le journal
+    with contextlib.redirect_stdout(sys.stderr):
+        score, structure = executer(arguments, journal)
+
+    if arguments.instrumentation:
+        instr.desactiver()
+        instr.sauvegarder(arguments.instrumentation)
+        print(instr.tableau(), file=sys.stderr)
+        journal.ecrire("instrumentation", **instr.resume())
+
+    journal.ecrire("fin", score=score, sortie=arguments.sortie)
+    journal.fermer()
+
+    return score, structure
+
+def executer(arguments, journal):
+    """
+    Suite des calculs de lancer() : apprentissage, optimisation et enregistrement des résultats.
+
+    :param arguments: Arguments de la ligne de commande (voir analyseur()).
+    :type arguments: Namespace
+    :param journal: Journal de progression.
+    :type journal: JournalProgression
+
+    :return: Le score final et la structure obtenue.
+    :rtype: tuple
+    """
+    # Graine aussi pour les tirages faits par les structures elles-mêmes
+    if arguments.graine is not None:
+        np.random.seed(arguments.graine % 2**32)
+
+    score, structure = apprentissage(arguments.nb_points, arguments.longueur_max, arguments.longueur_min,
+                                     arguments.nb_structures, arguments.nb_structures_a_garder, arguments.nb_iterations,
+                                     arguments.temperature_debut, arguments.temperature_fin, arguments.encombrement_cible,
+                                     arguments.tridimensionnel, arguments.induit, arguments.b, arguments.biais,
+                                     abonne=journal, modele_champ=arguments.modele_champ,
+                                     execution=arguments.execution, nb_workers=arguments.nb_workers,
+                                     graine=arguments.graine, point_de_controle=arguments.point_de_controle,
+                                     frequence_iterations=arguments.frequence_iterations,
+                                     frequence_secondes=arguments.frequence_secondes, reprendre=arguments.reprendre,
+                                     dossier_tuiles=arguments.dossier_tuiles)
+    journal.ecrire("resultat", algorithme="apprentissage", score=score)
+
+    if arguments.optimiser:
+        if arguments.nb_departs > 1:
+            score, structure, resultats = optimisation_multi_depart(structure, arguments.induit, arguments.b,
+                                                                    arguments.tridimensionnel,
+                                                                    arguments.nb_iterations_optimisation,
+                                                                    arguments.tolerance, arguments.execution,
+                                                                    arguments.nb_workers, arguments.nb_departs,
+                                                                    methode=arguments.methode)
+        else:
+            score, structure = optimisation(structure, arguments.induit, arguments.b, arguments.tridimensionnel,
+                                            arguments.nb_iterations_optimisation, arguments.tolerance,
+                                            methode=arguments.methode, abonne=journal)
+        journal.ecrire("resultat", algorithme="optimisation", score=score)
+
+    # Enregistrement de la structure et du résumé
+    os.makedirs(arguments.sortie, exist_ok=True)
+    structure.sauvegarde(os.path.join(arguments.sortie, "structure"))
+    if arguments.archive:
+        structure.sauvegarde_archive(arguments.archive, arguments.induit, arguments.b, metadonnees=vars(arguments))
+    enc, poi, force = structure.montrer_performance(arguments.induit)
+    resume = {"score": float(score), "encombrement": float(enc), "poids": float(poi), "force": float(force),
+              "parametres": vars(arguments)}
+    with open(os.path.join(arguments.sortie, "resultats.json"), "w", encoding="utf-8") as fichier:
+        json.dump(resume, fichier, ensure_ascii=False, indent=2)
+
+    return score, structure
+
+def principal(argv = None):
+    """
+    Point d'entrée de la ligne de commande.
+
+    :param argv: Arguments (par défaut, ceux de la ligne de commande).
+    :type argv: list
+    """
+    lancer(analyseur().parse_args(argv))
+
+if __name__ == "__main__":
+    principal()
@@ -1,9 +1,84 @@
 import streamlit as st
 from apprentissage import apprentissage
-from optimisation import optimisation
-from structure import Structure as St
+from optimisation import optimisation, optimisation_multi_depart
+from structure import Structure as St, visualiser_cable
+from evenements import Abonne, AbonneLimite
 import plotly.graph_objects as go
 
+class AbonneStreamlit(Abonne):
+    """
+    Affichage dans l'interface des événements de l'apprentissage et de l'optimisation (voir evenements.py) : barre de
+    progression, scores par itération et meilleure structure.
+    """
+    def __init__(self, barre_de_progression, figure_performance, espace_performance, figure_apprentissage,
+                 espace_apprentissage, figure_optimisation, espace_optimisation):
+        """
+        :param barre_de_progression: Barre de progression.
+        :type barre_de_progression: barre de progression streamlit
+        :param figure_performance: Figure des scores par itération.
+        :type figure_performance: figure plotly
+        :param espace_performance: Espace réservé pour la figure des scores.
+        :type espace_performance: espace streamlit
+        :param figure_apprentissage: Figure de la meilleure structure de l'apprentissage.
+        :type figure_apprentissage: figure plotly
+        :param espace_apprentissage: Espace réservé pour la figure de l'apprentissage.
+        :type espace_apprentissage: espace streamlit
+        :param figure_optimisation: Figure de la structure en cours d'optimisation.
+        :type figure_optimisation: figure plotly
+        :param espace_optimisation: Espace réservé pour la figure de l'optimisation.
+        :type espace_optimisation: espace streamlit
+        """
+        self.barre = barre_de_progression
+        self.figure_performance = figure_performance
+        self.espace_performance = espace_performance
+        self.figure_apprentissage = figure_apprentissage
+        self.espace_apprentissage = espace_apprentissage
+        self.figure_optimisation = figure_optimisation
+        self.espace_optimisation = espace_optimisation
+        # Compteur pour donner une clé unique à chaque graphique
+        self.compteur = 0
+
+    def recevoir(self, nom, donnees):
+        if nom == "progression":
+            self.barre.progress(donnees["valeur"], text=donnees["texte"])
+        elif nom == "iteration":
+            self.afficher_scores(donnees["scores_max"], donnees["scores_min"], donnees["nb_iterations"])
+            self.afficher_structure(donnees, donnees["meilleur_score"], self.figure_apprentissage,
+                                    self.espace_apprentissage)
+        elif nom == "optimisation":
+            self.afficher_structure(donnees, donnees["score"], self.figure_optimisation,
+                                    self.espace_optimisation)
+
+    def afficher_scores(self, scores_max, scores_min, nb_iterations):
+        """
+        Affiche les scores maximum et minimum de chaque itération.
+        """
+        self.figure_performance.data = []
+        self.figure_performance.add_trace(go.Scatter(
+            x=list(range(nb_iterations + 1)), y=scores_max,
+            marker=dict(size=4, color="red"),
+            line=dict(color="red", width=2),
+            name="Score maximum par itération"))
+        self.figure_performance.add_trace(go.Scatter(
+            x=list(range(nb_iterations + 1)), y=scores_min,
+            marker=dict(size=4, color="blue"),
+            line=dict(color="blue", width=2),
+            name="Score minimum par itération"))
+        self.compteur += 1
+        with self.espace_performance:
+            st.plotly_chart(self.figure_performance, key="perf"+str(self.compteur))
+
+    def afficher_structure(self, donnees, score, figure, espace):
+        """
+        Affiche une structure à partir des points du câble et des performances envoyés avec l'événement.
+        """
+        titre = ("Score : " + str(score) + ", Encombrement = " + str(donnees["encombrement"]) + ", poids = " +
+                 str(donnees["poids"]) + ", force = " + str(donnees["force"]) + ".")
+        visualiser_cable(figure, donnees["points"], titre)
+        self.compteur += 1
+        with espace:
+            st.plotly_chart(figure, key="structure"+str(self.compteur), use_container_width=False)
+
 # Configuration de la mise en page de Streamlit
 st.set_page_config(layout="wide")
 
@@ -54,25 +129,37 @@ with col1:
     induit = st.checkbox('Champs induit', value=False)
     b = st.number_input('Importance du poids dans le calcul du score : ', min_value=0.0, value=0.5)
     biais = st.number_input('Biais de sélection des structures : ', min_value=1, value=4)
+    modele_champ = st.selectbox('Modèle du champ magnétique pendant l\'apprentissage : ', ["igrf", "taylor", "tuile"], index=0)
+    execution = st.selectbox('Exécution de la génération des structures : ', ["serial", "threads", "processes"], index=0)
+    nb_workers = st.number_input('Nombre de fils ou de processus : ', min_value=1, value=4)
     optimiser = st.checkbox('Optimiser la structure après l\'apprentissage', value=True)
     if optimiser == True:  # Si l'optimisation est activée, afficher des paramètres supplémentaires
         nb_iterations_optimisation = st.number_input('Nombre d\'itérations d\'optimisation : ', min_value=2, value=20)
         tolerance = st.number_input('Tolérance : ', min_value=0.0, max_value=1.0, value=0.01)
+        methode = st.selectbox('Méthode d\'optimisation : ', ["Nelder-Mead", "L-BFGS-B"], index=0)
+        nb_departs = st.number_input('Nombre de points de départ de l\'optimisation : ', min_value=1, value=1)
 
 # Gestion des actions utilisateur dans la deuxième colonne (col2)
 with col2:
     if st.button('Démarrer apprentissage'):  # Bouton pour démarrer le processus d'apprentissage
         
-        # Afficher le graphique d'apprentissage
+        # Afficher les graphiques d'apprentissage
+        with espace_performance:
+            st.plotly_chart(performances_graph, key="perf")
         with espace_apprentissage:
             st.plotly_chart(structure_apprentissage_graph, key="appr", use_container_width=False)
 
+        # Affichage des événements des algorithmes, au plus deux fois par seconde pour chaque type d'événement
+        abonne = AbonneLimite(AbonneStreamlit(barre_de_progression, performances_graph, espace_performance,
+                                              structure_apprentissage_graph, espace_apprentissage,
+                                              structure_optimisee_graph, espace_optimisation),
+                              intervalle=0.5)
+
         # Lancer le processus d'apprentissage
         score, structure = apprentissage(nb_points, longueur_max, longueur_min, nb_structures,
                       nb_structures_a_garder, nb_iterations, temperature_debut,
                       temperature_fin, encombrement_cible, tridimensionnel, induit, b, biais,
-                      plyfig = performances_graph, barre_de_progression = barre_de_progression,
-                      espace_graph=espace_performance, figure=structure_apprentissage_graph, espace_structure=espace_apprentissage)
+                      modele_champ=modele_champ, execution=execution, nb_workers=nb_workers, abonne=abonne)
 
         # Afficher les performances de la structure après apprentissage
         enc, poi, force = structure.montrer_performance()
@@ -85,10 +172,16 @@ with col2:
         # Si l'optimisation est activée, lancer le processus d'optimisation
         if optimiser == True:
             barre_de_progression.progress(100,text="Optimisation en cours...")
-            score, structure_optimisee = optimisation(structure, induit=induit, b=b, tridimensionnel=tridimensionnel,
-                                                        nb_iterations=nb_iterations_optimisation, tolerance = tolerance,
-                                                        barre_de_progression=barre_de_progression, figure=structure_optimisee_graph,
-                                                        espace=espace_optimisation)
+            if nb_departs > 1:
+                # Optimisation de plusieurs perturbations de la structure à la fois
+                score, structure_optimisee, resultats = optimisation_multi_depart(structure, induit=induit, b=b, tridimensionnel=tridimensionnel,
+                                                                                  nb_iterations=nb_iterations_optimisation, tolerance=tolerance,
+                                                                                  execution=execution, nb_workers=nb_workers, nb_departs=nb_departs,
+                                                                                  methode=methode)
+            else:
+                score, structure_optimisee = optimisation(structure, induit=induit, b=b, tridimensionnel=tridimensionnel,
+                                                            nb_iterations=nb_iterations_optimisation, tolerance = tolerance,
+                                                            methode=methode, abonne=abonne)
 
             # Afficher les performances de la structure optimisée
             enc, poi, force = structure_optimisee.montrer_performance()
@@ -1,15 +1,131 @@
 import numpy as np
-import scipy as scp
-from functools import partial as pa
 from copy import deepcopy
-import streamlit as st
-import plotly.graph_objects as go
 
-# Fonction principale d'optimisation
-def optimisation(structure, induit = False, b = 0.5, tridimensionnel = True, nb_iterations = 20,
-                 tolerance = 0.01, barre_de_progression = None, figure = None, espace = None):
+from executeurs import Executeur
+from evenements import ABONNE_NUL
+import Calcul_Force_EM.Instrumentation as instr
+
+class SuiviOptimisation:
+    """
+    État d'une optimisation en cours : copie de la structure servant à l'affichage, nombre d'itérations faites et
+    trajectoire des scores. Chaque optimisation a son propre suivi, ce qui permet d'en faire plusieurs à la fois.
+    L'objet est appelé par scipy.optimize.minimize à chaque itération (callback).
+    """
+    def __init__(self, structure, induit = False, b = 0.5, tridimensionnel = True, nb_iterations = 20, abonne = None):
+        """
+        :param structure: Structure optimisée (elle est copiée).
+        :type structure: Structure
+        :param induit: Indique si le champs magnétique est induit ou imposé.
+        :type induit: bool
+        :param b: Importance du critère de poids.
+        :type b: float
+        :param tridimensionnel: Indique si l'optimisation est en 3D.
+        :type tridimensionnel: bool
+        :param nb_iterations: Nombre total d'itérations.
+        :type nb_iterations: int
+        :param abonne: Abonné aux événements de l'optimisation (voir evenements.py).
+        :type abonne: Abonne
+        """
+        with instr.chrono("optimisation.copie"):
+            self.structure = deepcopy(structure)
+        self.induit = induit
+        self.b = b
+        self.tridimensionnel = tridimensionnel
+        self.nb_iterations = nb_iterations
+        self.abonne = ABONNE_NUL if abonne is None else abonne
+        self.iteration = 0
+        self.trajectoire = []
+        # Échelle de la fonction minimisée par L-BFGS-B (voir affiner()), None pour Nelder-Mead
+        self.echelle = None
+
+    def __call__(self, intermediate_result):
+        """
+        Fonction appelée à chaque itération pour enregistrer le score et envoyer l'état actuel de la structure à
+        l'abonné.
+
+        :param intermediate_result: État actuel de l'optimiseur : paramètres (x) et valeur de la fonction minimisée (fun).
+            Le nom de l'argument est celui que scipy.optimize.minimize attend pour fournir les deux.
+        :type intermediate_result: OptimizeResult
+        """
+        etat = np.array(intermediate_result.x, dtype=float)
+
+        if self.echelle is not None and not self.abonne.actif:
+            # L-BFGS-B sans abonné : le score est la valeur déjà calculée par l'optimiseur (voir objectif_gradient()),
+            # la structure n'a pas besoin d'être regénérée
+            score = -float(intermediate_result.fun) * self.echelle
+        else:
+            # Mise à jour des paramètres de la structure temporaire (copie, pour ne pas modifier l'état de
+            # l'optimiseur). Avec Nelder-Mead, ces paramètres viennent d'être évalués : l'évaluation est reprise de
+            # la mémoire des évaluations.
+            with instr.chrono("optimisation.suivi"):
+                self.structure.redefinir_parametres(etat, self.induit, self.b, self.tridimensionnel)
+
+            # Calcul des performances actuelles
+            enc, poi, force = self.structure.montrer_performance(self.induit)
+            score = force / (poi**self.b)
+        self.trajectoire.append(score)
+
+        # Événements de progression et d'itération
+        if self.abonne.actif:
+            with instr.chrono("optimisation.affichage"):
+                self.abonne.recevoir("progression", {"valeur": self.iteration/(self.nb_iterations-1),
+                                                     "texte": "Progrès de l'optimisation : "+str(self.iteration+1)+"/"+str(self.nb_iterations)})
+                self.abonne.recevoir("optimisation", {"iteration": self.iteration, "nb_iterations": self.nb_iterations,
+                                                      "score": score, "parametres": etat,
+                                                      "points": self.structure.montrer_cable(), "encombrement": enc,
+                                                      "poids": poi, "force": force})
+        self.iteration += 1
+
+def parametres_en_ligne(structure):
+    """
+    Met les paramètres d'une structure sous forme d'un tableau en une ligne (requis pour scipy.optimize.minimize) :
+    longueurs, puis angles theta, puis angles phi.
+
+    :param structure: Structure dont on veut les paramètres.
+    :type structure: Structure
+
+    :return: Les paramètres de la structure.
+    :rtype: ndarray
+    """
+    longueurs, angles = structure.montrer_parametres()
+    nb_segments = np.size(longueurs)
+    params = np.ndarray((nb_segments*3))
+    params[0:nb_segments] = longueurs
+    params[nb_segments:nb_segments*2] = angles[:, 0]
+    params[nb_segments*2:nb_segments*3] = angles[:, 1]
+    return params
+
+def objectif_gradient(params, structure, induit = False, b = 0.5, tridimensionnel = True, echelle = 1.0):
     """
-    Fonction pour optimiser les paramètres d'une structure donnée en utilisant l'algorithme de Nelder-Mead.
+    Fonction à minimiser par la méthode L-BFGS-B : l'opposé du score (force / poids^b), divisé par une échelle pour
+    être de l'ordre de 1, et son gradient (voir Structure.gradient_score).
+
+    :param params: Liste des paramètres de la structure.
+    :type params: ndarray
+    :param structure: Structure optimisée.
+    :type structure: Structure
+    :param induit: Indique si le champs magnétique est induit ou imposé.
+    :type induit: bool
+    :param b: Importance du critère de poids.
+    :type b: float
+    :param tridimensionnel: Indique si l'optimisation est en 3D.
+    :type tridimensionnel: bool
+    :param echelle: Échelle du score (par exemple le score de départ).
+    :type echelle: float
+
+    :return: La valeur de la fonction et son gradient.
+    :rtype: tuple
+    """
+    score, gradient = structure.gradient_score(params, induit, b, tridimensionnel)
+    return -score / echelle, -gradient / echelle
+
+def affiner(structure, induit = False, b = 0.5, tridimensionnel = True, nb_iterations = 20, tolerance = 0.01, suivi = None,
+            methode = "Nelder-Mead"):
+    """
+    Optimise les paramètres d'une structure avec l'algorithme de Nelder-Mead, ou avec l'algorithme L-BFGS-B qui
+    utilise le gradient du score et borne les longueurs entre longueur_segments_min et longueur_segments_max. La
+    structure est modifiée sur place. Aucune variable globale n'est utilisée : la fonction peut être appelée dans
+    plusieurs processus à la fois.
 
     :param structure: Structure à optimiser.
     :type structure: Structure
@@ -21,102 +137,170 @@ def optimisation(structure, induit = False, b = 0.5, tridimensionnel = True, nb_
     :type tridimensionnel: bool
     :param nb_iterations: Nombre maximal d'itérations.
     :type nb_iterations: int
-    :param tolerance: Tolérance pour la convergence.
+    :param tolerance: Tolérance pour la convergence. Avec Nelder-Mead, variation des paramètres (xatol) ; avec
+        L-BFGS-B, variation relative du score et norme du gradient (ftol et gtol), le score étant divisé par celui de
+        départ.
     :type tolerance: float
-    :param barre_de_progression: Barre de progression Streamlit.
-    :type barre_de_progression: barre de progression streamlit
-    :param figure: Figure plotly servant à afficher la structure.
-    :type figure: figure plotly
-    :param espace: Espace Streamlit pour afficher la structure.
-    :type espace: espace streamlit
+    :param suivi: Suivi de l'optimisation (événements). Si aucun n'est donné, on enregistre seulement la trajectoire.
+    :type suivi: SuiviOptimisation
+    :param methode: Méthode d'optimisation : "Nelder-Mead" ou "L-BFGS-B".
+    :type methode: str
 
-    :return: Score final et structure optimisée.
+    :return: Score final, structure optimisée et trajectoire des scores.
     :rtype: tuple
     """
-    # Définition des paramètres globaux
-    global structure_temp
-    global iter
+    # Importé ici pour que les modules qui n'utilisent que parametres_en_ligne() ne chargent pas scipy
+    import scipy as scp
 
-    # Récupération des paramètres pour l'optimisation
-    longueurs, angles = structure.montrer_parametres()
-    iter = 0
-    structure_temp = deepcopy(structure)
-    nb_iter = nb_iterations
-    barre = barre_de_progression
-
-    # Extraction des angles theta et phi
-    theta = angles[:, 0]
-    phi = angles[:, 1]
-                   
-    # Préparation des paramètres sous forme d'un tableau en une ligne (requis pour scipi.optimize.minimize)
-    nb_segments = np.size(longueurs)
-    params = np.ndarray((nb_segments*3))
-    params[0:nb_segments] = longueurs
-    params[nb_segments:nb_segments*2] = theta
-    params[nb_segments*2:nb_segments*3] = phi
+    if suivi is None:
+        suivi = SuiviOptimisation(structure, induit, b, tridimensionnel, nb_iterations)
+
+    params = parametres_en_ligne(structure)
+
+    if methode == "L-BFGS-B":
+        # Les longueurs sont bornées, les angles sont libres
+        nb_segments = structure.nombre_points - 1
+        limites = ([(structure.longueur_segments_min, structure.longueur_segments_max)] * nb_segments +
+                   [(None, None)] * (nb_segments * 2))
+        params[0:nb_segments] = np.clip(params[0:nb_segments], structure.longueur_segments_min, structure.longueur_segments_max)
 
-    # Mise à jour de la barre de progression
-    barre.progress(0, text="Calcul des dérivées en cours pour l'optimisation de Nelder-Mead...")
+        # Le score de départ sert d'échelle à la fonction à minimiser
+        enc, poi, force = structure.montrer_performance(induit)
+        echelle = abs(force / (poi ** b)) or 1.0
+        suivi.echelle = echelle
 
-    # Définition d'un callback avec plus de paramètres pour suivre l'avancement
-    mettre_bar_a_jour = pa(callback,nb_iter, barre_de_progression, figure, espace, b)
+        # Optimisation avec l'algorithme L-BFGS-B et le gradient du score, arrêtée quand le score (divisé par l'échelle)
+        # ou son gradient varient de moins que la tolérance
+        with instr.chrono("optimisation.minimize"):
+            resultats = scp.optimize.minimize(objectif_gradient, params, method='L-BFGS-B', jac=True, bounds=limites, args=(structure, induit, b, tridimensionnel, echelle), options={'maxiter':nb_iterations, 'disp':False, 'ftol':tolerance, 'gtol':tolerance}, callback=suivi)
 
-    # Optimisation avec l'algorithme de Nelder-Mead
-    resultats = scp.optimize.minimize(structure.redefinir_parametres, params, method='Nelder-Mead', args=(induit, b, tridimensionnel), options={'maxiter':nb_iterations, 'disp':False, 'xatol':tolerance}, callback=mettre_bar_a_jour)
+    elif methode == "Nelder-Mead":
+        # Optimisation avec l'algorithme de Nelder-Mead
+        with instr.chrono("optimisation.minimize"):
+            resultats = scp.optimize.minimize(structure.redefinir_parametres, params, method='Nelder-Mead', args=(induit, b, tridimensionnel), options={'maxiter':nb_iterations, 'disp':False, 'xatol':tolerance}, callback=suivi)
 
-    # Récupération des nouveaux paramètres optimisés
-    x = resultats.get('x')
+    else:
+        raise Exception("Méthode d'optimisation inconnue : " + str(methode) + ". Méthodes disponibles : Nelder-Mead, L-BFGS-B")
 
-    # Mise à jour de la structure avec les nouveaux paramètres
-    structure.redefinir_parametres(x, induit, b, tridimensionnel)
+    # Mise à jour de la structure avec les nouveaux paramètres optimisés
+    structure.redefinir_parametres(resultats.get('x'), induit, b, tridimensionnel)
 
     # Calcul des performances finales
     scores = structure.montrer_performance(induit)
     score = scores[2] / (scores[1] ** b)
 
-    return score, structure
+    return score, structure, suivi.trajectoire
 
-# Callback pour mettre à jour les visualisations pendant l'optimisation
-def callback(nb_iter, barre, figure, espace, b, etat):
+# Fonction principale d'optimisation
+def optimisation(structure, induit = False, b = 0.5, tridimensionnel = True, nb_iterations = 20,
+                 tolerance = 0.01, methode = "Nelder-Mead", abonne = None):
     """
-    Fonction callback appelée à chaque itération pour mettre à jour la barre de progression
-    et visualiser l'état actuel de la structure.
-    
-    :param nb_iter: Nombre total d'itérations.
-    :type nb_iter: int
-    :param barre: Composant Streamlit pour afficher la progression.
-    :type barre: barre de progression streamlit
-    :param figure: Figure plotly pour afficher la structure.
-    :type figure: figure plotly
-    :param espace: Espace Streamlit pour afficher la structure.
-    :type espace: espace streamlit
-    :param a: Importance du critère d'encombrement.
-    :type a: float
+    Fonction pour optimiser les paramètres d'une structure donnée en utilisant l'algorithme de Nelder-Mead (ou
+    L-BFGS-B, voir affiner()).
+
+    :param structure: Structure à optimiser.
+    :type structure: Structure
+    :param induit: Indique si le champs magnétique est induit ou imposé.
+    :type induit: bool
     :param b: Importance du critère de poids.
     :type b: float
-    :param etat: État actuel des paramètres.
-    :type etat: ndarray
+    :param tridimensionnel: Indique si l'optimisation est en 3D.
+    :type tridimensionnel: bool
+    :param nb_iterations: Nombre maximal d'itérations.
+    :type nb_iterations: int
+    :param tolerance: Tolérance pour la convergence.
+    :type tolerance: float
+    :param methode: Méthode d'optimisation : "Nelder-Mead" ou "L-BFGS-B".
+    :type methode: str
+    :param abonne: Abonné aux événements de l'optimisation (progression, score et paramètres à chaque itération), par exemple pour l'affichage (voir evenements.py).
+    :type abonne: Abonne
+
+    :return: Score final et structure optimisée.
+    :rtype: tuple
     """
-    global structure_temp
-    global iter
+    if abonne is None:
+        abonne = ABONNE_NUL
+
+    if abonne.actif:
+        abonne.recevoir("progression", {"valeur": 0, "texte": "Calcul des dérivées en cours pour l'optimisation de " + methode + "..."})
+
+    # Suivi de l'avancement, qui envoie l'état de la structure à l'abonné à chaque itération
+    suivi = SuiviOptimisation(structure, induit, b, tridimensionnel, nb_iterations, abonne)
 
-    # Mise à jour des paramètres de la structure temporaire
-    x = etat
-    structure_temp.redefinir_parametres(x)
+    score, structure, trajectoire = affiner(structure, induit, b, tridimensionnel, nb_iterations, tolerance, suivi, methode)
 
-    # Calcul des performances actuelles
-    enc, poi, force = structure_temp.montrer_performance()
-    score = force / (poi**b)
+    if abonne.actif:
+        abonne.recevoir("fin", {"algorithme": "optimisation", "score": score})
+        abonne.terminer()
+
+    return score, structure
 
-    # Mise à jour du titre avec les scores actuels
-    titre = "Score : " + str(score) + ", Encombrement = " + str(enc) + ", poids = " + str(poi) + ", force = " + str(
-        force) + "."
+def departs_perturbes(structure, nb_departs = 4, temperature = 0.1):
+    """
+    Crée des points de départ pour l'optimisation multi-départ : la structure elle-même, puis des copies dont les
+    paramètres sont modifiés selon une température.
+
+    :param structure: Structure de départ.
+    :type structure: Structure
+    :param nb_departs: Nombre total de points de départ.
+    :type nb_departs: int
+    :param temperature: Ampleur de la variation des copies.
+    :type temperature: float
+
+    :return: Les structures de départ.
+    :rtype: list
+    """
+    departs = [deepcopy(structure)]
+    for k in range(1, nb_departs):
+        depart = deepcopy(structure)
+        depart.modifier_parametres(temperature, True, True, "depart" + str(k))
+        departs.append(depart)
+    return departs
+
+def optimisation_multi_depart(structures, induit = False, b = 0.5, tridimensionnel = True, nb_iterations = 20,
+                              tolerance = 0.01, execution = "processes", nb_workers = None, nb_departs = 4,
+                              temperature = 0.1, methode = "Nelder-Mead"):
+    """
+    Optimise plusieurs structures de départ à la fois avec l'algorithme de Nelder-Mead (ou L-BFGS-B), chacune dans sa propre copie,
+    puis garde la meilleure. Le résultat dépend ainsi beaucoup moins du point de départ.
+
+    :param structures: Structures de départ (par exemple les meilleures de l'apprentissage, voir Population.meilleures), ou une seule structure, dont on crée nb_departs perturbations.
+    :type structures: list
+    :param induit: Indique si le champs magnétique est induit ou imposé.
+    :type induit: bool
+    :param b: Importance du critère de poids.
+    :type b: float
+    :param tridimensionnel: Indique si l'optimisation est en 3D.
+    :type tridimensionnel: bool
+    :param nb_iterations: Nombre maximal d'itérations de chaque optimisation.
+    :type nb_iterations: int
+    :param tolerance: Tolérance pour la convergence.
+    :type tolerance: float
+    :param execution: Mode d'exécution des optimisations : "serial", "threads" ou "processes".
+    :type execution: str
+    :param nb_workers: Nombre de fils ou de processus (par défaut, le nombre de cœurs).
+    :type nb_workers: int
+    :param nb_departs: Nombre de points de départ si une seule structure est donnée.
+    :type nb_departs: int
+    :param temperature: Ampleur des perturbations si une seule structure est donnée.
+    :type temperature: float
+    :param methode: Méthode d'optimisation : "Nelder-Mead" ou "L-BFGS-B".
+    :type methode: str
+
+    :return: Meilleur score, structure associée et résultats (score, structure, trajectoire) de chaque départ.
+    :rtype: tuple
+    """
+    if not isinstance(structures, (list, tuple)):
+        structures = departs_perturbes(structures, nb_departs, temperature)
+    else:
+        structures = [deepcopy(structure) for structure in structures]
 
-    # Visualisation de la structure optimisée
-    structure_temp.visualiser_structure(figure, titre)
-    with espace:
-        st.plotly_chart(figure, key="opti" + str(iter), use_container_width=False)
+    # Une optimisation par point de départ
+    n = len(structures)
+    with Executeur(execution, nb_workers) as executeur:
+        resultats = executeur.map(affiner, structures, [induit] * n, [b] * n, [tridimensionnel] * n,
+                                  [nb_iterations] * n, [tolerance] * n, [None] * n, [methode] * n)
 
-    # Mise à jour de la barre de progression
-    barre.progress(iter/(nb_iter-1), text="Progrès de l'optimisation : "+str(iter+1)+"/"+str(nb_iter))
-    iter += 1
\ No newline at end of file
+    # Meilleur résultat
+    meilleur = int(np.argmax([resultat[0] for resultat in resultats]))
+    return resultats[meilleur][0], resultats[meilleur][1], resultats
@@ -0,0 +1,100 @@
+"""
+Points de contrôle des longs apprentissages : l'état complet de la recherche est enregistré régulièrement, pour pouvoir
+la reprendre là où elle s'est arrêtée.
+
+Un point de contrôle est un fichier .npz : les tableaux (population, historique des scores...) y sont rangés tels quels,
+et les autres valeurs (itération, état du générateur de nombres aléatoires, paramètres...) dans une entrée JSON. Le
+fichier est d'abord écrit à côté, puis renommé : un arrêt pendant l'écriture laisse intact le point de contrôle
+précédent.
+"""
+
+import os
+import json
+import time
+import numpy as np
+
+class PointDeControle:
+    """
+    Enregistre et relit l'état d'un apprentissage, au plus toutes les frequence_iterations itérations ou toutes les
+    frequence_secondes secondes.
+    """
+    def __init__(self, fichier, frequence_iterations = None, frequence_secondes = None):
+        """
+        :param fichier: Chemin du point de contrôle (.npz).
+        :type fichier: str
+        :param frequence_iterations: Nombre d'itérations entre deux enregistrements (None pour ne pas en tenir compte).
+            Si aucune des deux fréquences n'est donnée, l'état est enregistré à chaque itération.
+        :type frequence_iterations: int
+        :param frequence_secondes: Temps minimal entre deux enregistrements [s] (None pour ne pas en tenir compte).
+        :type frequence_secondes: float
+        """
+        if not fichier.endswith(".npz"):
+            fichier += ".npz"
+        if frequence_iterations is None and frequence_secondes is None:
+            frequence_iterations = 1
+
+        self.fichier = fichier
+        self.frequence_iterations = frequence_iterations
+        self.frequence_secondes = frequence_secondes
+        self.dernier = time.monotonic()
+
+    def existe(self):
+        """
+        Permet de savoir si un point de contrôle a déjà été enregistré.
+
+        :return: Vrai si le fichier du point de contrôle existe.
+        :rtype: bool
+        """
+        return os.path.exists(self.fichier)
+
+    def a_enregistrer(self, iteration, derniere = False):
+        """
+        Permet de savoir s'il faut enregistrer l'état à la fin d'une itération : selon le nombre d'itérations, selon le
+        temps écoulé depuis le dernier enregistrement, et toujours à la dernière itération.
+
+        :param iteration: Numéro de l'itération qui vient de se terminer.
+        :type iteration: int
+        :param derniere: Indique si c'est la dernière itération.
+        :type derniere: bool
+
+        :return: Vrai s'il faut enregistrer.
+        :rtype: bool
+        """
+        if derniere:
+            return True
+        if self.frequence_iterations and (iteration + 1) % self.frequence_iterations == 0:
+            return True
+        if self.frequence_secondes is not None and time.monotonic() - self.dernier >= self.frequence_secondes:
+            return True
+        return False
+
+    def enregistrer(self, tableaux, informations):
+        """
+        Enregistre l'état de façon atomique.
+
+        :param tableaux: Tableaux à enregistrer, par nom.
+        :type tableaux: dict
+        :param informations: Autres valeurs à enregistrer, qui doivent pouvoir s'écrire en JSON.
+        :type informations: dict
+        """
+        temporaire = self.fichier + ".tmp"
+        with open(temporaire, "wb") as f:
+            np.savez_compressed(f, informations=np.array(json.dumps(informations)), **tableaux)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporaire, self.fichier)
+
+        self.dernier = time.monotonic()
+
+    def charger(self):
+        """
+        Relit le dernier état enregistré.
+
+        :return: Les tableaux et les autres valeurs enregistrées.
+        :rtype: tuple
+        """
+        with np.load(self.fichier, allow_pickle=False) as donnees:
+            tableaux = {nom: donnees[nom] for nom in donnees.files if nom != "informations"}
+            informations = json.loads(str(donnees["informations"]))
+
+        return tableaux, informations
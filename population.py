@@ -0,0 +1,421 @@
+import numpy as np
+from copy import copy
+
+from structure import Structure as St, generer_points, mettre_a_echelle, evaluer_population
+from extra_fonctions import choix_biaises
+
+class Population:
+    """
+    Population de structures utilisée par l'apprentissage. Les longueurs, les angles, les points et les forces de
+    toutes les structures sont rangés dans des tableaux contigus, pour que la mutation, la sélection et le calcul des
+    scores se fassent sur toute la population à la fois. Les objets Structure ne sont créés que lorsqu'on en a besoin
+    (meilleure structure, affichage), voir structure().
+    """
+    # Tableaux qui décrivent entièrement l'état de la population (voir etat())
+    TABLEAUX = ["longueur_segments", "angles", "points", "poids", "Fx_induit", "Fx_impose", "noms"]
+
+    def __init__(self, nb_structures=10, nombre_points=10, longueur_segments_max=100, longueur_segments_min=100, encombrement_cible=500, tridimensionnel = True, modele_champ = "igrf", rng = None, executeur = None, etat = None):
+        """
+        Initialisation et génération aléatoire d'une population de structures.
+
+        :param nb_structures: Nombre de structures de la population.
+        :type nb_structures: int
+        :param nombre_points: Nombre de points par structure.
+        :type nombre_points: int
+        :param longueur_segments_max: Longueur maximale des segments.
+        :type longueur_segments_max: float
+        :param longueur_segments_min: Longueur minimale des segments.
+        :type longueur_segments_min: float
+        :param encombrement_cible: Encombrement que les structures doivent avoir.
+        :type encombrement_cible: float
+        :param tridimensionnel: Détermine si les structures sont tridimensionnelles.
+        :type tridimensionnel: bool
+        :param modele_champ: Modèle du champ magnétique utilisé pour évaluer la force ("igrf", "taylor" ou "tuile").
+        :type modele_champ: str
+        :param rng: Générateur de nombres aléatoires (np.random.Generator), ou liste de générateurs, un par structure. Si aucun n'est donné, on utilise np.random.
+        :type rng: Generator
+        :param executeur: Exécuteur qui répartit la génération et la modification des structures en lots (voir executeurs.py). Chaque structure a alors son propre générateur, dont la graine est tirée avec rng : le résultat ne dépend ni du mode d'exécution ni du nombre de lots.
+        :type executeur: Executeur
+        :param etat: Tableaux d'une population enregistrée (voir etat()), à utiliser au lieu de générer les structures.
+        :type etat: dict
+        """
+        # Initialisation des paramètres principaux de la population
+        self.nb_structures = nb_structures
+        self.nombre_points = nombre_points
+        self.longueur_segments_max = longueur_segments_max
+        self.longueur_segments_min = longueur_segments_min
+        self.encombrement_cible = encombrement_cible
+        self.tridimensionnel = tridimensionnel
+        self.modele_champ = modele_champ
+        self.rng = rng
+        self.executeur = executeur
+        self.borne_erreur_champ = 0
+
+        # Validation des longueurs minimales et maximales
+        if self.longueur_segments_min > self.longueur_segments_max or self.longueur_segments_min <= 0:
+
+            raise Exception("La longueur minimale doit être plus grande que zéro et elle doit être plus courte ou égale à la longueur maximale.")
+
+        # Tableaux de la population : une ligne par structure
+        forme = (self.nb_structures, self.nombre_points - 1)
+        self.longueur_segments = np.ndarray(forme)
+        self.angles = np.ndarray(forme + (2,))
+        self.points = np.zeros((self.nb_structures, self.nombre_points, 3))
+        self.poids = np.zeros(self.nb_structures)
+        self.Fx_induit = np.zeros(self.nb_structures)
+        self.Fx_impose = np.zeros(self.nb_structures)
+        self.noms = np.array(["Structure no. " + str(i) for i in range(self.nb_structures)], dtype=object)
+
+        if etat is not None:
+
+            # Structures déjà générées et évaluées (par exemple lors de la reprise d'un apprentissage)
+            self.restaurer(etat)
+
+        elif self.executeur is not None:
+
+            # Génération des structures par lots, chaque structure avec son propre générateur
+            lots = self.lots(self.graines(self.nb_structures))
+            configuration = [self.configuration()] * len(lots)
+            self.reunir(self.executeur.map(generer_lot, configuration, lots))
+
+        else:
+
+            # Génération aléatoire des angles et des longueurs, comme pour une structure seule
+            self.angles[:, :, 0] = self.aleatoire(forme) * 2 * np.pi
+            self.angles[:, :, 1] = (self.aleatoire(forme) - 0.5) * np.pi * self.tridimensionnel
+            self.longueur_segments[:] = self.aleatoire(forme) * (self.longueur_segments_max - self.longueur_segments_min) + self.longueur_segments_min
+
+            # Génération des structures
+            self.generation_structures()
+
+    def __len__(self):
+        """
+        Permet d'obtenir le nombre de structures de la population.
+        """
+        return self.nb_structures
+
+    def aleatoire(self, forme):
+        """
+        Tire des nombres aléatoires uniformes sur [0, 1) avec le générateur de la population.
+
+        :param forme: Forme du tableau à tirer.
+        :type forme: tuple
+
+        :return: Les nombres tirés.
+        :rtype: ndarray
+        """
+        if self.rng is None:
+            return np.random.random_sample(forme)
+        if isinstance(self.rng, (list, tuple)):
+            # Un générateur par structure : chacun tire la ligne de sa structure
+            return np.stack([generateur.random(forme[1:]) for generateur in self.rng])
+        return self.rng.random(forme)
+
+    def graines(self, nombre):
+        """
+        Tire des graines avec le générateur de la population, pour créer un générateur par structure.
+
+        :param nombre: Nombre de graines à tirer.
+        :type nombre: int
+
+        :return: Les graines.
+        :rtype: ndarray
+        """
+        if self.rng is None:
+            return np.random.randint(0, 2**63 - 1, size=nombre, dtype=np.int64)
+        return self.rng.integers(0, 2**63 - 1, size=nombre, dtype=np.int64)
+
+    def lots(self, graines):
+        """
+        Répartit les structures en autant de lots que l'exécuteur a de fils ou de processus.
+
+        :param graines: Graines des générateurs de chacune des structures.
+        :type graines: ndarray
+
+        :return: Les indices et les graines de chaque lot.
+        :rtype: list
+        """
+        nb_lots = max(1, min(self.executeur.nb_workers, self.nb_structures))
+        indices = np.array_split(np.arange(self.nb_structures), nb_lots)
+        return [(i, graines[i]) for i in indices]
+
+    def configuration(self):
+        """
+        Permet d'obtenir les paramètres communs à toutes les structures, pour créer une population du même type.
+
+        :return: Les paramètres de la population.
+        :rtype: dict
+        """
+        return dict(nombre_points=self.nombre_points, longueur_segments_max=self.longueur_segments_max,
+                    longueur_segments_min=self.longueur_segments_min, encombrement_cible=self.encombrement_cible,
+                    tridimensionnel=self.tridimensionnel, modele_champ=self.modele_champ)
+
+    def extraire(self, indices, graines = None):
+        """
+        Crée une population formée des structures d'indices donnés, sans exécuteur, pour être envoyée à un lot.
+
+        :param indices: Indices des structures à extraire.
+        :type indices: ndarray
+        :param graines: Graines des générateurs de chacune des structures extraites.
+        :type graines: ndarray
+
+        :return: La population extraite.
+        :rtype: Population
+        """
+        sous_population = copy(self)
+        sous_population.executeur = None
+        sous_population.selectionner(indices)
+        if graines is not None:
+            sous_population.rng = [np.random.default_rng(graine) for graine in graines]
+        return sous_population
+
+    def reunir(self, sous_populations):
+        """
+        Remplace les tableaux de la population par ceux des lots, mis bout à bout dans l'ordre.
+
+        :param sous_populations: Populations calculées par les lots.
+        :type sous_populations: list
+        """
+        self.nb_structures = sum(len(sous_population) for sous_population in sous_populations)
+        for nom in ["longueur_segments", "angles", "points", "poids", "Fx_induit", "Fx_impose"]:
+            setattr(self, nom, np.concatenate([getattr(sous_population, nom) for sous_population in sous_populations]))
+        self.borne_erreur_champ = sous_populations[-1].borne_erreur_champ
+
+    def etat(self):
+        """
+        Permet d'obtenir les tableaux de la population, pour l'enregistrer et la recréer plus tard (voir restaurer()).
+
+        :return: Les tableaux de la population et l'erreur du modèle de champ.
+        :rtype: dict
+        """
+        etat = {nom: getattr(self, nom) for nom in self.TABLEAUX}
+        etat["noms"] = self.noms.astype(str)
+        etat["borne_erreur_champ"] = np.float64(self.borne_erreur_champ)
+        return etat
+
+    def restaurer(self, etat):
+        """
+        Remplace les tableaux de la population par ceux d'un état enregistré (voir etat()). Les structures ne sont ni
+        regénérées ni réévaluées.
+
+        :param etat: Les tableaux de la population.
+        :type etat: dict
+        """
+        for nom in self.TABLEAUX:
+            setattr(self, nom, np.array(etat[nom]))
+        self.noms = self.noms.astype(object)
+        self.nb_structures = len(self.longueur_segments)
+        self.borne_erreur_champ = float(etat["borne_erreur_champ"])
+
+    def generation_structures(self):
+        """
+        À partir des angles et des longueurs de segments, on trouve les points de toutes les structures, on les ramène à
+        l'encombrement cible et on évalue leur force. C'est l'équivalent de Structure.generation_structure() pour toute
+        la population.
+        """
+        # Points de chaque structure, puis mise à l'échelle vers l'encombrement cible
+        self.points, self.longueur_segments = mettre_a_echelle(generer_points(self.longueur_segments, self.angles),
+                                                               self.longueur_segments, self.encombrement_cible)
+
+        # Calcul du poids et évaluation de la force
+        self.poids = self.longueur_segments.sum(axis=1)
+        self.evaluer_forces()
+
+    def evaluer_forces(self):
+        """
+        Calcule la force générée par chacune des structures de la population, en un seul appel au modèle de champ
+        magnétique pour tous les points de toutes les structures.
+        """
+        self.Fx_induit, self.Fx_impose, modele = evaluer_population(self.points, self.modele_champ, self.encombrement_cible)
+
+        # Erreur relative du modèle de champ par rapport au calcul IGRF complet
+        self.borne_erreur_champ = modele.borne_erreur_relative
+
+    def scores(self, induit = False, b = 0.5):
+        """
+        Calcule le score de chacune des structures : force / poids^b.
+
+        :param induit: Détermine si notre calcul de force est induit ou imposé.
+        :type induit: bool
+        :param b: Exposant pour le score (poids).
+        :type b: float
+
+        :return: Les scores des structures.
+        :rtype: ndarray
+        """
+        force = self.Fx_induit if induit else self.Fx_impose
+        return force / (self.poids ** b)
+
+    def scores_induit_impose(self, b = 0.5):
+        """
+        Calcule le score de chacune des structures dans le cas induit et dans le cas imposé.
+
+        :param b: Exposant pour le score (poids).
+        :type b: float
+
+        :return: Les scores des structures, cas induit et cas imposé, de forme (P,).
+        :rtype: tuple
+        """
+        return self.scores(True, b), self.scores(False, b)
+
+    def selectionner(self, indices):
+        """
+        Remplace la population par les structures d'indices donnés (un même indice peut apparaître plusieurs fois).
+
+        :param indices: Indices des structures qui forment la nouvelle population.
+        :type indices: ndarray
+        """
+        indices = np.asarray(indices)
+        self.nb_structures = len(indices)
+        self.longueur_segments = self.longueur_segments[indices]
+        self.angles = self.angles[indices]
+        self.points = self.points[indices]
+        self.poids = self.poids[indices]
+        self.Fx_induit = self.Fx_induit[indices]
+        self.Fx_impose = self.Fx_impose[indices]
+        self.noms = self.noms[indices]
+
+    def selection_biaisee(self, scores, nb_structures_a_garder, biais):
+        """
+        Choisit nb_structures_a_garder structures avec un biais vers les meilleurs scores, puis remplit la population
+        en répétant chacune des structures gardées.
+
+        :param scores: Scores des structures.
+        :type scores: ndarray
+        :param nb_structures_a_garder: Nombre de structures à garder.
+        :type nb_structures_a_garder: int
+        :param biais: Facteur de biais pour le choix des structures.
+        :type biais: float
+        """
+        # Indices triés par score croissant, puis choix biaisé vers la fin de la liste
+        triage = np.argsort(scores)
+        a_garder = np.array(choix_biaises(triage, nb_structures_a_garder, biais, self.rng))
+
+        # Chaque structure gardée est répétée pour remplir la population
+        proportion = nb_structures_a_garder / self.nb_structures
+        self.selectionner(a_garder[(np.arange(self.nb_structures) * proportion).astype(int)])
+
+    def modifier_parametres(self, temperature=0.05, longueur = True, angle = True, plus_nom = True):
+        """
+        Modifie les caractéristiques de toutes les structures selon une température, comme
+        Structure.modifier_parametres(), puis régénère la population.
+
+        :param temperature: Ampleur de la variation selon laquelle les structures vont changer.
+        :type temperature: float
+        :param longueur: Cette variable décide si l'on veut faire varier les longueurs.
+        :type longueur: bool
+        :param angle: Cette variable décide si l'on veut faire varier les angles.
+        :type angle: bool
+        :param plus_nom: Si vrai, on ajoute l'indice de chaque structure à son nom.
+        :type plus_nom: bool
+        """
+        if self.executeur is not None:
+
+            # Modification par lots, chaque structure avec son propre générateur
+            lots = [self.extraire(indices, graines) for indices, graines in self.lots(self.graines(self.nb_structures))]
+            self.reunir(self.executeur.map(modifier_lot, lots, [temperature] * len(lots), [longueur] * len(lots), [angle] * len(lots)))
+
+            if plus_nom:
+                self.noms = np.array([nom + "." + str(j) for j, nom in enumerate(self.noms)], dtype=object)
+            return
+
+        forme = self.longueur_segments.shape
+
+        # Variation des longueurs de (-1 à 1) * (max-min) * température
+        if longueur:
+
+            self.longueur_segments += (self.aleatoire(forme) - 0.5) * 2 * (self.longueur_segments_max - self.longueur_segments_min) * temperature
+
+            # Si une longueur sort de ses bornes, on la ramène avec la même marge qu'elle dépassait.
+            self.longueur_segments = np.where(self.longueur_segments > self.longueur_segments_max, 2 * self.longueur_segments_max - self.longueur_segments, self.longueur_segments)
+            self.longueur_segments = np.where(self.longueur_segments < self.longueur_segments_min, 2 * self.longueur_segments_min - self.longueur_segments, self.longueur_segments)
+
+        # Variation de (-pi à pi) * température pour théta et (-pi/2 à pi/2) * température pour phi.
+        if angle:
+
+            self.angles[:, :, 0] = np.mod(self.angles[:, :, 0] + (self.aleatoire(forme) - 0.5) * 2 * np.pi * temperature, 2 * np.pi) * self.tridimensionnel
+            self.angles[:, :, 1] = self.angles[:, :, 1] + (self.aleatoire(forme) - 0.5) * np.pi * temperature
+
+        # On ajoute une partie au nom pour identifier les racines
+        if plus_nom:
+            self.noms = np.array([nom + "." + str(j) for j, nom in enumerate(self.noms)], dtype=object)
+
+        # On régénère les structures à partir des longueurs et des angles modifiés
+        self.generation_structures()
+
+    def melanger(self):
+        """
+        Mélange les structures de la population de manière aléatoire.
+        """
+        if self.rng is None:
+            self.selectionner(np.random.permutation(self.nb_structures))
+        else:
+            self.selectionner(self.rng.permutation(self.nb_structures))
+
+    def meilleures(self, nombre, induit = False, b = 0.5):
+        """
+        Crée les objets Structure des meilleures structures de la population, par exemple comme points de départ de
+        optimisation.optimisation_multi_depart().
+
+        :param nombre: Nombre de structures à créer.
+        :type nombre: int
+        :param induit: Détermine si notre calcul de force est induit ou imposé.
+        :type induit: bool
+        :param b: Exposant pour le score (poids).
+        :type b: float
+
+        :return: Les structures, de la meilleure à la moins bonne.
+        :rtype: list
+        """
+        triage = np.argsort(self.scores(induit, b))[::-1]
+        return [self.structure(i) for i in triage[:nombre]]
+
+    def structure(self, i):
+        """
+        Crée l'objet Structure correspondant à une structure de la population.
+
+        :param i: Indice de la structure.
+        :type i: int
+
+        :return: La structure.
+        :rtype: Structure
+        """
+        return St(self.nombre_points, self.longueur_segments_max, self.longueur_segments_min, self.encombrement_cible,
+                  self.tridimensionnel, self.noms[i], self.modele_champ,
+                  parametres=(self.longueur_segments[i], self.angles[i]))
+
+def generer_lot(configuration, lot):
+    """
+    Génère les structures d'un lot, chacune avec son propre générateur. Fonction de module pour pouvoir être envoyée à
+    un processus de travail.
+
+    :param configuration: Paramètres de la population (voir Population.configuration).
+    :type configuration: dict
+    :param lot: Indices des structures du lot dans la population et graines de leurs générateurs.
+    :type lot: tuple
+
+    :return: La population du lot.
+    :rtype: Population
+    """
+    indices, graines = lot
+    return Population(len(graines), rng=[np.random.default_rng(graine) for graine in graines], **configuration)
+
+def modifier_lot(sous_population, temperature, longueur = True, angle = True):
+    """
+    Modifie les structures d'un lot selon une température (voir Population.modifier_parametres). Fonction de module pour
+    pouvoir être envoyée à un processus de travail.
+
+    :param sous_population: Population du lot, avec un générateur par structure.
+    :type sous_population: Population
+    :param temperature: Ampleur de la variation selon laquelle les structures vont changer.
+    :type temperature: float
+    :param longueur: Cette variable décide si l'on veut faire varier les longueurs.
+    :type longueur: bool
+    :param angle: Cette variable décide si l'on veut faire varier les angles.
+    :type angle: bool
+
+    :return: La population du lot modifiée.
+    :rtype: Population
+    """
+    sous_population.modifier_parametres(temperature, longueur, angle, plus_nom = False)
+    return sous_population
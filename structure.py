@@ -1,18 +1,352 @@
+import os
 import numpy as np
-import streamlit as st
-import plotly.graph_objects as go
+import hashlib
+import threading
+from collections import OrderedDict
 from datetime import datetime
 from math import pi
-from astropy import constants
 
 import Calcul_Force_EM.Force_Electro as fe
 import Calcul_Force_EM.Cable as ca
+import Calcul_Force_EM.Instrumentation as instr
 from Calcul_Force_EM.Materiaux import Al_2024
-from Calcul_Force_EM.Geometrie_fct import *
+from Calcul_Force_EM.Constantes import R_T, M_T, G, MU
+from Calcul_Force_EM.ModeleChamp import ModeleChamp
+from Calcul_Force_EM.Geometrie_fct import rotate_origin_only
+from archive import Archive
+
+# Caractéristiques du matériau
+MATERIAU = Al_2024()
+MASSE_VOLUMIQUE = MATERIAU.MasseVolumique()
+RESISTIVITE = MATERIAU.Resistivite()
+
+# Physique du câble
+DIAMETRE = 5  # [mm] Diamètre du câble
+SECTION = pi * ((DIAMETRE * 10 ** -3) / 2) ** 2  # [m²] Surface de la section du câble
+COURANT = 1.5  # Courant imposé dans le câble [A]
+
+# Rotation du cable à partir de l'origine (satellite : [0,0,0]), selon Ry
+ALPHA = 30 * pi / 180  # rad
+
+# Paramètres orbitaux - Position du satellite
+ALTITUDE = 800  # Altitude [km]
+RAYON = R_T * 10 ** -3 + ALTITUDE  # [km] Distance du satellite au centre de la Terre
+THETA = 114  # [deg]
+PHI = 168  # [deg]
+INC = 25  # [deg]
+TA = 180  # [deg]
+DATE = datetime(2020, 7, 15, 15, 20, 0)
+
+# Position du satellite, dans l'ordre des arguments de ModeleChamp et des fonctions de Force_Electro
+POSITION = (RAYON, THETA, PHI, DATE, INC, TA)
+
+VITESSE = np.sqrt(MU / (RAYON * 10 ** 3))  # [m/s] Vitesse du satellite sur son orbite
+
+def generer_points(longueur_segments, angles):
+    """
+    Calcule les points d'une ou plusieurs structures à partir des longueurs et des angles de leurs segments.
+    Le premier point est à l'origine, les suivants sont la somme cumulée des incréments en coordonnées sphériques.
+
+    :param longueur_segments: Longueurs des segments, de forme (N-1,) ou (P, N-1) pour P structures.
+    :type longueur_segments: ndarray
+    :param angles: Angles theta et phi des segments, de forme (N-1, 2) ou (P, N-1, 2).
+    :type angles: ndarray
+
+    :return: Les points des structures, de forme (N, 3) ou (P, N, 3).
+    :rtype: ndarray
+    """
+    theta = angles[..., 0]
+    phi = angles[..., 1]
+
+    # Incréments entre deux points successifs
+    increments = np.stack((longueur_segments * np.sin(theta) * np.cos(phi),
+                           longueur_segments * np.sin(theta) * np.sin(phi),
+                           longueur_segments * np.cos(theta)), axis=-1)
+
+    # Premier point à l'origine, puis somme cumulée des incréments
+    points = np.zeros(increments.shape[:-2] + (increments.shape[-2] + 1, 3))
+    np.cumsum(increments, axis=-2, out=points[..., 1:, :])
+
+    return points
+
+def mettre_a_echelle(points, longueur_segments, encombrement_cible):
+    """
+    Met une ou plusieurs structures à l'échelle pour que leur encombrement (distance max d'un point à l'origine) soit
+    égal à l'encombrement cible.
+
+    :param points: Points des structures, de forme (N, 3) ou (P, N, 3).
+    :type points: ndarray
+    :param longueur_segments: Longueurs des segments, de forme (N-1,) ou (P, N-1).
+    :type longueur_segments: ndarray
+    :param encombrement_cible: Encombrement que les structures doivent avoir.
+    :type encombrement_cible: float
+
+    :return: Les points et les longueurs des segments mis à l'échelle.
+    :rtype: tuple
+    """
+    encombrement_max = np.linalg.norm(points[..., 1:, :], axis=-1).max(axis=-1)
+    facteur = encombrement_cible / encombrement_max
+
+    return points * facteur[..., np.newaxis, np.newaxis], longueur_segments * facteur[..., np.newaxis]
+
+def scores_parametres(params, nombre_points, encombrement_cible=500, induit=False, b=0.5, tridimensionnel=True, modele_champ="igrf"):
+    """
+    Calcule le score (force / poids^b) de structures définies par leurs vecteurs de paramètres (longueurs, puis angles
+    theta, puis angles phi, comme dans Structure.redefinir_parametres()), toutes en un seul appel au modèle de champ.
+    Les longueurs ne sont pas ramenées dans leurs limites.
+
+    :param params: Vecteurs de paramètres, de forme (3(N-1),) ou (K, 3(N-1)).
+    :type params: ndarray
+    :param nombre_points: Nombre de points par structure.
+    :type nombre_points: int
+    :param encombrement_cible: Encombrement que les structures doivent avoir.
+    :type encombrement_cible: float
+    :param induit: Détermine si le courant est induit ou imposé.
+    :type induit: bool
+    :param b: Importance du poids dans le calcul.
+    :type b: float
+    :param tridimensionnel: Détermine si les structures sont tridimensionnelles.
+    :type tridimensionnel: bool
+    :param modele_champ: Modèle du champ magnétique ("igrf", "taylor" ou "tuile").
+    :type modele_champ: str
+
+    :return: Les scores des structures, de forme (K,).
+    :rtype: ndarray
+    """
+    params = np.atleast_2d(params)
+    nb_segments = nombre_points - 1
+
+    # Longueurs et angles de chaque structure
+    longueurs = params[:, 0:nb_segments]
+    angles = np.stack((tridimensionnel * params[:, nb_segments:nb_segments * 2],
+                       params[:, nb_segments * 2:nb_segments * 3]), axis=-1)
+
+    # Points, mise à l'échelle puis forces de toutes les structures à la fois
+    points, longueurs = mettre_a_echelle(generer_points(longueurs, angles), longueurs, encombrement_cible)
+    Fx_induit, Fx_impose, modele = evaluer_population(points, modele_champ, encombrement_cible)
+
+    force = Fx_induit if induit else Fx_impose
+    return force / (longueurs.sum(axis=1) ** b)
+
+def calculer_forces(points, modele_champ="igrf", encombrement_cible=500):
+    """
+    Calcule les forces résultantes générées par une structure définie par ses points.
+    C'est le calcul utilisé par Structure.evaluer_force() et par les populations de structures.
+
+    :param points: Points de la structure, de forme (N, 3), ou de P structures, de forme (P, N, 3).
+    :type points: ndarray
+    :param modele_champ: Modèle du champ magnétique ("igrf", "taylor" ou "tuile").
+    :type modele_champ: str
+    :param encombrement_cible: Encombrement de la structure, qui définit la zone couverte par le modèle de champ.
+    :type encombrement_cible: float
+
+    :return: Les forces résultantes du cas induit et du cas imposé ((3,) ou (P, 3)), les points tournés, le champ magnétique aux points, la résistance du câble et le modèle de champ utilisé.
+    :rtype: tuple
+    """
+    # Réécriture des points selon l'angle alpha (rotation de tous les points à la fois)
+    x, z = rotate_origin_only((points[..., 0], points[..., 2]), ALPHA)
+    cable = np.stack((x, points[..., 1], z), axis=-1)
+
+    # Longueur et résistance électrique du câble
+    L = np.linalg.norm(np.diff(cable, axis=-2), axis=-1).sum(axis=-1)
+    R = ca.Resistance(L, SECTION, RESISTIVITE)  # [Ohm] Résistance électrique du câble
+
+    # Modèle du champ magnétique autour du satellite
+    modele = ModeleChamp(modele_champ, *POSITION, encombrement_cible)
+
+    # Cas induit et cas imposé en une seule évaluation du champ magnétique
+    with instr.chrono("forces.champ"):
+        B = modele.evaluer(cable)
+    with instr.chrono("forces.somme"):
+        F1a, F1b = fe.ForceLorentzTotale(cable, B, COURANT, VITESSE, R)
+    if instr.ACTIF:
+        instr.compter("forces.points", cable.size // 3)
+
+    return F1a, F1b, cable, B, R, modele
+
+def evaluer_population(points, modele_champ="igrf", encombrement_cible=500):
+    """
+    Calcule la force selon x de P structures à la fois : les points de toutes les structures sont évalués en un seul
+    appel au modèle de champ magnétique, puis les forces sont sommées segment par segment pour chaque structure.
+
+    :param points: Points des structures, de forme (P, N, 3).
+    :type points: ndarray
+    :param modele_champ: Modèle du champ magnétique ("igrf", "taylor" ou "tuile").
+    :type modele_champ: str
+    :param encombrement_cible: Encombrement des structures, qui définit la zone couverte par le modèle de champ.
+    :type encombrement_cible: float
+
+    :return: Les forces selon x du cas induit et du cas imposé, de forme (P,), et le modèle de champ utilisé.
+    :rtype: tuple
+    """
+    F1a, F1b, cable, B, R, modele = calculer_forces(points, modele_champ, encombrement_cible)
+
+    return -F1a[:, 0], -F1b[:, 0], modele
+
+def visualiser_cable(plyfig, cable, titre=None):
+    """
+    Trace le satellite et le câble d'une structure sur une figure (voir Structure.visualiser_structure()). Sert aussi à
+    l'affichage en cours de calcul, à partir des points envoyés aux abonnés (voir evenements.py).
+
+    :param plyfig: Figure sur laquelle tracer.
+    :type plyfig: Figure plotly
+    :param cable: Points du câble dans le repère du satellite, de forme (N, 3) (voir Structure.montrer_cable()).
+    :type cable: ndarray
+    :param titre: Titre de la figure.
+    :type titre: str
+    """
+    import plotly.graph_objects as go
+
+    # Réinitialisation de la figure
+    plyfig.data = []
+    # Ajout du satellite dans la figure
+    plyfig.add_trace(go.Scatter3d(
+        x=[0], y=[0], z=[0],
+        marker=dict(size=4,
+                    color="red"),
+        name="Satellite"))
+    # Ajout de la structure dans la figure
+    plyfig.add_trace(go.Scatter3d(
+        x=cable[:, 0], y=cable[:, 1], z=cable[:, 2],
+        marker=dict(size=1,
+                    color="cyan"),
+        line=dict(color="cyan",
+                  width=2),
+        name="Câble"))
+    # On ajoute le titre
+    plyfig.update_layout(title=titre)
+
+class MemoEvaluations:
+    """
+    Mémoire des dernières évaluations de Structure.redefinir_parametres(). L'optimiseur de Nelder-Mead, son callback et
+    l'affichage évaluent souvent plusieurs fois le même vecteur de paramètres : on garde alors le score et l'état de la
+    structure (points, forces) au lieu de refaire le calcul du champ magnétique. Les évaluations les moins récemment
+    utilisées sont oubliées au-delà de taille_max. La mémoire est partagée par les fils d'exécution (optimisations
+    multi-départ en mode "threads") : ses accès sont protégés par un verrou.
+    """
+    # Attributs de la structure gardés pour chaque évaluation
+    ATTRIBUTS = ["longueur_segments", "angles", "points", "encombrements", "encombrement_max", "poids", "x", "y", "z",
+                 "force_induite", "force_impose", "Fx_induit", "Fx_impose", "borne_erreur_champ", "_cable", "_B", "_R"]
+
+    def __init__(self, taille_max = 256, quantum = 1e-12):
+        """
+        :param taille_max: Nombre maximal d'évaluations gardées (0 pour désactiver la mémoire).
+        :type taille_max: int
+        :param quantum: Pas d'arrondi des paramètres avant de calculer la clé.
+        :type quantum: float
+        """
+        self.taille_max = taille_max
+        self.quantum = quantum
+        self.evaluations = OrderedDict()
+        self.succes = 0
+        self.echecs = 0
+        self.verrou = threading.Lock()
+
+    def cle(self, structure, params, *options):
+        """
+        Calcule la clé d'une évaluation : empreinte des paramètres arrondis, des options du score et de la configuration
+        de la structure.
+
+        :param structure: Structure évaluée.
+        :type structure: Structure
+        :param params: Liste des paramètres de la structure.
+        :type params: ndarray
+        :param options: Options du score (induit, b, tridimensionnel, biais).
+        :type options: tuple
+
+        :return: La clé de l'évaluation.
+        :rtype: str
+        """
+        params = np.round(np.asarray(params, dtype=float) / self.quantum)
+        configuration = repr((options, structure.nombre_points, structure.longueur_segments_min,
+                              structure.longueur_segments_max, structure.encombrement_cible, structure.modele_champ))
+        empreinte = hashlib.sha1(params.tobytes())
+        empreinte.update(configuration.encode())
+        return empreinte.hexdigest()
+
+    def obtenir(self, cle):
+        """
+        Retourne l'évaluation correspondant à la clé, ou None si elle n'est pas en mémoire.
+
+        :param cle: Clé de l'évaluation.
+        :type cle: str
+
+        :return: Le score et l'état de la structure.
+        :rtype: tuple
+        """
+        with self.verrou:
+            evaluation = self.evaluations.get(cle)
+            if evaluation is None:
+                self.echecs += 1
+            else:
+                self.succes += 1
+                self.evaluations.move_to_end(cle)
+        return evaluation
+
+    def ajouter(self, cle, score, structure):
+        """
+        Garde le score et l'état de la structure qui vient d'être évaluée.
+
+        :param cle: Clé de l'évaluation.
+        :type cle: str
+        :param score: Score de la structure.
+        :type score: float
+        :param structure: Structure évaluée.
+        :type structure: Structure
+        """
+        if self.taille_max <= 0:
+            return
+
+        evaluation = (score, {nom: np.copy(getattr(structure, nom)) for nom in self.ATTRIBUTS})
+        with self.verrou:
+            self.evaluations[cle] = evaluation
+            while len(self.evaluations) > self.taille_max:
+                self.evaluations.popitem(last=False)
+
+    def restaurer(self, evaluation, structure):
+        """
+        Remet la structure dans l'état gardé par une évaluation.
+
+        :param evaluation: Score et état de la structure (voir obtenir()).
+        :type evaluation: tuple
+        :param structure: Structure à remettre dans cet état.
+        :type structure: Structure
+
+        :return: Le score de la structure.
+        :rtype: float
+        """
+        score, etat = evaluation
+        for nom, valeur in etat.items():
+            setattr(structure, nom, np.copy(valeur) if np.ndim(valeur) else valeur[()])
+        structure._diagnostics = None
+        structure._segments = None
+        return score
+
+    def statistiques(self):
+        """
+        Permet de connaître l'efficacité de la mémoire.
+
+        :return: Nombre de succès, nombre d'échecs et nombre d'évaluations gardées.
+        :rtype: tuple
+        """
+        with self.verrou:
+            return self.succes, self.echecs, len(self.evaluations)
+
+    def vider(self):
+        """
+        Oublie toutes les évaluations et remet les compteurs à zéro.
+        """
+        with self.verrou:
+            self.evaluations.clear()
+            self.succes = 0
+            self.echecs = 0
+
+# Mémoire partagée par toutes les structures
+memo_evaluations = MemoEvaluations()
 
 class Structure:
 
-    def __init__(self, nombre_points=10, longueur_segments_max=100, longueur_segments_min=100, encombrement_cible=500, tridimensionnel = True, nom = ""):
+    def __init__(self, nombre_points=10, longueur_segments_max=100, longueur_segments_min=100, encombrement_cible=500, tridimensionnel = True, nom = "", modele_champ = "igrf", parametres = None):
         """
         Initialisation de la classe Structure.
         Cette classe représente les structures que nous voulons générer, puis évaluer.
@@ -27,6 +361,10 @@ class Structure:
         :type tridimensionnel: bool
         :param nom: Nom de l'instance de la structure.
         :type nom: str
+        :param modele_champ: Modèle du champ magnétique utilisé pour évaluer la force : "igrf" (calcul complet en chaque point), "taylor" (développement au premier ordre autour du satellite) ou "tuile" (interpolation dans une grille précalculée autour du satellite).
+        :type modele_champ: str
+        :param parametres: Longueurs des segments (N-1,) et angles (N-1, 2) à utiliser au lieu de les générer aléatoirement.
+        :type parametres: tuple
         """
 
         # Initialisation des paramètres principaux de la structure
@@ -42,6 +380,8 @@ class Structure:
         self.nom = nom
         self.Fx_induit = 0
         self.Fx_impose = 0
+        self.modele_champ = modele_champ
+        self.borne_erreur_champ = 0
 
         # Initialisation des tableaux pour stocker les propriétés géométriques
         self.points = np.ndarray((self.nombre_points, 3))
@@ -54,12 +394,20 @@ class Structure:
 
             raise Exception("La longueur minimale doit être plus grande que zéro et elle doit être plus courte ou égale à la longueur maximale.")
 
-        # Génération aléatoire des angles theta (azimutal) et phi (élévation)
-        self.angles[:, 0] = np.random.rand(self.nombre_points - 1) * 2 * np.pi
-        self.angles[:, 1] = (np.random.rand(self.nombre_points - 1) - 0.5) * np.pi * self.tridimensionnel
+        if parametres is not None:
+
+            # Longueurs et angles fournis (par exemple par une population de structures)
+            self.longueur_segments[:] = parametres[0]
+            self.angles[:, :] = parametres[1]
+
+        else:
+
+            # Génération aléatoire des angles theta (azimutal) et phi (élévation)
+            self.angles[:, 0] = np.random.rand(self.nombre_points - 1) * 2 * np.pi
+            self.angles[:, 1] = (np.random.rand(self.nombre_points - 1) - 0.5) * np.pi * self.tridimensionnel
 
-        # Génération aléatoire des longueurs de segments dans les limites définies
-        self.longueur_segments[:] = np.random.rand(self.nombre_points - 1) * (self.longueur_segments_max - self.longueur_segments_min) + self.longueur_segments_min
+            # Génération aléatoire des longueurs de segments dans les limites définies
+            self.longueur_segments[:] = np.random.rand(self.nombre_points - 1) * (self.longueur_segments_max - self.longueur_segments_min) + self.longueur_segments_min
 
         # Initialisation du premier point à l'origine
         self.points[0, :] = [0, 0, 0]
@@ -102,23 +450,18 @@ class Structure:
         Y(n+1) = Y(n) + R * sin(theta) * sin(phi)
         Z(n+1) = Z(n) + R * cos(theta)
         
-        On boucle jusqu'à ce qu'on calcule tous nos points.
+        Les points sont donc la somme cumulée des incréments, calculée en une seule fois par generer_points().
         
-        À chaque point, on vérifie la distance par rapport à l'origine afin de trouver l'encombrement de chaque point.
+        La distance de chaque point par rapport à l'origine donne l'encombrement de chaque point.
         '''
-
-        for i in range(self.nombre_points-1):
-
-            self.points[i+1, :] = [self.points[i, 0] + self.longueur_segments[i] * np.sin(self.angles[i, 0]) * np.cos(self.angles[i, 1]),
-                                   self.points[i, 1] + self.longueur_segments[i] * np.sin(self.angles[i, 0]) * np.sin(self.angles[i, 1]),
-                                   self.points[i, 2] + self.longueur_segments[i] * np.cos(self.angles[i, 0])]
-
-            self.encombrements[i] = (self.points[i+1, 0]**2 + self.points[i+1, 1]**2 +self.points[i+1, 2]**2)**0.5
+        self.points = generer_points(self.longueur_segments, self.angles)
+        self.encombrements = np.linalg.norm(self.points[1:], axis=1)
 
         # À partir de l'encombrement de chaque point et des longueurs, nous trouvons l'encombrement max et le poids de la structure.
         self.encombrement_max = self.encombrements.max()
         # On s'assure que l'encombrement de la structure correspond à l'encombrement cible.
         self.points = self.points * self.encombrement_cible / self.encombrement_max
+        self.encombrements = self.encombrements * self.encombrement_cible / self.encombrement_max
         self.longueur_segments = self.longueur_segments * self.encombrement_cible / self.encombrement_max
         # Calcul du poids, redéfinition de l'encombrement et évaluation de la force
         self.poids = self.longueur_segments.sum()
@@ -211,7 +554,7 @@ class Structure:
 
             # Si notre longueur sort de ses bornes, on la ramène avec la même marge qu'elle dépassait.
             appliquer_limites_vectorise = np.vectorize(self.appliquer_limites)
-            appliquer_limites_vectorise(self.longueur_segments, self.longueur_segments_min, self.longueur_segments_max)
+            self.longueur_segments[:] = appliquer_limites_vectorise(self.longueur_segments, self.longueur_segments_min, self.longueur_segments_max)
 
         # Si on veut modifier les angles, on applique une différence égale à (-pi à pi) * température pour théta
         #                                                                 et (-pi/2 à pi/2) * température pour phi.
@@ -255,26 +598,68 @@ class Structure:
         :return: le score de la structure
         :rtype: float
         """
+        # Si ce vecteur de paramètres a déjà été évalué, on reprend l'évaluation gardée en mémoire.
+        cle = memo_evaluations.cle(self, params, induit, b, tridimensionnel, biais)
+        evaluation = memo_evaluations.obtenir(cle)
+        if instr.ACTIF:
+            instr.compter("objectif.evaluations")
+            instr.compter("objectif.memo_succes" if evaluation is not None else "objectif.memo_echecs")
+        if evaluation is not None:
+            return memo_evaluations.restaurer(evaluation, self)
+
         # On extrait nos ndarrays de longueurs et d'angles à partir des paramètres.
         nb_segments = self.nombre_points - 1
 
-        self.longueur_segments = params[0:nb_segments]
+        # On s'assure que les longueurs de segments conviennent aux limites que nous avons définies.
+        self.longueur_segments = np.clip(params[0:nb_segments], self.longueur_segments_min, self.longueur_segments_max)
         self.angles[:, 0] = tridimensionnel*params[nb_segments:nb_segments * 2]
         self.angles[:, 1] = params[nb_segments * 2:nb_segments * 3]
 
-        # On s'assure que les longueurs de segments conviennent aux limites que nous avons définies.
-        for i in range(self.nombre_points-1):
-            self.longueur_segments[i] = self.appliquer_limites_aggressif(self.longueur_segments[i],
-                                                                         self.longueur_segments_min,
-                                                                         self.longueur_segments_max)
-
         # On génère la structure, puis on évalue son score.
         self.generation_structure()
         encombrement, poids, force = self.montrer_performance(induit)
         score = (force/(poids**b))**-biais
+        memo_evaluations.ajouter(cle, score, self)
 
         return score
 
+    def gradient_score(self, params, induit = False, b = 0.5, tridimensionnel = True, pas = 1e-6):
+        """
+        Calcule le score (force / poids^b) de la structure définie par les paramètres et son gradient par rapport aux
+        paramètres, par différences finies centrées. Les 2 * 3(N-1) + 1 structures nécessaires sont évaluées en un seul
+        appel au modèle de champ (voir scores_parametres()). La structure elle-même n'est pas modifiée.
+
+        :param params: Liste des paramètres de la structure (longueurs, angles theta, angles phi).
+        :type params: ndarray
+        :param induit: Détermine si le courant est induit ou imposé.
+        :type induit: bool
+        :param b: Importance du poids dans le calcul.
+        :type b: float
+        :param tridimensionnel: Détermine si la structure est tridimensionnelle.
+        :type tridimensionnel: bool
+        :param pas: Pas relatif des différences finies.
+        :type pas: float
+
+        :return: Le score et son gradient par rapport aux paramètres.
+        :rtype: tuple
+        """
+        params = np.asarray(params, dtype=float)
+        nb_params = params.size
+
+        # Paramètres décalés de +h et de -h, un à la fois
+        h = pas * np.maximum(1, np.abs(params))
+        decalages = np.diag(h)
+        lot = np.vstack((params, params + decalages, params - decalages))
+
+        with instr.chrono("objectif.gradient"):
+            scores = scores_parametres(lot, self.nombre_points, self.encombrement_cible, induit, b, tridimensionnel, self.modele_champ)
+        if instr.ACTIF:
+            instr.compter("objectif.gradients")
+            instr.compter("objectif.evaluations", len(lot))
+        gradient = (scores[1:nb_params + 1] - scores[nb_params + 1:]) / (2 * h)
+
+        return scores[0], gradient
+
     def montrer_points(self):
         """
         On retourne les points composant notre structure.
@@ -284,114 +669,231 @@ class Structure:
         """
         return self.points
 
+    def montrer_cable(self):
+        """
+        On retourne les points du câble tels qu'ils sont tracés : les points de la structure tournés selon l'angle alpha
+        (voir calculer_forces()).
+
+        :return: Les points [x, y, z] du câble.
+        :rtype: ndarray
+        """
+        return np.column_stack((self.x, self.y, self.z))
+
     def evaluer_force(self):
         """
         Calcule la force générée par la structure.
+
+        On ne calcule ici que ce qui sert au score : la rotation des points, la résistance du câble, le champ magnétique
+        aux points et les forces résultantes. Les diagnostics (vecteurs du câble, angles des segments, forces sur chaque
+        segment) ne sont calculés qu'à leur première lecture, voir calculer_diagnostics().
         """
         #Rédigé par Dorian Stefan Dumitru
 
-        # %% Données____________________________________________________________________
-
-        # Constantes
-        R_T = constants.R_earth.value  # [m] Rayon de la Terre
-        M_T = constants.M_earth.value  # [kg] Masse de la Terre
-        G = constants.G.value  # [m^3/kg/s²] Constante Universelle de Gravitation
-        mu = G * M_T  # [m^3/s²] Paramètre Gravitationnel Standard de la Terre
-
-        # Caractéristiques du matériau
-        Al = Al_2024()
-        rho = Al.MasseVolumique()
-        res = Al.Resistivite()
-
-        # %% Géométrie - Paramétrisation de la courbe___________________________________
-        # Forme générée
-        cable = self.points
-
-        # Initialisation des points
-        self.x = []
-        self.y = []
-        self.z = []
-        L = 0
-
-        # Initialisation des vecteurs entre les points
-        # Vecteurs cartésiens normalisés
-        x_vect = np.array([1, 0, 0])
-        y_vect = np.array([0, 1, 0])
-        z_vect = np.array([0, 0, 1])
-        vect_cable_i = []
-
-        # Initialisation des angles entre les points
-        alpha_xy_range = []
-        alpha_xz_range = []
-        alpha_yz_range = []
-
-        # Rotation du cable à partir de l'origine (satellite : [0,0,0]), selon Ry
-        alpha = 30 * pi / 180  # rad
-
-        # Réécriture des points selon l'angle alpha
-        for i in range(len(cable)):
-            x_i, z_i = rotate_origin_only(np.array([cable[i][0], cable[i][2]]), alpha)
-            self.x.append(x_i)
-            self.y.append(cable[i][1])
-            self.z.append(z_i)
-        cable = np.transpose(np.array([self.x, self.y, self.z]))
-
-        # Calcul des vecteurs du câble et des angles entre les L_i
-        for i in range(len(cable) - 1):
-            vect_i = cable[i + 1] - cable[i]
-            vect_cable_i.append(vect_i)
-            # Norme du câble
-            L += np.linalg.norm(vect_i)
-            alpha_xy = angle_between(y_vect, vect_i)
-            alpha_xy_range.append(np.degrees(alpha_xy))
-            alpha_xz = angle_between(x_vect, vect_i)
-            alpha_xz_range.append(np.degrees(alpha_xz))
-            alpha_yz = angle_between(z_vect, vect_i)
-            alpha_yz_range.append(np.degrees(alpha_yz))
-
-        # Affichage des vecteurs pour vérifier leur sens pour le calcul d'angle
-        vect_cable_i.append([0, 0, 0])  # Ajout d'un vecteur nul pour avoir mm nb de vecteurs que de points
-        vect_cable_i = np.array(vect_cable_i)
-
-        # Physique du câble
-        d = 5  # [mm] Diamètre du câble
-        S = pi * ((d * 10 ** -3) / 2) ** 2  # [m²] Surface de la section du câble
-        R = ca.Resistance(L, S, res)  # [Ohm] Résistance électrique du câble
-        Vol = ca.Volume(L, S)  # [m^3] Volume totale du câble
-        m = ca.Masse(Vol, rho)  # [kg] Masse du câble
-
-        # np.set_printoptions(precision=9)
-
-        # %% Paramètres orbitaux - Position du satellite
-        h = 800  # Altitude [km]
-        r = R_T * 10 ** -3 + h  # [km]
-        theta = 114  # [deg]
-        phi = 168  # [deg]
-        INC = 25  # [deg]
-        TA = 180  # [deg]
-        date = datetime(2020, 7, 15, 15, 20, 0)
-
-        V = np.sqrt(mu / (r * 10 ** 3))  # [m/s] Vitesse du satellite sur son orbite
-
-        # %% Calcul de la force de Lorentz générée
-        F1a_norm_vector = []
-        F1b_norm_vector = []
-        I = 1.5  # Courant imposé dans le câble [A]
-
-        # Diamètre qui varie
-        F1a, B1a, F1a_i = fe.Parametre(r, theta, phi, date, INC, TA, self.x, self.y, self.z, None, V, R)  # Cas induit
-        F1a_norm_vector.append(np.linalg.norm(F1a))  # Pour chaque
-        F1b, B1b, F1b_i = fe.Parametre(r, theta, phi, date, INC, TA, self.x, self.y, self.z, I, V, R)  # Cas imposé
-        F1b_norm_vector.append(np.linalg.norm(F1b))
+        # Rotation des points, champ magnétique et forces résultantes
+        with instr.chrono("Structure.evaluer_force"):
+            F1a, F1b, cable, B, R, modele = calculer_forces(self.points, self.modele_champ, self.encombrement_cible)
+        self.x = cable[:, 0]
+        self.y = cable[:, 1]
+        self.z = cable[:, 2]
+
+        # Erreur relative du modèle de champ par rapport au calcul IGRF complet
+        self.borne_erreur_champ = modele.borne_erreur_relative
+
+        self.force_induite = np.linalg.norm(F1a)
+        self.force_impose = np.linalg.norm(F1b)
+        self.Fx_induit = -F1a[0]
+        self.Fx_impose = -F1b[0]
+
+        # On garde de quoi calculer les diagnostics plus tard
+        self._cable = cable
+        self._B = B
+        self._R = R
+        self._diagnostics = None
+        self._segments = None
+
+    def calculer_diagnostics(self):
+        """
+        Calcule les grandeurs qui ne servent pas au score mais à l'affichage et à l'analyse de la structure : vecteurs du
+        câble, angles de chaque segment avec les axes et forces sur chaque segment. Le calcul n'est fait qu'une fois par
+        évaluation de la force.
+
+        :return: Les diagnostics de la structure.
+        :rtype: dict
+        """
+        if self._diagnostics is None:
+
+            # Vecteurs du câble, avec un vecteur nul pour avoir mm nb de vecteurs que de points
+            vect_cable_i = np.vstack((np.diff(self._cable, axis=0), np.zeros(3)))
+            normes = np.linalg.norm(vect_cable_i[:-1], axis=1)
+
+            # Forces sur chaque segment, cas induit et cas imposé
+            F1a, F1a_i, F1b, F1b_i = fe.ForceLorentzInduitImpose(self._cable, self._B, COURANT, VITESSE, self._R)
+
+            self._diagnostics = {
+                "vect_cable_i": vect_cable_i,
+                # Angles entre les segments et les axes y, x et z [deg]
+                "alpha_xy_range": np.degrees(np.arccos(np.clip(vect_cable_i[:-1, 1] / normes, -1.0, 1.0))),
+                "alpha_xz_range": np.degrees(np.arccos(np.clip(vect_cable_i[:-1, 0] / normes, -1.0, 1.0))),
+                "alpha_yz_range": np.degrees(np.arccos(np.clip(vect_cable_i[:-1, 2] / normes, -1.0, 1.0))),
+                "F1a_i": F1a_i,
+                "F1b_i": F1b_i,
+                "B1b": self._B,
+            }
+
+        return self._diagnostics
+
+    def calculer_segments(self):
+        """
+        Calcule les grandeurs par segment qui permettent de mettre à jour la force quand seuls quelques segments
+        changent (voir mettre_a_jour_segments()) : contributions de chaque segment à la force et à la tension induite,
+        leurs sommes, longueurs des segments du câble et encombrement max des premiers points. Le calcul n'est fait
+        qu'une fois par évaluation de la force.
+
+        :return: Les grandeurs par segment.
+        :rtype: dict
+        """
+        if self._segments is None:
+
+            C, u = fe.ContributionsSegments(self._cable, self._B, VITESSE)
+            normes = np.linalg.norm(np.diff(self._cable, axis=0), axis=1)
+
+            self._segments = {
+                "C": C,
+                "u": u,
+                "somme_C": C.sum(axis=0),
+                "somme_u": u.sum(),
+                "normes": normes,
+                "longueur": normes.sum(),
+                # Encombrement max des points 1 à i+1
+                "encombrement_prefixe": np.maximum.accumulate(np.linalg.norm(self.points[1:], axis=1)),
+            }
+
+        return self._segments
+
+    def mettre_a_jour_segments(self, indices, longueurs = None, angles = None):
+        """
+        Change la longueur et/ou les angles de quelques segments et met à jour la structure sans tout recalculer.
+
+        Les points avant le premier segment modifié ne bougent pas : on ne recalcule que la suite de la chaîne, le champ
+        magnétique aux points déplacés et les contributions des segments concernés, puis on corrige les sommes par la
+        différence. Ce n'est possible que si le point le plus éloigné du satellite est avant le premier segment modifié
+        et le reste : sinon l'encombrement change, la structure doit être remise à l'échelle, tous les points bougent et
+        le champ magnétique change partout (il dépend de la position). On refait alors le calcul complet, au même coût
+        que generation_structure(). Les compteurs "segments.incremental" et "segments.complet" (voir
+        Calcul_Force_EM/Instrumentation.py) indiquent combien de fois chaque cas se produit.
+
+        :param indices: Indices des segments modifiés.
+        :type indices: ndarray
+        :param longueurs: Nouvelles longueurs des segments (optionnel).
+        :type longueurs: ndarray
+        :param angles: Nouveaux angles theta et phi des segments, de forme (len(indices), 2) (optionnel).
+        :type angles: ndarray
+        """
+        indices = np.atleast_1d(indices)
+        k = int(indices.min())
+        segments = self.calculer_segments()
+
+        # Nouveaux paramètres
+        self.longueur_segments = np.array(self.longueur_segments, dtype=float)
+        if longueurs is not None:
+            self.longueur_segments[indices] = longueurs
+        if angles is not None:
+            self.angles[indices] = angles
+
+        # Nouveaux points à partir du point k, qui ne bouge pas
+        suffixe = self.points[k] + generer_points(self.longueur_segments[k:], self.angles[k:])[1:]
+
+        # Si l'encombrement change, la structure doit être remise à l'échelle : calcul complet
+        encombrement_prefixe = segments["encombrement_prefixe"][k - 1] if k > 0 else 0.0
+        encombrement_suffixe = np.linalg.norm(suffixe, axis=1)
+        if (not np.isclose(encombrement_prefixe, self.encombrement_cible, rtol=1e-12, atol=0)
+                or encombrement_suffixe.max() > encombrement_prefixe):
+            if instr.ACTIF:
+                instr.compter("segments.complet")
+            self._diagnostics = None
+            self._segments = None
+            self.generation_structure()
+            return
+
+        if instr.ACTIF:
+            instr.compter("segments.incremental")
+
+        # Rotation des nouveaux points et champ magnétique en ces points seulement
+        x, z = rotate_origin_only((suffixe[:, 0], suffixe[:, 2]), ALPHA)
+        cable_suffixe = np.column_stack((x, suffixe[:, 1], z))
+        modele = ModeleChamp(self.modele_champ, *POSITION, self.encombrement_cible)
+        B_suffixe = modele.evaluer(cable_suffixe)
+
+        self.points = np.vstack((self.points[:k + 1], suffixe))
+        self.encombrements = np.concatenate((self.encombrements[:k], encombrement_suffixe))
+        cable = np.vstack((self._cable[:k + 1], cable_suffixe))
+        B = np.vstack((self._B[:k + 1], B_suffixe))
+
+        # Contributions des segments k et suivants, puis correction des sommes par la différence
+        C, u = fe.ContributionsSegments(cable[k:], B[k:], VITESSE)
+        normes = np.linalg.norm(np.diff(cable[k:], axis=0), axis=1)
+        segments["somme_C"] = segments["somme_C"] + C.sum(axis=0) - segments["C"][k:].sum(axis=0)
+        segments["somme_u"] = segments["somme_u"] + u.sum() - segments["u"][k:].sum()
+        segments["longueur"] = segments["longueur"] + normes.sum() - segments["normes"][k:].sum()
+        segments["C"] = np.vstack((segments["C"][:k], C))
+        segments["u"] = np.concatenate((segments["u"][:k], u))
+        segments["normes"] = np.concatenate((segments["normes"][:k], normes))
+        segments["encombrement_prefixe"] = np.concatenate((segments["encombrement_prefixe"][:k],
+                                                           np.maximum.accumulate(np.maximum(encombrement_suffixe, encombrement_prefixe))))
+
+        # Forces résultantes, cas induit et cas imposé
+        R = ca.Resistance(segments["longueur"], SECTION, RESISTIVITE)
+        F1a = segments["somme_u"] / R * segments["somme_C"]
+        F1b = COURANT * segments["somme_C"]
 
+        self.poids = self.longueur_segments.sum()
+        self.x = cable[:, 0]
+        self.y = cable[:, 1]
+        self.z = cable[:, 2]
         self.force_induite = np.linalg.norm(F1a)
         self.force_impose = np.linalg.norm(F1b)
         self.Fx_induit = -F1a[0]
         self.Fx_impose = -F1b[0]
 
-        self.F1b_i = F1b_i
-        self.B1b = B1b
-        self.vect_cable_i = vect_cable_i
+        self._cable = cable
+        self._B = B
+        self._R = R
+        self._diagnostics = None
+
+    @property
+    def vect_cable_i(self):
+        """Vecteurs entre les points du câble, suivis d'un vecteur nul."""
+        return self.calculer_diagnostics()["vect_cable_i"]
+
+    @property
+    def alpha_xy_range(self):
+        """Angles [deg] entre les segments du câble et l'axe y."""
+        return self.calculer_diagnostics()["alpha_xy_range"]
+
+    @property
+    def alpha_xz_range(self):
+        """Angles [deg] entre les segments du câble et l'axe x."""
+        return self.calculer_diagnostics()["alpha_xz_range"]
+
+    @property
+    def alpha_yz_range(self):
+        """Angles [deg] entre les segments du câble et l'axe z."""
+        return self.calculer_diagnostics()["alpha_yz_range"]
+
+    @property
+    def F1a_i(self):
+        """Forces sur chaque segment dans le cas induit, précédées d'une ligne nulle."""
+        return self.calculer_diagnostics()["F1a_i"]
+
+    @property
+    def F1b_i(self):
+        """Forces sur chaque segment dans le cas imposé, précédées d'une ligne nulle."""
+        return self.calculer_diagnostics()["F1b_i"]
+
+    @property
+    def B1b(self):
+        """Champ magnétique aux points du câble."""
+        return self.calculer_diagnostics()["B1b"]
 
     def visualiser_structure(self, plyfig = None, titre = None):
         """
@@ -403,24 +905,7 @@ class Structure:
         :type titre: str
         """
         if plyfig != None:
-            # Réinitialisation de la figure
-            plyfig.data = []
-            # Ajout du satellite dans la figure
-            plyfig.add_trace(go.Scatter3d(
-                x=[0], y=[0], z=[0],
-                marker=dict(size=4,
-                            color="red"),
-                name="Satellite"))
-            # Ajout de la structure dans la figure
-            plyfig.add_trace(go.Scatter3d(
-                x=self.x, y=self.y, z=self.z,
-                marker=dict(size=1,
-                            color="cyan"),
-                line=dict(color="cyan",
-                          width=2),
-                name="Câble"))
-            # On ajoute le titre
-            plyfig.update_layout(title=titre)
+            visualiser_cable(plyfig, self.montrer_cable(), titre)
 
     def sauvegarde(self, nom_a_donner = None, delimiteur = ","):
         """
@@ -441,7 +926,8 @@ class Structure:
             date = date.replace(" ", "_")
             date = date.replace(".", "_")
             date = date.replace(":", "-")
-            fichier = "Structures\\Structure_" + date
+            os.makedirs("Structures", exist_ok=True)
+            fichier = os.path.join("Structures", "Structure_" + date)
 
         # Génération des noms
         nom_points = fichier + "_points.csv"
@@ -475,8 +961,69 @@ class Structure:
         :type biais: float
         """
         # Définition du chemin
-        chemin = "Structures\\" + fichier
+        chemin = os.path.join("Structures", fichier)
         # Chargement des paramètres
         params = np.loadtxt(chemin, delimiter=delimiteur)
         # On applique les paramètres
         self.redefinir_parametres(params=params, induit=induit, tridimensionnel=tridimensionnel, biais=biais)
+
+    def sauvegarde_archive(self, archive, induit = False, b = 0.5, metadonnees = None):
+        """
+        Sert à ajouter la structure (paramètres, points, score et performances) à une archive de structures (voir
+        archive.py), au lieu de deux fichiers CSV.
+
+        :param archive: Archive, ou dossier de l'archive.
+        :type archive: Archive or str
+        :param induit: Détermine si le courant est induit ou imposé (pour le score).
+        :type induit: bool
+        :param b: Importance du poids dans le calcul du score.
+        :type b: float
+        :param metadonnees: Métadonnées de l'exécution à garder avec la structure (paramètres de l'apprentissage...).
+        :type metadonnees: dict
+
+        :return: L'indice de la structure dans l'archive.
+        :rtype: int
+        """
+        if not isinstance(archive, Archive):
+            archive = Archive(archive)
+
+        # Paramètres en une ligne : longueurs, angles theta, angles phi
+        params = np.concatenate((self.longueur_segments, self.angles[:, 0], self.angles[:, 1]))
+        encombrement, poids, force = self.montrer_performance(induit)
+
+        return archive.ajouter(params, self.montrer_points(), force / (poids ** b), encombrement, poids, force,
+                               dict({"nom": self.nom, "induit": induit, "b": b}, **(metadonnees or {})))
+
+    def charger_archive(self, archive, indice):
+        """
+        Sert à charger une structure d'une archive (voir archive.py) telle qu'elle a été enregistrée : paramètres, points,
+        encombrement et nom sont repris de l'archive, sans regénérer la structure (les longueurs ne sont ni bornées ni
+        remises à l'échelle). Seule la force est recalculée, à partir des mêmes points. La structure doit avoir le même
+        nombre de points que celle de l'archive.
+
+        :param archive: Archive, ou dossier de l'archive.
+        :type archive: Archive or str
+        :param indice: Indice de la structure dans l'archive.
+        :type indice: int
+        """
+        if not isinstance(archive, Archive):
+            archive = Archive(archive)
+
+        params = archive.parametres(indice)
+        if params.size != 3 * (self.nombre_points - 1):
+            raise Exception("La structure " + str(indice) + " de l'archive n'a pas le même nombre de points que cette structure.")
+
+        # Copies des données de l'archive : la structure ne garde pas de vue sur les fichiers projetés en mémoire
+        nb_segments = self.nombre_points - 1
+        self.longueur_segments = np.array(params[0:nb_segments])
+        self.angles = np.column_stack((params[nb_segments:nb_segments * 2], params[nb_segments * 2:nb_segments * 3]))
+        self.points = np.array(archive.points(indice))
+        self.encombrements = np.linalg.norm(self.points[1:], axis=1)
+
+        # Performances enregistrées (l'encombrement est celui de la structure mise à l'échelle, voir
+        # generation_structure()), puis force recalculée
+        encombrement = float(archive.index()[indice]["encombrement"])
+        self.encombrement_max = self.encombrements.max() if np.isnan(encombrement) else encombrement
+        self.poids = self.longueur_segments.sum()
+        self.nom = archive.metadonnees(indice).get("nom", self.nom)
+        self.evaluer_force()